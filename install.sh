@@ -222,6 +222,9 @@ if [ $makerfaire2018 -eq 0 ]; then
     rm -rf nabd/nlu/engine_fr
   fi
   venv/bin/snips-nlu train nabd/nlu/nlu_dataset_fr.json nabd/nlu/engine_fr
+
+  echo "Building NLU phrase tables"
+  venv/bin/python manage.py build_nlu_phrases en fr
 fi
 
 trust=`sudo grep local /etc/postgresql/*/main/pg_hba.conf | grep -cE '^local +all +all +trust' || echo -n ''`
@@ -297,6 +300,13 @@ else
   done
 fi
 
+if [ $upgrade -eq 1 ]; then
+  echo "Transcoding sounds - 11/14" > /tmp/pynab.upgrade
+else
+  echo "Transcoding sounds"
+fi
+venv/bin/python manage.py transcode_sounds
+
 if [ $test -eq 1 ]; then
   echo "Running tests"
   if [ $ci_chroot -eq 1 ]; then
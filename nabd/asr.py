@@ -1,9 +1,8 @@
-import struct
 import traceback
 from concurrent.futures import ThreadPoolExecutor
 
-import numpy as np
-from kaldiasr.nnet3 import KaldiNNet3OnlineDecoder, KaldiNNet3OnlineModel
+from .asr_buffer import SampleBuffer
+from .speculation import PartialHypothesis
 
 
 class ASR:
@@ -17,6 +16,8 @@ class ASR:
         "en_US": "/opt/kaldi/model/kaldi-nabaztag-en-adapt-r20191222",
     }
     DEFAULT_LOCALE = "fr_FR"
+    # Publish partial hypotheses every 2 chunks (200ms)
+    PARTIAL_CHUNKS = 2
 
     @staticmethod
     def get_locale(locale):
@@ -27,14 +28,34 @@ class ASR:
 
     def __init__(self, locale):
         self.executor = ThreadPoolExecutor(max_workers=1)
+        # Only used from executor thread
+        self.samples = SampleBuffer()
+        self.partial_cb = None
+        self.chunks = 0
+        self.partial = PartialHypothesis()
         self._load_model(locale)
 
     def _load_model(self, locale):
+        from kaldiasr.nnet3 import (
+            KaldiNNet3OnlineDecoder,
+            KaldiNNet3OnlineModel,
+        )
+
         locale = ASR.get_locale(locale)
         path = ASR.MODELS[locale]
         self.model = KaldiNNet3OnlineModel(path, max_mem=20000)
         self.decoder = KaldiNNet3OnlineDecoder(self.model)
 
+    def on_partial(self, loop, callback):
+        """
+        Define the callback for partial hypotheses while decoding.
+        callback is cb(text, stable), called when hypothesis changes and
+        again when it is stable.
+        The callback is called on the provided event loop, with
+        loop.call_soon_threadsafe
+        """
+        self.partial_cb = (loop, callback)
+
     def decode_chunk(self, samples, finalize):
         self.executor.submit(
             lambda s=samples, f=finalize: self._decode_chunk(s, f)
@@ -42,14 +63,30 @@ class ASR:
 
     def _decode_chunk(self, frames, finalize):
         try:
-            nframes = len(frames) / 2
-            samples = struct.unpack_from("<%dh" % nframes, frames)
-            self.decoder.decode(
-                16000, np.array(samples, dtype=np.float32), finalize
-            )
+            samples = self.samples.convert(frames)
+            self.decoder.decode(16000, samples, finalize)
+            if finalize:
+                self.chunks = 0
+                self.partial.reset()
+            else:
+                self._publish_partial()
         except Exception:
             print(traceback.format_exc())
 
+    def _publish_partial(self):
+        """
+        Publish partial hypothesis if it changed or became stable.
+        Thread: executor
+        """
+        self.chunks += 1
+        if self.partial_cb is None or self.chunks % ASR.PARTIAL_CHUNKS:
+            return
+        text, likelihood = self.decoder.get_decoded_string()
+        publish, stable = self.partial.update(text)
+        if publish:
+            (loop, callback) = self.partial_cb
+            loop.call_soon_threadsafe(callback, text, stable)
+
     async def get_decoded_string(self, sync):
         if sync:
             future = self.executor.submit(lambda: self._get_decoded_string())
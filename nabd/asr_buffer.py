@@ -0,0 +1,24 @@
+import numpy as np
+
+
+class SampleBuffer(object):
+    """
+    Reusable buffer converting captured PCM data (signed 16 bits little
+    endian) to float32 samples, as expected by the ASR decoder.
+    """
+
+    def __init__(self, size=1600):
+        self.buffer = np.empty(size, dtype=np.float32)
+
+    def convert(self, data):
+        """
+        Convert PCM data without building intermediate Python objects.
+        Return a view of the buffer, valid until next call.
+        """
+        samples = np.frombuffer(data, dtype="<i2", count=len(data) // 2)
+        count = len(samples)
+        if count > len(self.buffer):
+            self.buffer = np.empty(count, dtype=np.float32)
+        result = self.buffer[:count]
+        np.copyto(result, samples)
+        return result
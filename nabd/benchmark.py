@@ -0,0 +1,186 @@
+import asyncio
+import audioop
+import collections
+import json
+import resource
+import statistics
+import time
+from pathlib import Path
+
+from .vad import Endpointer
+from .wav import map_wav
+
+# A recorded utterance, with captured audio format, and what it should be
+# understood as. intent is None if it should not be understood, text is
+# None if decoded text is not checked.
+Utterance = collections.namedtuple(
+    "Utterance", ["name", "pcm", "intent", "text"]
+)
+
+
+def read_pcm(path):
+    """
+    Read a WAV file and convert it to captured audio format: signed 16 bits
+    mono at 16 kHz.
+    """
+    wav = map_wav(path)
+    data = bytes(wav.pcm)
+    if wav.width == 1:
+        # 8bit is unsigned in wav files
+        data = audioop.bias(data, 1, -128)
+    if wav.width != Endpointer.WIDTH:
+        data = audioop.lin2lin(data, wav.width, Endpointer.WIDTH)
+    if wav.channels == 2:
+        data = audioop.tomono(data, Endpointer.WIDTH, 0.5, 0.5)
+    elif wav.channels != 1:
+        raise ValueError(f"Unsupported number of channels: {wav.channels}")
+    if wav.rate != Endpointer.RATE:
+        data, _ = audioop.ratecv(
+            data, Endpointer.WIDTH, 1, wav.rate, Endpointer.RATE, None
+        )
+    return data
+
+
+def load_corpus(directory):
+    """
+    Load utterances of a corpus directory.
+    The directory holds WAV files and a corpus.json file mapping file
+    names to expected results: {"file.wav": {"intent": ..., "text": ...}}.
+    """
+    directory = Path(directory)
+    with open(directory.joinpath("corpus.json"), "r") as f:
+        expected = json.load(f)
+    utterances = []
+    for name in sorted(expected):
+        entry = expected[name]
+        utterances.append(
+            Utterance(
+                name,
+                read_pcm(directory.joinpath(name)),
+                entry.get("intent"),
+                entry.get("text"),
+            )
+        )
+    return utterances
+
+
+def peak_rss():
+    """
+    Return peak resident memory of the process, in bytes.
+    """
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class PipelineBenchmark(object):
+    """
+    Feed recorded utterances through the speech pipeline of nabd: captured
+    chunks go through the endpointer to the ASR decoder, and the decoded
+    string is interpreted by NLU.
+    Chunks are fed from an executor thread like audio capture, paced at a
+    multiple of real time, or as fast as possible if pacing is 0.
+    """
+
+    # Captured chunks of 100ms, as with SoundAlsa
+    CHUNK_DURATION = 0.1
+
+    def __init__(self, asr, nlu):
+        self.asr = asr
+        self.nlu = nlu
+
+    def _feed(self, endpointer, pcm, pacing):
+        """
+        Feed captured audio to the endpointer.
+        Return the duration of fed audio, in seconds.
+        Thread: executor
+        """
+        chunk_size = Endpointer.size(PipelineBenchmark.CHUNK_DURATION)
+        start = time.monotonic()
+        fed = 0
+        for offset in range(0, len(pcm), chunk_size):
+            chunk = pcm[offset : offset + chunk_size]
+            fed += len(chunk)
+            if pacing:
+                # Wait until chunk would have been captured
+                captured = fed / (Endpointer.size(1) * pacing)
+                delay = start + captured - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            endpointer.process(chunk, offset + chunk_size >= len(pcm))
+            if endpointer.finalized:
+                break
+        return fed / Endpointer.size(1)
+
+    async def run(self, utterance, pacing):
+        """
+        Run an utterance through the pipeline.
+        Return measurements as a dictionary.
+        """
+        loop = asyncio.get_event_loop()
+        endpointer = Endpointer(self.asr.decode_chunk, lambda: None)
+        start = time.monotonic()
+        duration = await loop.run_in_executor(
+            None, self._feed, endpointer, utterance.pcm, pacing
+        )
+        text = await self.asr.get_decoded_string(True)
+        decoded = time.monotonic()
+        response = await self.nlu.interpret(text)
+        end = time.monotonic()
+        intent = None if response is None else response["intent"]
+        if endpointer.speech_end is None:
+            latency = None
+        else:
+            latency = round(end - endpointer.speech_end, 4)
+        return {
+            "name": utterance.name,
+            "pacing": pacing,
+            "duration": round(duration, 3),
+            "rtf": round((decoded - start) / duration, 4)
+            if duration
+            else None,
+            "latency": latency,
+            "nlu_time": round(end - decoded, 4),
+            "endpointed": endpointer.endpointed,
+            "text": text,
+            "expected_text": utterance.text,
+            "intent": intent,
+            "expected_intent": utterance.intent,
+            "correct": intent == utterance.intent,
+        }
+
+    @staticmethod
+    def summary(results):
+        """
+        Summarize results of runs with the same pacing.
+        """
+        if not results:
+            return {"count": 0}
+        rtfs = [r["rtf"] for r in results if r["rtf"] is not None]
+        latencies = [r["latency"] for r in results if r["latency"] is not None]
+        checked_texts = [r for r in results if r["expected_text"] is not None]
+        summary = {
+            "count": len(results),
+            "intent_accuracy": round(
+                sum(r["correct"] for r in results) / len(results), 3
+            ),
+            "text_accuracy": round(
+                sum(r["text"] == r["expected_text"] for r in checked_texts)
+                / len(checked_texts),
+                3,
+            )
+            if checked_texts
+            else None,
+            "endpointed": sum(r["endpointed"] for r in results),
+        }
+        if rtfs:
+            summary["rtf_mean"] = round(statistics.mean(rtfs), 4)
+            summary["rtf_max"] = max(rtfs)
+        if latencies:
+            latencies.sort()
+            summary["latency_mean"] = round(statistics.mean(latencies), 4)
+            summary["latency_p50"] = latencies[len(latencies) // 2]
+            summary["latency_p90"] = latencies[
+                min(len(latencies) - 1, int(len(latencies) * 0.9))
+            ]
+            summary["latency_max"] = latencies[-1]
+        return summary
@@ -1,4 +1,7 @@
 import abc
+import time
+
+from .timer import LoopTimer
 
 
 class Button(object, metaclass=abc.ABCMeta):
@@ -13,3 +16,100 @@ class Button(object, metaclass=abc.ABCMeta):
         loop.call_soon_threadsafe
         """
         raise NotImplementedError("Should have implemented")
+
+
+class ButtonStateMachine(object):
+    """
+    Classify button transitions into click, double click, triple click,
+    hold and click and hold events.
+    Timers run on the event loop.
+    Thread: event loop
+    """
+
+    HOLD_TIMEOUT = 2.0
+    CLICK_AND_HOLD_TIMEOUT = 2.0
+    DOUBLE_CLICK_TIMEOUT = 0.15
+    TRIPLE_CLICK_TIMEOUT = 0.15
+
+    def __init__(self, loop, callback):
+        self.loop = loop
+        self.callback = callback
+        self.sequence = 0
+        self.state = "up"
+        self.timer = LoopTimer(loop)
+
+    #
+    # (0) -- down -> (1) -- timer -> hold
+    #                 |
+    #                 -- up -> (2) -- timer -> click + goto state 0
+    #                           |
+    #  _________________________|
+    #  |
+    #  -- down -> (3) -- timer -> click_and_hold
+    #              |
+    #              -- up -> (4) -- timer -> double click
+    #                        |
+    #                        -- down -> (5) -- timer -> click_and_hold
+    #
+    def up(self, now):
+        """
+        Process button release.
+        """
+        if self.state != "down":
+            return
+        self.timer.cancel()
+        self.state = "up"
+        self._event("up", now)
+        if self.sequence == 5:
+            self.sequence = 0
+            self._event("triple_click", now)
+        elif self.sequence == 3:
+            self.sequence = 4
+            self.timer.start(
+                ButtonStateMachine.TRIPLE_CLICK_TIMEOUT,
+                self._timer_event,
+                "double_click",
+            )
+        elif self.sequence == 1:
+            self.sequence = 2
+            self.timer.start(
+                ButtonStateMachine.DOUBLE_CLICK_TIMEOUT,
+                self._timer_event,
+                "click",
+            )
+
+    def down(self, now):
+        """
+        Process button press.
+        """
+        if self.state != "up":
+            return
+        self.timer.cancel()
+        self.state = "down"
+        self._event("down", now)
+        if self.sequence == 0:
+            self.sequence = 1
+            self.timer.start(
+                ButtonStateMachine.HOLD_TIMEOUT, self._timer_event, "hold"
+            )
+        elif self.sequence == 2:
+            self.sequence = 3
+            self.timer.start(
+                ButtonStateMachine.CLICK_AND_HOLD_TIMEOUT,
+                self._timer_event,
+                "click_and_hold",
+            )
+        elif self.sequence == 4:
+            self.sequence = 5
+            self.timer.start(
+                ButtonStateMachine.TRIPLE_CLICK_TIMEOUT,
+                self._timer_event,
+                "click_and_hold",
+            )
+
+    def _timer_event(self, event):
+        self.sequence = 0
+        self._event(event, time.time())
+
+    def _event(self, event, now):
+        self.loop.call_soon(self.callback, event, now)
@@ -1,22 +1,70 @@
 import asyncio
+import collections
+import functools
 import logging
 import random
-import time
 import traceback
 import urllib.request
 from contextlib import suppress
+from pathlib import Path
 
 from .cancel import wait_with_cancel_event
 from .ears import Ears
 from .leds import Led
 from .resources import Resources
 
+Instruction = collections.namedtuple(
+    "Instruction", ["wait", "handler", "operands"]
+)
+
+
+class TimingStats(object):
+    """
+    Frame lateness statistics of choreography runs, for gestalt reporting.
+    """
+
+    def __init__(self):
+        self.runs = 0
+        self.frames = 0
+        self.dropped_frames = 0
+        self.max_lateness = 0.0
+        self.last_run = None
+
+    def record_run(self, latenesses, dropped_frames):
+        if latenesses == []:
+            return
+        ordered = sorted(latenesses)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        self.last_run = {
+            "frames": len(ordered),
+            "dropped_frames": dropped_frames,
+            "max_lateness_ms": round(max(ordered[-1], 0) * 1000, 1),
+            "p95_lateness_ms": round(max(p95, 0) * 1000, 1),
+        }
+        self.runs += 1
+        self.frames += len(ordered)
+        self.dropped_frames += dropped_frames
+        self.max_lateness = max(self.max_lateness, ordered[-1])
+
+    def stats(self):
+        return {
+            "runs": self.runs,
+            "frames": self.frames,
+            "dropped_frames": self.dropped_frames,
+            "max_lateness_ms": round(self.max_lateness * 1000, 1),
+            "last_run": self.last_run,
+        }
+
 
 class ChoreographyInterpreter:
-    def __init__(self, leds, ears, sound):
+    def __init__(self, leds, ears, sound, timing=None):
         self.leds = leds
         self.ears = ears
         self.sound = sound
+        # Statistics of runs, shared by interpreters of a NabIO
+        if timing is None:
+            timing = TimingStats()
+        self.timing = timing
         self.running_task = None
         self.running_ref = None
         self.timescale = 0
@@ -33,6 +81,9 @@ class ChoreographyInterpreter:
         self.taichi_random = int(random.randint(0, 255) * 30 >> 8)
         self.taichi_directions = [0, 0]
         self.current_palette = [(0, 0, 0) for x in range(8)]
+        self.pending_leds = None
+        self.catching_up = False
+        self.dropped_frames = 0
 
     STREAMING_URN = "urn:x-chor:streaming"
     DATA_MTL_BINARY_SCHEME = "data:application/x-nabaztag-mtl-choreography"
@@ -223,127 +274,250 @@ class ChoreographyInterpreter:
         "streaming": STREAMING_OPCODE_HANDLERS,
     }
 
-    async def nop(self, index, chor):
-        return index
+    # Number of bytes of operands of each opcode, and number of bytes
+    # actually passed to handler.
+    OPCODE_OPERANDS = {
+        "nop": (0, 0),
+        "nop_1": (1, 0),
+        "frame_duration": (1, 1),
+        "set_led_color": (6, 4),
+        "set_motor": (3, 3),
+        "set_leds_color": (3, 3),
+        "set_led_off": (1, 1),
+        "set_led_palette": (2, 2),
+        "set_led_palette_streaming": (2, 2),
+        "randmidi": (0, 0),
+        "avance": (2, 2),
+        "ifne": (3, 3),
+        "attend": (0, 0),
+        "setmotordir": (2, 2),
+    }
+
+    async def nop(self):
+        pass
 
-    async def nop_1(self, index, chor):
-        return index + 1
+    async def nop_1(self):
+        pass
 
-    async def frame_duration(self, index, chor):
-        self.timescale = 10 * chor[index]
-        return index + 1
+    async def frame_duration(self, duration):
+        self.timescale = 10 * duration
 
-    async def set_led_color(self, index, chor):
-        led = ChoreographyInterpreter.LEDS[chor[index]]
-        r = chor[index + 1]
-        g = chor[index + 2]
-        b = chor[index + 3]
-        self.leds.set1(led, r, g, b)
-        return index + 6
+    async def set_led_color(self, led, r, g, b):
+        led = ChoreographyInterpreter.LEDS[led]
+        self.set_led(led, r, g, b)
 
-    async def set_motor(self, index, chor):
-        motor = chor[index]
-        position = chor[index + 1]
-        direction = chor[index + 2]
+    async def set_motor(self, motor, position, direction):
         await self.ears.go(motor, position, direction)
-        return index + 3
-
-    async def set_leds_color(self, index, chor):
-        r = chor[index]
-        g = chor[index + 1]
-        b = chor[index + 2]
-        self.leds.setall(r, g, b)
-        return index + 3
-
-    async def set_led_off(self, index, chor):
-        led = ChoreographyInterpreter.LEDS[chor[index]]
-        self.leds.set1(led, 0, 0, 0)
-        return index + 1
-
-    async def set_led_palette(self, index, chor):
-        led = ChoreographyInterpreter.LEDS[chor[index]]
-        palette_ix = chor[index + 1] & 7
-        (r, g, b) = self.current_palette[palette_ix]
-        self.leds.set1(led, r, g, b)
-        return index + 2
 
-    async def set_led_palette_streaming(self, index, chor):
-        led = ChoreographyInterpreter.LEDS[chor[index]]
-        col_ix = chor[index + 1] & 3
-        palette_ix = self.chorst_palettecolors[col_ix]
+    async def set_leds_color(self, r, g, b):
+        if self.catching_up:
+            for led in ChoreographyInterpreter.LEDS.values():
+                self.set_led(led, r, g, b)
+        else:
+            # Every led of the current frame is overwritten
+            self.pending_leds = None
+            self.leds.setall(r, g, b)
+
+    async def set_led_off(self, led):
+        led = ChoreographyInterpreter.LEDS[led]
+        self.set_led(led, 0, 0, 0)
+
+    async def set_led_palette(self, led, palette_ix):
+        led = ChoreographyInterpreter.LEDS[led]
+        (r, g, b) = self.current_palette[palette_ix & 7]
+        self.set_led(led, r, g, b)
+
+    async def set_led_palette_streaming(self, led, col_ix):
+        led = ChoreographyInterpreter.LEDS[led]
+        palette_ix = self.chorst_palettecolors[col_ix & 3]
         (r, g, b) = self.current_palette[palette_ix]
-        self.leds.set1(led, r, g, b)
-        return index + 2
+        self.set_led(led, r, g, b)
 
-    async def randmidi(self, index, chor):
+    async def randmidi(self):
         await self.sound.start_playing(
             random.choice(ChoreographyInterpreter.MIDI_LIST)
         )
-        return index
 
-    async def avance(self, index, chor):
-        motor = chor[index]
-        delta = chor[index + 1]
+    async def avance(self, motor, delta):
         direction = self.taichi_directions[motor]
         await self.ears.move(motor, delta, direction)
-        return index + 2
 
-    async def ifne(self, index, chor):
-        if self.taichi_random == chor[index]:
-            return index + 3
-        rel = (chor[index + 1] << 8) + chor[index + 2]
-        if rel >= 32768:  # assumed signed (?)
-            rel = rel - 65536
-        return index + rel + 3
+    async def ifne(self, value, target):
+        """
+        Jump to target instruction if value is not taichi random value.
+        """
+        if self.taichi_random != value:
+            return target
 
-    async def attend(self, index, chor):
+    async def attend(self):
         await self.ears.wait_while_running()
         await self.sound.wait_until_done(self.cancel_event)
-        return index
 
-    async def setmotordir(self, index, chor):
-        motor = chor[index]
-        dir = chor[index + 1]
+    async def setmotordir(self, motor, dir):
         self.taichi_directions[motor] = dir
-        return index + 2
 
-    async def play_binary(self, chor, opcodes="mtl", timescale=0):
-        if chor[0] == 1 and chor[1] == 1 and chor[2] == 1 and chor[3] == 1:
+    # Handlers which only set leds, grouped in frames
+    LED_HANDLERS = frozenset(
+        [
+            set_led_color,
+            set_leds_color,
+            set_led_off,
+            set_led_palette,
+            set_led_palette_streaming,
+        ]
+    )
+
+    # Handlers which wait for ears or sound
+    WAIT_HANDLERS = frozenset([attend])
+
+    # Lateness after which led frames are skipped, in seconds
+    FRAME_DROP_LATENESS = 0.05
+
+    @staticmethod
+    def compile(chor, opcodes="mtl"):
+        """
+        Compile a binary choreography into a program, a tuple of
+        instructions.
+        Each instruction is a wait (in timescale units), an unbound handler
+        and its operands. A None handler ends the program after the wait.
+        """
+        if chor[0:4] == b"\x01\x01\x01\x01":
             # Consider this is the header
-            await self.do_play_binary(4, chor, opcodes, timescale)
+            start_index = 4
         else:
-            await self.do_play_binary(0, chor, opcodes, timescale)
-
-    async def do_play_binary(self, start_index, chor, opcodes, timescale):
-        index = start_index
-        self.timescale = timescale
-
-        next_time = time.time()
+            start_index = 0
         opcode_handlers = ChoreographyInterpreter.OPCODE_HANDLERS[opcodes]
+        instructions = []
+        # byte index of instruction -> instruction index, for jumps
+        pcs = {}
+        jumps = []
+        index = start_index
         while index < len(chor):
+            pcs[index] = len(instructions)
             wait = chor[index]
-            # do some wait now
-            next_time = next_time + (wait * self.timescale / 1000.0)
-            sleep_delta = next_time - time.time()
-            if sleep_delta > 0:
-                await asyncio.sleep(sleep_delta)
             index = index + 2
             if index > len(chor):
                 # taichi.chor ends with a wait
+                instructions.append(Instruction(wait, None, ()))
                 break
             opcode = chor[index - 1]
-            try:
-                opcode_handler = opcode_handlers[opcode]
-                handler = getattr(self, opcode_handler)
-            except IndexError as err:
+            if opcode >= len(opcode_handlers):
                 # 255 apparently used for end.
                 if opcode != 255:
-                    print(f"Unknown opcode {opcode} {err}")
-                return
-            except AttributeError as err:
-                print(f"Unknown opcode {opcode} {err}")
-                return
-            index = await handler(index, chor)
+                    print(f"Unknown opcode {opcode}")
+                instructions.append(Instruction(wait, None, ()))
+                break
+            opcode_handler = opcode_handlers[opcode]
+            if opcode_handler not in ChoreographyInterpreter.OPCODE_OPERANDS:
+                print(f"Unknown opcode {opcode} {opcode_handler}")
+                instructions.append(Instruction(wait, None, ()))
+                break
+            handler = getattr(ChoreographyInterpreter, opcode_handler)
+            size, used = ChoreographyInterpreter.OPCODE_OPERANDS[
+                opcode_handler
+            ]
+            if index + used > len(chor):
+                raise ValueError(
+                    f"Truncated choreography, opcode {opcode} at {index - 1}"
+                )
+            operands = tuple(chor[index : index + used])
+            if opcode_handler == "ifne":
+                value, high, low = operands
+                rel = (high << 8) + low
+                if rel >= 32768:  # assumed signed (?)
+                    rel = rel - 65536
+                jumps.append((len(instructions), index + rel + 3))
+            instructions.append(Instruction(wait, handler, operands))
+            index = index + size
+        end = len(instructions)
+        for pc, target in jumps:
+            if target >= len(chor):
+                target_pc = end
+            elif target in pcs:
+                target_pc = pcs[target]
+            else:
+                raise ValueError(f"Invalid jump target {target}")
+            wait, handler, (value, _, _) = instructions[pc]
+            instructions[pc] = Instruction(wait, handler, (value, target_pc))
+        return tuple(instructions)
+
+    async def play_binary(self, chor, opcodes="mtl", timescale=0):
+        program = ChoreographyInterpreter.compile(chor, opcodes)
+        await self.play_program(program, timescale)
+
+    def set_led(self, led, r, g, b):
+        """
+        Set a led in the current frame.
+        """
+        if self.pending_leds is None:
+            self.leds.set1(led, r, g, b)
+        else:
+            self.pending_leds[led] = (r, g, b)
+
+    def flush_leds(self):
+        """
+        Publish the current frame.
+        """
+        if self.pending_leds:
+            self.leds.set_many(self.pending_leds)
+        self.pending_leds = None
+
+    async def play_program(self, program, timescale=0):
+        """
+        Run a compiled choreography.
+        Instructions are scheduled on the loop monotonic clock. Leds set by
+        consecutive instructions without wait are published as a single
+        frame. When a frame is late by more than FRAME_DROP_LATENESS, the
+        previous frame is merged into it instead of being published, and
+        counted as dropped, so intermediate frames are skipped to catch up.
+        """
+        loop = asyncio.get_event_loop()
+        self.timescale = timescale
+        self.dropped_frames = 0
+        self.pending_leds = None
+        self.catching_up = False
+        latenesses = []
+        next_time = loop.time()
+        pc = 0
+        try:
+            while pc < len(program):
+                wait, handler, operands = program[pc]
+                # do some wait now
+                next_time = next_time + (wait * self.timescale / 1000.0)
+                lateness = loop.time() - next_time
+                if lateness < 0:
+                    self.flush_leds()
+                    await asyncio.sleep(-lateness)
+                    lateness = loop.time() - next_time
+                latenesses.append(lateness)
+                if handler is None:
+                    return
+                if handler in ChoreographyInterpreter.LED_HANDLERS:
+                    self.catching_up = (
+                        lateness > ChoreographyInterpreter.FRAME_DROP_LATENESS
+                    )
+                    if wait and self.pending_leds:
+                        # Previous frame is complete
+                        if self.catching_up:
+                            self.dropped_frames += 1
+                        else:
+                            self.flush_leds()
+                    if self.pending_leds is None:
+                        self.pending_leds = {}
+                else:
+                    self.flush_leds()
+                target = await handler(self, *operands)
+                if handler in ChoreographyInterpreter.WAIT_HANDLERS:
+                    # Waiting is part of the choreography, resume timeline
+                    # from now.
+                    next_time = max(next_time, loop.time())
+                if target is None:
+                    pc = pc + 1
+                else:
+                    pc = target
+        finally:
+            self.flush_leds()
+            self.timing.record_run(latenesses, self.dropped_frames)
 
     async def play_streaming(self, ref):
         ref0 = ref[len(ChoreographyInterpreter.STREAMING_URN) :]
@@ -374,11 +548,11 @@ class ChoreographyInterpreter:
                         Ears.RIGHT_EAR, pos, Ears.FORWARD_DIRECTION
                     )
                     chorst_oreille_chance = (chorst_oreille_chance + 1) % 4
-            file = await Resources.find(
-                "choreographies",
-                ChoreographyInterpreter.STREAMING_CHOREGRAPHIES,
-            )
-            chor = file.read_bytes()
+            programs = await ChoreographyInterpreter.streaming_programs()
+            if programs == []:
+                logging.error("No streaming choreography found")
+                return
+            program = random.choice(programs)
             chorst_tempo = 160 + random.randint(0, 90)
             chorst_loops = 3 + random.randint(0, 17)
             if self.current_palette_is_random:
@@ -391,7 +565,83 @@ class ChoreographyInterpreter:
                 random.randint(0, 7),
             ]
             for ix in range(chorst_loops):
-                await self.play_binary(chor, "streaming", chorst_tempo)
+                await self.play_program(program, chorst_tempo)
+
+    # (resource index, index generation, locale, programs)
+    streaming_pool = None
+
+    @staticmethod
+    async def streaming_programs():
+        """
+        Return compiled streaming choreographies.
+        They are loaded once and reloaded when the resource index or the
+        locale changes.
+        """
+        from .i18n import get_locale
+
+        locale = await get_locale()
+        index = Resources.get_index()
+        pool = ChoreographyInterpreter.streaming_pool
+        if pool is not None and pool[0:3] == (index, index.generation, locale):
+            return pool[3]
+        generation = index.generation
+        files = await Resources.find_all(
+            "choreographies", ChoreographyInterpreter.STREAMING_CHOREGRAPHIES
+        )
+        programs = [
+            ChoreographyInterpreter._compile_file(
+                file.as_posix(), file.stat().st_mtime_ns, "streaming"
+            )
+            for file in files
+        ]
+        ChoreographyInterpreter.streaming_pool = (
+            index,
+            generation,
+            locale,
+            programs,
+        )
+        return programs
+
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _read_file(filename, mtime_ns):
+        return Path(filename).read_bytes()
+
+    @staticmethod
+    async def load(ref):
+        """
+        Find a choreography resource and read it.
+        Return the path and the contents, or (None, None) if not found.
+        Contents are cached, keyed by path and modification time.
+        """
+        file = await Resources.find("choreographies", ref)
+        if file is None:
+            return None, None
+        mtime_ns = file.stat().st_mtime_ns
+        chor = ChoreographyInterpreter._read_file(file.as_posix(), mtime_ns)
+        return file, chor
+
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _compile_file(filename, mtime_ns, opcodes):
+        chor = ChoreographyInterpreter._read_file(filename, mtime_ns)
+        return ChoreographyInterpreter.compile(chor, opcodes)
+
+    @staticmethod
+    async def load_program(ref, opcodes="mtl"):
+        """
+        Find a choreography resource and compile it.
+        Return the path and the program, or (None, None) if not found.
+        Programs are cached, keyed by path, modification time and opcodes.
+        """
+        file = await Resources.find("choreographies", ref)
+        if file is None:
+            return None, None
+        mtime_ns = file.stat().st_mtime_ns
+        program = ChoreographyInterpreter._compile_file(
+            file.as_posix(), mtime_ns, opcodes
+        )
+        return file, program
 
     async def start(self, ref):
         if ref != self.running_ref:
@@ -429,9 +679,11 @@ class ChoreographyInterpreter:
                 await self.play_binary(chor)
             else:
                 # Assume a resource for now.
-                file = await Resources.find("choreographies", ref)
-                chor = file.read_bytes()
-                await self.play_binary(chor)
+                _, program = await ChoreographyInterpreter.load_program(ref)
+                if program is None:
+                    logging.error(f"Choreography {ref} not found")
+                else:
+                    await self.play_program(program)
         except asyncio.CancelledError:
             raise
         except Exception:
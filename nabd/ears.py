@@ -73,3 +73,81 @@ class Ears(object, metaclass=abc.ABCMeta):
         Determine if ear is apparently broken
         """
         raise NotImplementedError("Should have implemented")
+
+
+class EarTracker(object):
+    """
+    Position of an ear, maintained from issued commands and from positions
+    reported by the driver, with a confidence level.
+    A physical detection is only required when confidence is UNKNOWN.
+    """
+
+    # Position is unknown, e.g. ear was moved by hand
+    UNKNOWN = 0
+    # Position is expected from issued commands, motor may still be running
+    EXPECTED = 1
+    # Position was reported by the driver or motor stopped after commands
+    CONFIRMED = 2
+
+    def __init__(self):
+        self.position = None
+        self.confidence = EarTracker.UNKNOWN
+        # Whether we are waiting for the driver to report the position
+        self.querying = False
+
+    def go(self, position):
+        """
+        A command to go to a specific position was issued.
+        """
+        self.position = position % Ears.STEPS
+        self.confidence = EarTracker.EXPECTED
+        self.querying = False
+
+    def move(self, delta, direction):
+        """
+        A command to move by a delta in a direction was issued.
+        """
+        self.querying = False
+        if self.position is None:
+            return
+        if direction:
+            delta = -delta
+        self.position = (self.position + delta) % Ears.STEPS
+        self.confidence = EarTracker.EXPECTED
+
+    def stopped(self):
+        """
+        Motor stopped, issued commands were executed.
+        """
+        if self.confidence == EarTracker.EXPECTED:
+            self.confidence = EarTracker.CONFIRMED
+
+    def moved(self):
+        """
+        Ear was moved by hand.
+        """
+        self.position = None
+        self.confidence = EarTracker.UNKNOWN
+
+    def query(self):
+        """
+        Position was queried to the driver.
+        """
+        self.querying = True
+
+    def report(self, position):
+        """
+        Driver reported the position, None meaning it does not know it.
+        Reports are ignored if a command was issued since the query.
+        """
+        if not self.querying:
+            return
+        self.querying = False
+        if position is None:
+            self.moved()
+        else:
+            self.position = position
+            self.confidence = EarTracker.CONFIRMED
+
+    def is_known(self):
+        return self.confidence != EarTracker.UNKNOWN
@@ -1,9 +1,10 @@
 import asyncio
+import collections
 import logging
 import os
 from concurrent.futures import ThreadPoolExecutor
 
-from .ears import Ears
+from .ears import Ears, EarTracker
 
 
 class EarsDev(Ears):  # pragma: no cover
@@ -15,19 +16,24 @@ class EarsDev(Ears):  # pragma: no cover
     def __init__(self):
         self.fds = [None, None]
         self.callback = None
-        self.positions = [None, None]
+        # Expected position of ears, avoiding queries and detections
+        self.trackers = [EarTracker(), EarTracker()]
         for i in range(0, 2):
             ear = os.open("/dev/ear" + str(i), os.O_RDWR)
             try:
+                self.trackers[i].query()
                 os.write(ear, b"?")
                 self.fds[i] = ear
                 asyncio.get_event_loop().add_reader(ear, self._do_read, i)
             except Exception:
                 logging.error(f"ear {i} is apparently broken")
                 os.close(ear)
+        # Pending motor commands, per ear
+        self.queues = [collections.deque(), collections.deque()]
+        # Executor for blocking NOP writes, waiting for motors to stop
         self.executor = ThreadPoolExecutor(max_workers=1)
-        # Lock preventing detection and move operations happening
-        # simultaneously
+        # Lock held while a blocking operation (wait or detection) is
+        # running. Motor commands are queued in the meantime.
         self.lock = asyncio.Lock()
 
     def _do_read(self, ear):
@@ -38,17 +44,19 @@ class EarsDev(Ears):  # pragma: no cover
             fd = self.fds[ear]
             asyncio.get_event_loop().remove_reader(fd)
             os.close(fd)
-            self.positions[ear] = None
+            self.trackers[ear].moved()
             self.fds[ear] = None
+            self.queues[ear].clear()
         else:
             if byte == b"m":
+                self.trackers[ear].moved()
                 if self.callback:
                     (loop, callback) = self.callback
                     loop.call_soon_threadsafe(lambda ear=ear: callback(ear))
             elif byte == b"\xff":
-                self.positions[ear] = None
+                self.trackers[ear].report(None)
             else:
-                self.positions[ear] = byte[0]
+                self.trackers[ear].report(byte[0])
 
     def on_move(self, loop, callback):
         """
@@ -61,21 +69,8 @@ class EarsDev(Ears):  # pragma: no cover
 
     async def reset_ears(self, target_left, target_right):
         """Reset the ears to a known position"""
-        async with self.lock:
-            await asyncio.get_event_loop().run_in_executor(
-                self.executor, self._do_reset_ears, target_left, target_right
-            )
-
-    def _do_reset_ears(self, target_left, target_right):
-        """
-        Reset ears by running a detection and ignoring the result.
-        Thread: executor
-        Lock: acquired
-        """
-        if self.fds[0] is not None:
-            os.write(self.fds[0], b">" + bytes([target_left]))
-        if self.fds[1] is not None:
-            os.write(self.fds[1], b">" + bytes([target_right]))
+        self._send(0, b">" + bytes([target_left]), True)
+        self._send(1, b">" + bytes([target_right]), True)
 
     async def move(self, motor, delta, direction):
         """
@@ -83,32 +78,71 @@ class EarsDev(Ears):  # pragma: no cover
         May run a complete turn.
         Returns before ear reached requested position.
         """
-        async with self.lock:
-            await asyncio.get_event_loop().run_in_executor(
-                self.executor, self._do_move, motor, delta, direction
-            )
-
-    def _do_move(self, motor, delta, direction):
-        """
-        Move a given ear by a delta in a given direction.
-        Thread: executor
-        Lock: acquired
-        """
         if direction:
             cmd = b"-"
         else:
             cmd = b"+"
-        if self.fds[motor] is not None:
-            os.write(self.fds[motor], cmd + bytes([delta]))
+        self._send(motor, cmd + bytes([delta]), False)
+
+    def _send(self, ear, command, absolute):
+        """
+        Send a motor command to an ear.
+        Motor commands do not block and are written from the event loop,
+        unless a blocking operation is running: they are then queued and
+        written once it is done.
+        An absolute command (go to a position) supersedes any pending
+        command for the same ear.
+        Thread: event loop
+        """
+        if self.fds[ear] is None:
+            return
+        queue = self.queues[ear]
+        if absolute:
+            queue.clear()
+        queue.append(command)
+        if not self.lock.locked():
+            self._flush(ear)
+
+    def _flush(self, ear):
+        """
+        Write pending motor commands of an ear.
+        Thread: event loop
+        """
+        queue = self.queues[ear]
+        tracker = self.trackers[ear]
+        while queue and self.fds[ear] is not None:
+            command = queue.popleft()
+            os.write(self.fds[ear], command)
+            if command[0:1] in (b"<", b">"):
+                tracker.go(command[1])
+            else:
+                tracker.move(command[1], command[0:1] == b"-")
+
+    async def _run_blocking(self, func, queried=()):
+        """
+        Run a blocking operation on the executor, then write motor commands
+        that were queued in the meantime.
+        queried are the ears whose position is queried by the operation.
+        """
+        async with self.lock:
+            for ear in queried:
+                self.trackers[ear].query()
+            try:
+                await asyncio.get_event_loop().run_in_executor(
+                    self.executor, func
+                )
+                # Blocking operations wait until motors stopped
+                for tracker in self.trackers:
+                    tracker.stopped()
+            finally:
+                self._flush(0)
+                self._flush(1)
 
     async def wait_while_running(self):
         """
         Wait until both ears stopped.
         """
-        async with self.lock:
-            await asyncio.get_event_loop().run_in_executor(
-                self.executor, self._do_wait_while_running
-            )
+        await self._run_blocking(self._do_wait_while_running)
 
     def _do_wait_while_running(self):
         """
@@ -125,39 +159,49 @@ class EarsDev(Ears):  # pragma: no cover
     async def get_positions(self):
         """
         Get the position of the ears, without running any detection.
+        The driver is only queried for ears whose position is unknown.
         """
-        async with self.lock:
-            await asyncio.get_event_loop().run_in_executor(
-                self.executor, lambda: self._do_detect_positions(False)
-            )
-            return (self.positions[0], self.positions[1])
+        return await self._positions(b"?")
 
     async def detect_positions(self):
         """
         Get the position of the ears, running a detection if required.
-        """
-        async with self.lock:
-            await asyncio.get_event_loop().run_in_executor(
-                self.executor, lambda: self._do_detect_positions(True)
+        Detection only runs for ears whose position is unknown.
+        """
+        return await self._positions(b"!")
+
+    async def _positions(self, command):
+        unknown = [
+            ear
+            for ear in range(0, 2)
+            if self.fds[ear] is not None and not self.trackers[ear].is_known()
+        ]
+        if unknown:
+            await self._run_blocking(
+                lambda: self._do_query_positions(command, unknown), unknown
             )
-            return (self.positions[0], self.positions[1])
+        return (self.trackers[0].position, self.trackers[1].position)
 
-    def _do_detect_positions(self, run_detection):
+    def _do_query_positions(self, command, ears):
         """
-        Get the position of the ears, running a detection if requested.
+        Query the position of some ears, with ? or ! (running a detection if
+        required) command.
         Thread: executor
         Lock: acquired
         """
-        if run_detection:
-            command = b"!"
-        else:
-            command = b"?"
-        if self.fds[0] is not None:
-            os.write(self.fds[0], command)
-        if self.fds[1] is not None:
-            os.write(self.fds[1], command)
+        for ear in ears:
+            fd = self.fds[ear]
+            if fd is not None:
+                os.write(fd, command)
         self._do_wait_while_running()
 
+    def get_confidence(self, ear):
+        """
+        Get the confidence level of the expected position of an ear, as one
+        of EarTracker constants.
+        """
+        return self.trackers[ear].confidence
+
     async def go(self, ear, position, direction):
         """
         Go to a specific position.
@@ -167,22 +211,11 @@ class EarsDev(Ears):  # pragma: no cover
         complete turn.
         Returns before ear reached requested position.
         """
-        async with self.lock:
-            await asyncio.get_event_loop().run_in_executor(
-                self.executor, self._do_go, ear, position, direction
-            )
-
-    def _do_go(self, ear, position, direction):
-        """
-        Actually go to a specific position.
-        Lock: acquired.
-        """
         if direction:
             cmd = b"<"
         else:
             cmd = b">"
-        if self.fds[ear] is not None:
-            os.write(self.fds[ear], cmd + bytes([position]))
+        self._send(ear, cmd + bytes([position]), True)
 
     def is_broken(self, ear):
         """
@@ -11,6 +11,39 @@ class Config(singleton_model.SingletonModel):
         app_label = "nabd"
 
 
-async def get_locale():
+# Locale held in memory, loaded on first use. nabd is notified of changes
+# with config-update packets and then calls reload_locale.
+_current_locale = None
+
+
+def load_locale():
+    """
+    Load locale from the database and keep it in memory.
+    """
+    global _current_locale
+    _current_locale = Config.load().locale
+    return _current_locale
+
+
+async def reload_locale():
+    """
+    Reload locale from the database and keep it in memory.
+    """
+    global _current_locale
     config = await Config.load_async()
-    return config.locale
+    _current_locale = config.locale
+    return _current_locale
+
+
+def clear_locale():
+    """
+    Forget locale held in memory, so it is read again from the database.
+    """
+    global _current_locale
+    _current_locale = None
+
+
+async def get_locale():
+    if _current_locale is None:
+        return await reload_locale()
+    return _current_locale
@@ -0,0 +1,121 @@
+import itertools
+import re
+
+# Tokens of rule bodies: rule references, operators and words
+TOKEN_RE = re.compile(r"<[^>]+>|[()\[\]|+*]|[^\s()\[\]|+*<>]+")
+
+
+def parse_grammar(text):
+    """
+    Parse a JSGF grammar.
+    Return a dictionary of rule names to lists of tokens, and the name of
+    the public rule.
+    Only the subset of JSGF used by ASR grammars is supported: no weights,
+    tags or imports.
+    """
+    text = re.sub(r"//[^\n]*", "", text)
+    rules = {}
+    public = None
+    for statement in text.split(";"):
+        statement = statement.strip()
+        if statement == "" or statement.startswith(("#JSGF", "grammar ")):
+            continue
+        match = re.match(r"(public\s+)?(<[^>]+>)\s*=(.*)", statement, re.S)
+        if match is None:
+            raise ValueError(f"Invalid grammar statement: {statement}")
+        name = match.group(2)
+        rules[name] = TOKEN_RE.findall(match.group(3))
+        if match.group(1) is not None:
+            public = name
+    if public is None:
+        raise ValueError("Grammar has no public rule")
+    return rules, public
+
+
+class GrammarExpander(object):
+    """
+    Expand a JSGF grammar into the phrases it accepts.
+    Repeated items (with + or *) are only expanded once.
+    """
+
+    def __init__(self, rules, max_phrases=100000):
+        self.rules = rules
+        self.max_phrases = max_phrases
+        self.cache = {}
+
+    def expand_rule(self, name):
+        """
+        Return the phrases of a rule, as tuples of words.
+        """
+        if name not in self.cache:
+            if name not in self.rules:
+                raise ValueError(f"Undefined rule {name}")
+            # Guard against recursive rules
+            self.cache[name] = None
+            tokens = self.rules[name]
+            phrases, end = self._alternatives(tokens, 0)
+            if end != len(tokens):
+                raise ValueError(f"Unbalanced rule {name}")
+            self.cache[name] = phrases
+        elif self.cache[name] is None:
+            raise ValueError(f"Recursive rule {name}")
+        return self.cache[name]
+
+    def _alternatives(self, tokens, index):
+        """
+        Expand alternatives until a closing bracket or the end of tokens.
+        Return phrases and index of the closing bracket.
+        """
+        phrases = []
+        while True:
+            sequence, index = self._sequence(tokens, index)
+            phrases.extend(sequence)
+            if index < len(tokens) and tokens[index] == "|":
+                index += 1
+            else:
+                break
+        # Remove duplicates, preserving order
+        return list(dict.fromkeys(phrases)), index
+
+    def _sequence(self, tokens, index):
+        """
+        Expand a sequence of items until an alternative separator, a
+        closing bracket or the end of tokens.
+        """
+        phrases = [()]
+        # Phrases before last item, for * repetition
+        previous = phrases
+        while index < len(tokens) and tokens[index] not in "|)]":
+            token = tokens[index]
+            if token in "([":
+                items, index = self._alternatives(tokens, index + 1)
+                closing = ")" if token == "(" else "]"
+                if index >= len(tokens) or tokens[index] != closing:
+                    raise ValueError(f"Missing {closing}")
+                if token == "[":
+                    items = [()] + items
+            elif token in "+*":
+                # Repetition is expanded once, * means last item is optional
+                if token == "*":
+                    phrases = list(dict.fromkeys(phrases + previous))
+                index += 1
+                continue
+            elif token.startswith("<"):
+                items = self.expand_rule(token)
+            else:
+                items = [(token,)]
+            index += 1
+            previous = phrases
+            phrases = [
+                prefix + item
+                for prefix, item in itertools.product(phrases, items)
+            ]
+            if len(phrases) > self.max_phrases:
+                raise ValueError("Too many phrases in grammar")
+        return phrases, index
+
+    def expand(self, name):
+        """
+        Return the phrases of a rule, as strings.
+        """
+        return [" ".join(words) for words in self.expand_rule(name)]
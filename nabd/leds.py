@@ -1,4 +1,5 @@
 import abc
+import functools
 import time
 from enum import Enum, unique
 from threading import Condition, Lock, Thread
@@ -23,6 +24,20 @@ class Leds(object, metaclass=abc.ABCMeta):
         """
         raise NotImplementedError("Should have implemented")
 
+    def set_many(self, colors):
+        """
+        Set the color of several leds at once.
+        colors maps leds to (red, green, blue) tuples.
+        """
+        for led, (red, green, blue) in colors.items():
+            self.set1(led, red, green, blue)
+
+    def set_low_power(self, enabled):
+        """
+        Enter or leave low power mode, where animations are suspended.
+        """
+        pass
+
     @abc.abstractmethod
     def pulse(self, led, red, green, blue):
         """
@@ -54,13 +69,55 @@ class LedsSoft(Leds, metaclass=abc.ABCMeta):
     def __init__(self):
         self.condition = Condition()
         self.pending = []
+        # led -> [pulse table, index of next value]
         self.pulsing = {}
+        # led -> last color actually set
+        self.pixels = {}
         self.pending_lock = Lock()
         self.last_pulse = None
+        self.low_power = False
         self.running = True
         self.thread = Thread(target=self.run, daemon=True)
         self.thread.start()
 
+    @staticmethod
+    @functools.lru_cache(maxsize=32)
+    def pulse_table(target, steps):
+        """
+        Compute the colors of one pulse cycle to a target color, going from
+        black to target color and back to black, one color per tick.
+        """
+        incr = tuple(component / steps for component in target)
+        current = (0, 0, 0)
+        direction = 1
+        table = []
+        while len(table) <= 4 * (steps + 1):
+            if direction == 1 and all(
+                t == int(c) for t, c in zip(target, current)
+            ):
+                direction = -1
+            elif direction == -1 and all(int(c) == 0 for c in current):
+                break
+            if direction == 1:
+                current = tuple(
+                    min(c + i, t) for c, i, t in zip(current, incr, target)
+                )
+            else:
+                current = tuple(max(c - i, 0) for c, i in zip(current, incr))
+            table.append(tuple(int(c) for c in current))
+        return tuple(table)
+
+    def set_pixel(self, led, color):
+        """
+        Set a led if its color changed.
+        Return True if it was set.
+        """
+        if self.pixels.get(led) == color:
+            return False
+        self.pixels[led] = color
+        self.do_set(led, *color)
+        return True
+
     def run(self):
         with self.condition:
             while self.running:
@@ -68,77 +125,29 @@ class LedsSoft(Leds, metaclass=abc.ABCMeta):
                 with self.pending_lock:
                     for cmd, led, (r, g, b) in self.pending:
                         if cmd == "pulse":
-                            self.do_set(led, 0, 0, 0)
-                            show = True
-                            if self.last_pulse is None:
-                                self.last_pulse = time.time()
-                            color_incr = (
-                                r / LedsSoft.PULSING_STEPS,
-                                g / LedsSoft.PULSING_STEPS,
-                                b / LedsSoft.PULSING_STEPS,
-                            )
-                            self.pulsing[led] = (
-                                (r, g, b),
-                                (0, 0, 0),
-                                1,
-                                color_incr,
+                            show |= self.set_pixel(led, (0, 0, 0))
+                            table = LedsSoft.pulse_table(
+                                (r, g, b), LedsSoft.PULSING_STEPS
                             )
+                            self.pulsing[led] = [table, 0]
                         elif cmd == "set":
                             if led in self.pulsing:
                                 del self.pulsing[led]
-                            self.do_set(led, r, g, b)
-                            show = True
+                            show |= self.set_pixel(led, (r, g, b))
                     self.pending = []
                 next_pulse = None
-                if len(self.pulsing) > 0:
+                if len(self.pulsing) > 0 and not self.low_power:
                     now = time.time()
+                    if self.last_pulse is None:
+                        self.last_pulse = now
                     next_pulse = self.last_pulse + LedsSoft.PULSING_RATE
                     if now >= next_pulse:
                         self.last_pulse = next_pulse
                         next_pulse = next_pulse + LedsSoft.PULSING_RATE
-                        new_pulsing = {}
                         for led, pulse in self.pulsing.items():
-                            (
-                                target,
-                                (current_r, current_g, current_b),
-                                direction,
-                                incr,
-                            ) = pulse
-                            (target_r, target_g, target_b) = target
-                            (incr_r, incr_g, incr_b) = incr
-                            if (
-                                direction == 1
-                                and target_r == int(current_r)
-                                and target_g == int(current_g)
-                                and target_b == int(current_b)
-                            ):
-                                direction = -1
-                            elif (
-                                direction == -1
-                                and int(current_r) == 0
-                                and int(current_g) == 0
-                                and int(current_b) == 0
-                            ):
-                                direction = 1
-                            if direction == 1:
-                                new_r = min(current_r + incr_r, target_r)
-                                new_g = min(current_g + incr_g, target_g)
-                                new_b = min(current_b + incr_b, target_b)
-                            else:
-                                new_r = max(current_r - incr_r, 0)
-                                new_g = max(current_g - incr_g, 0)
-                                new_b = max(current_b - incr_b, 0)
-                            self.do_set(
-                                led, int(new_r), int(new_g), int(new_b)
-                            )
-                            show = True
-                            new_pulsing[led] = (
-                                target,
-                                (new_r, new_g, new_b),
-                                direction,
-                                incr,
-                            )
-                        self.pulsing = new_pulsing
+                            table, index = pulse
+                            show |= self.set_pixel(led, table[index])
+                            pulse[1] = (index + 1) % len(table)
                 else:
                     self.last_pulse = None
                 if show:
@@ -161,11 +170,26 @@ class LedsSoft(Leds, metaclass=abc.ABCMeta):
         with self.condition:
             self.condition.notify()
 
-    def setall(self, red, green, blue):
+    def set_many(self, colors):
+        """
+        Publish a frame: all leds are set by the thread with a single show.
+        """
         with self.pending_lock:
-            for led in list(Led):
-                self.pending.append(("set", led, (red, green, blue)))
+            for led, color in colors.items():
+                self.pending.append(("set", led, color))
+        with self.condition:
+            self.condition.notify()
+
+    def setall(self, red, green, blue):
+        self.set_many({led: (red, green, blue) for led in list(Led)})
+
+    def set_low_power(self, enabled):
+        """
+        In low power mode, pulses are frozen and the thread only wakes up
+        when leds are set.
+        """
         with self.condition:
+            self.low_power = enabled
             self.condition.notify()
 
     def stop(self):
@@ -0,0 +1,112 @@
+import asyncio
+import gc
+import json
+import platform
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nabd.benchmark import PipelineBenchmark, load_corpus, peak_rss
+from nabd.models import ModelManager
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark ASR and NLU with a corpus of recorded utterances, "
+        "reporting real-time factor, latency, memory and accuracy as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "corpus",
+            type=str,
+            help="Corpus directory, with a sub-directory per locale holding "
+            "WAV files and corpus.json",
+        )
+        parser.add_argument(
+            "--locale",
+            action="append",
+            help="Locale to benchmark (default: all locales of corpus)",
+        )
+        parser.add_argument(
+            "--pacing",
+            type=float,
+            nargs="+",
+            default=[1.0, 0.0],
+            help="Speed of audio feed relative to real time, 0 for as fast "
+            "as possible (default: 1 0)",
+        )
+        parser.add_argument(
+            "--no-nlu-cache",
+            action="store_true",
+            help="Always interpret with Snips, bypassing phrase table and "
+            "cache",
+        )
+        parser.add_argument(
+            "--output", type=str, help="Output file (default: stdout)"
+        )
+
+    def handle(self, *args, **options):
+        corpus = Path(options["corpus"])
+        if not corpus.is_dir():
+            raise CommandError(f"Corpus directory {corpus} not found")
+        if options["locale"]:
+            locales = options["locale"]
+        else:
+            locales = sorted(
+                path.name
+                for path in corpus.iterdir()
+                if path.joinpath("corpus.json").is_file()
+            )
+        report = {
+            "machine": platform.machine(),
+            "python": platform.python_version(),
+            "pacings": options["pacing"],
+            "nlu_cache": not options["no_nlu_cache"],
+            "locales": {},
+        }
+        for locale in locales:
+            self.stderr.write(f"Benchmarking {locale}")
+            report["locales"][locale] = asyncio.run(
+                self.benchmark(corpus.joinpath(locale), locale, options)
+            )
+            gc.collect()
+        report["peak_rss"] = peak_rss()
+        output = json.dumps(report, indent=1, ensure_ascii=False)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    async def benchmark(self, directory, locale, options):
+        utterances = load_corpus(directory)
+        rss = ModelManager.rss()
+        start = time.monotonic()
+        asr = ModelManager.load_asr(locale)
+        asr_loaded = time.monotonic()
+        nlu = ModelManager.load_nlu(locale)
+        nlu_loaded = time.monotonic()
+        if options["no_nlu_cache"]:
+            from nabd.nlu_cache import NLUCache
+
+            nlu.cache = NLUCache(0)
+        result = {
+            "utterances": len(utterances),
+            "asr_load_time": round(asr_loaded - start, 3),
+            "nlu_load_time": round(nlu_loaded - asr_loaded, 3),
+            "models_rss": ModelManager.rss() - rss,
+            "runs": {},
+        }
+        benchmark = PipelineBenchmark(asr, nlu)
+        for pacing in options["pacing"]:
+            results = []
+            for utterance in utterances:
+                results.append(await benchmark.run(utterance, pacing))
+            result["runs"][str(pacing)] = {
+                "summary": PipelineBenchmark.summary(results),
+                "results": results,
+            }
+        result["peak_rss"] = peak_rss()
+        return result
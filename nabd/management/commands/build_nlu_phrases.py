@@ -0,0 +1,99 @@
+import glob
+import json
+import os
+import re
+from pathlib import Path
+
+import yaml
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from nabd.jsgf import GrammarExpander, parse_grammar
+from nabd.nlu_cache import NLUCache, normalize
+
+# Slot markup of training utterances: [slot:entity](value)
+SLOT_RE = re.compile(r"\[[^\]:]+:[^\]]+\]\(([^)]*)\)")
+
+
+class Command(BaseCommand):
+    help = (
+        "Build tables of phrases accepted by the ASR grammar and their "
+        "intent, so nabd does not run Snips on them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "language",
+            nargs="*",
+            type=str,
+            help="Languages to build tables for (default: en fr)",
+        )
+
+    def handle(self, *args, **options):
+        languages = options["language"] or ["en", "fr"]
+        for language in languages:
+            self.build(language)
+
+    def build(self, language):
+        from snips_nlu import SnipsNLUEngine
+
+        from nabd.nlu import NLU
+
+        base_dir = Path(settings.BASE_DIR)
+        grammar = base_dir.joinpath("asr", f"nabaztag-grammar-{language}.jsgf")
+        with open(grammar, "r") as f:
+            rules, public = parse_grammar(f.read())
+        expander = GrammarExpander(rules)
+        fillers = expander.expand("<euh>") if "<euh>" in rules else []
+        phrases = set(expander.expand(public))
+        phrases.update(self.training_utterances(base_dir, language))
+        engine = SnipsNLUEngine.from_path(
+            base_dir.joinpath("nabd", "nlu", f"engine_{language}").as_posix()
+        )
+        table = {}
+        skipped = 0
+        for phrase in sorted({normalize(p, fillers) for p in phrases}):
+            if phrase == "":
+                continue
+            parsed = engine.parse(phrase)
+            if not NLUCache.is_static(parsed):
+                # Depends on current date, let Snips resolve it
+                skipped += 1
+                continue
+            table[phrase] = NLU.convert(parsed)
+        path = base_dir.joinpath("nabd", "nlu", f"phrases_{language}.json")
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "version": NLUCache.FORMAT_VERSION,
+                    "fillers": fillers,
+                    "phrases": table,
+                },
+                f,
+                ensure_ascii=False,
+                indent=1,
+                sort_keys=True,
+            )
+        os.replace(tmp_path, path)
+        understood = sum(1 for result in table.values() if result is not None)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{language}: {len(table)} phrases ({understood} with an "
+                f"intent), {skipped} phrases depending on date skipped"
+            )
+        )
+
+    def training_utterances(self, base_dir, language):
+        """
+        Read utterances of NLU training data, with slot values in place of
+        slot markup.
+        """
+        pattern = base_dir.joinpath("*", "nlu", f"intent_{language}.yaml")
+        for filename in sorted(glob.glob(pattern.as_posix())):
+            with open(filename, "r") as f:
+                for document in yaml.safe_load_all(f):
+                    if not document or document.get("type") != "intent":
+                        continue
+                    for utterance in document.get("utterances", []):
+                        yield SLOT_RE.sub(r"\1", utterance)
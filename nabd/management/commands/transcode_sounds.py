@@ -0,0 +1,151 @@
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from nabd.sound_variants import SoundVariants
+
+
+class Command(BaseCommand):
+    help = (
+        "Transcode sounds to the native playback format, so they are not "
+        "decoded at play time"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("app", nargs="*", type=str)
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Transcode sounds even if variant is up to date",
+        )
+        parser.add_argument(
+            "--max-size",
+            type=int,
+            default=SoundVariants.MAX_SIZE >> 20,
+            help="Maximum size of variants, in MB (default: "
+            f"{SoundVariants.MAX_SIZE >> 20}), sounds beyond are decoded at "
+            "play time",
+        )
+
+    def handle(self, *args, **options):
+        if options["app"] == []:
+            apps = []
+            for app in settings.INSTALLED_APPS:
+                app_dir = os.path.join(settings.BASE_DIR, app)
+                if os.path.exists(app_dir):
+                    apps.append(app)
+        else:
+            apps = options["app"]
+        SoundVariants.cache_dir.mkdir(parents=True, exist_ok=True)
+        manifest = SoundVariants.read_manifest()
+        if options["app"] == []:
+            # Forget sounds of apps that were removed
+            app_dirs = [
+                Path(settings.BASE_DIR, app).as_posix() + "/" for app in apps
+            ]
+            manifest = {
+                path: entry
+                for path, entry in manifest.items()
+                if any(path.startswith(app_dir) for app_dir in app_dirs)
+            }
+        self.max_size = options["max_size"] << 20
+        # Size of variants referenced by manifest
+        self.variants = {entry["variant"] for entry in manifest.values()}
+        self.size = sum(
+            path.stat().st_size
+            for path in SoundVariants.cache_dir.glob("*.wav")
+            if path.name in self.variants
+        )
+        self.over_budget = 0
+        transcoded = 0
+        for app in apps:
+            sounds_dir = Path(settings.BASE_DIR, app, "sounds")
+            for root, dirs, files in os.walk(sounds_dir):
+                for file in sorted(files):
+                    if file.startswith("."):
+                        continue
+                    path = Path(root, file)
+                    if self.process(path, manifest, options["force"]):
+                        transcoded += 1
+                        # Save progress, transcoding everything takes time
+                        SoundVariants.write_manifest(manifest)
+        # Forget sounds that were removed
+        for path in [path for path in manifest if not Path(path).is_file()]:
+            del manifest[path]
+        SoundVariants.write_manifest(manifest)
+        removed, size = self.remove_unused_variants(manifest)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Transcoded {transcoded} sounds, removed {removed} unused "
+                f"variants, {len(manifest)} variants use {size >> 20} MB"
+            )
+        )
+        if self.over_budget:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{self.over_budget} sounds were not transcoded as "
+                    f"variants would use more than {self.max_size >> 20} MB"
+                )
+            )
+
+    def process(self, path, manifest, force):
+        """
+        Transcode a sound if required.
+        Return True if it was transcoded.
+        """
+        key = path.as_posix()
+        stat = path.stat()
+        entry = manifest.get(key)
+        if (
+            not force
+            and entry is not None
+            and (entry["mtime_ns"], entry["size"])
+            == (stat.st_mtime_ns, stat.st_size)
+            and SoundVariants.cache_dir.joinpath(entry["variant"]).is_file()
+        ):
+            return False
+        manifest.pop(key, None)
+        try:
+            if not SoundVariants.needs_variant(path):
+                return False
+            variant = SoundVariants.digest(path)
+            variant_path = SoundVariants.cache_dir.joinpath(variant)
+            # Identical files share the same variant
+            if force or not variant_path.is_file():
+                SoundVariants.transcode(path, variant_path)
+            if variant not in self.variants:
+                size = variant_path.stat().st_size
+                if self.size + size > self.max_size:
+                    variant_path.unlink()
+                    self.over_budget += 1
+                    return False
+                self.size += size
+                self.variants.add(variant)
+        except Exception as err:
+            self.stdout.write(self.style.ERROR(f"Skipping {path}: {err}"))
+            return False
+        manifest[key] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "variant": variant,
+        }
+        return True
+
+    def remove_unused_variants(self, manifest):
+        """
+        Remove variants which are not referenced by the manifest.
+        Return the number of removed variants and the size of remaining
+        variants.
+        """
+        used = {entry["variant"] for entry in manifest.values()}
+        removed = 0
+        size = 0
+        for path in SoundVariants.cache_dir.glob("*.wav"):
+            if path.name in used:
+                size += path.stat().st_size
+            else:
+                path.unlink()
+                removed += 1
+        return removed, size
@@ -0,0 +1,222 @@
+import asyncio
+import collections
+import gc
+import os
+
+# Models used for ASR, switched atomically.
+ModelSet = collections.namedtuple(
+    "ModelSet", ["asr_locale", "nlu_locale", "asr", "nlu"]
+)
+
+# A loaded model and the memory it approximately uses, in bytes.
+LoadedModel = collections.namedtuple("LoadedModel", ["model", "size"])
+
+
+class ModelManager(object):
+    """
+    Double-buffered ASR and NLU models.
+    Models for a new locale are loaded on an executor while current models
+    keep serving requests, and are switched atomically once both are ready.
+    Previous models are only released after the switch, unless they are
+    kept warm: the models of the warm_locales most recently used locales
+    stay loaded, so switching back to them is immediate.
+    Memory used by loaded models is bounded by memory_ceiling. If loading
+    a model alongside resident ones could exceed it, models of other
+    locales are released before loading, including current models as a
+    last resort.
+    Thread: event loop, unless specified otherwise
+    """
+
+    # About one set of Kaldi and Snips models: a Pi Zero also runs
+    # PostgreSQL and services with 512 MB, so by default models are released
+    # before new ones are loaded. Raise it for double buffering.
+    MEMORY_CEILING = 192 << 20
+
+    def __init__(self, warm_locales=1, memory_ceiling=MEMORY_CEILING):
+        self.warm_locales = warm_locales
+        self.memory_ceiling = memory_ceiling
+        self.current = None
+        # (kind, locale) -> LoadedModel, least recently used first
+        self.resident = collections.OrderedDict()
+        # (kind, locale) -> size of last load, kept after release
+        self.sizes = {}
+        # (asr_locale, nlu_locale) of recently used locales, most recent
+        # last
+        self.recent = []
+        self.switches = 0
+        self.warm_hits = 0
+        self.lock = asyncio.Lock()
+
+    @staticmethod
+    def get_locales(locale):
+        """
+        Get ASR and NLU locales, importing their modules.
+        Thread: executor
+        """
+        from .asr import ASR
+        from .nlu import NLU
+
+        return ASR.get_locale(locale), NLU.get_locale(locale)
+
+    @staticmethod
+    def load_asr(locale):
+        """
+        Thread: executor
+        """
+        from .asr import ASR
+
+        return ASR(locale)
+
+    @staticmethod
+    def load_nlu(locale):
+        """
+        Thread: executor
+        """
+        from .nlu import NLU
+
+        return NLU(locale)
+
+    @staticmethod
+    def rss():
+        """
+        Return resident memory of the process, in bytes, or 0 if it is
+        unknown.
+        """
+        try:
+            with open("/proc/self/statm", "r") as f:
+                pages = int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            return 0
+        return pages * os.sysconf("SC_PAGE_SIZE")
+
+    def _load(self, kind, locale):
+        """
+        Load a model, measuring the memory it uses.
+        Thread: executor
+        """
+        before = self.rss()
+        if kind == "asr":
+            model = self.load_asr(locale)
+        else:
+            model = self.load_nlu(locale)
+        return LoadedModel(model, max(0, self.rss() - before))
+
+    def resident_size(self):
+        return sum(loaded.size for loaded in self.resident.values())
+
+    def _estimate(self, key):
+        """
+        Estimate the memory a model will use from previous loads.
+        """
+        if key in self.sizes:
+            return self.sizes[key]
+        kind, _ = key
+        return max(
+            (size for (k, _), size in self.sizes.items() if k == kind),
+            default=0,
+        )
+
+    def _make_room(self, key, needed):
+        """
+        Release models until a model can be loaded under the memory
+        ceiling. Models of other locales are released first, least
+        recently used first, then current models.
+        """
+        current = set()
+        if self.current is not None:
+            current = {
+                ("asr", self.current.asr_locale),
+                ("nlu", self.current.nlu_locale),
+            }
+        for keep_current in (True, False):
+            for resident_key in list(self.resident):
+                if self.resident_size() + self._estimate(key) <= (
+                    self.memory_ceiling
+                ):
+                    return
+                if resident_key in needed:
+                    continue
+                if keep_current and resident_key in current:
+                    continue
+                if resident_key in current:
+                    # Cannot listen until new models are loaded
+                    self.current = None
+                del self.resident[resident_key]
+                gc.collect()
+
+    def _release(self):
+        """
+        Release models which are not used by warm locales.
+        """
+        warm = set()
+        for asr_locale, nlu_locale in self.recent:
+            warm.add(("asr", asr_locale))
+            warm.add(("nlu", nlu_locale))
+        released = [key for key in self.resident if key not in warm]
+        for key in released:
+            del self.resident[key]
+        if released:
+            gc.collect()
+
+    async def switch(self, locale):
+        """
+        Load models for a locale if required and switch to them.
+        Raise an exception if a model could not be loaded, current models
+        are then kept, unless they were released to make room.
+        """
+        loop = asyncio.get_event_loop()
+        async with self.lock:
+            asr_locale, nlu_locale = await loop.run_in_executor(
+                None, self.get_locales, locale
+            )
+            if self.current is not None and (
+                self.current.asr_locale,
+                self.current.nlu_locale,
+            ) == (asr_locale, nlu_locale):
+                return
+            needed = [("asr", asr_locale), ("nlu", nlu_locale)]
+            if all(key in self.resident for key in needed):
+                self.warm_hits += 1
+            try:
+                for key in needed:
+                    if key in self.resident:
+                        continue
+                    self._make_room(key, needed)
+                    loaded = await loop.run_in_executor(None, self._load, *key)
+                    self.resident[key] = loaded
+                    self.sizes[key] = loaded.size
+            except Exception:
+                # Do not keep half of the models
+                self._release()
+                raise
+            for key in needed:
+                self.resident.move_to_end(key)
+            self.current = ModelSet(
+                asr_locale,
+                nlu_locale,
+                self.resident[needed[0]].model,
+                self.resident[needed[1]].model,
+            )
+            self.switches += 1
+            locales = (asr_locale, nlu_locale)
+            if locales in self.recent:
+                self.recent.remove(locales)
+            self.recent.append(locales)
+            del self.recent[: -self.warm_locales]
+            self._release()
+
+    def stats(self):
+        """
+        Return statistics about loaded models.
+        """
+        return {
+            "current": None
+            if self.current is None
+            else [self.current.asr_locale, self.current.nlu_locale],
+            "warm_locales": self.warm_locales,
+            "resident": [f"{kind}/{locale}" for kind, locale in self.resident],
+            "resident_size": self.resident_size(),
+            "memory_ceiling": self.memory_ceiling,
+            "switches": self.switches,
+            "warm_hits": self.warm_hits,
+        }
@@ -1,7 +1,6 @@
 import asyncio
 import collections
 import datetime
-import gc
 import getopt
 import json
 import logging
@@ -23,12 +22,18 @@ from nabcommon.nabservice import NabService
 
 from .ears import Ears
 from .leds import Led
+from .models import ModelManager
+from .nabio import NabIO
+from .resources import Resources
 from .rfid import (
     DEFAULT_RFID_TIMEOUT,
     TAG_APPLICATION_NONE,
     TAG_APPLICATIONS,
     TagFlags,
 )
+from .sound_variants import SoundVariants
+from .speculation import SpeculationStats, SpeculativeNLU
+from .vad import Endpointer, LatencyStats
 
 
 class State(Enum):
@@ -39,17 +44,32 @@ class State(Enum):
     RECORDING = "recording"
 
 
+class ModelsState(Enum):
+    NONE = "none"  # no sound input, or models failed to load
+    LOADING_MODELS = "loading_models"
+    READY = "ready"
+
+
 class Nabd:
     SLEEP_EAR_POSITION = 10
     INIT_EAR_POSITION = 0
     EAR_MOVEMENT_TIMEOUT = 0.5
+    RESOURCES_REFRESH_INTERVAL = 60.0
 
     SYSTEMD_ACTIVATED_FD = 3
 
-    def __init__(self, nabio):
+    def __init__(
+        self,
+        nabio,
+        warm_locales=1,
+        memory_ceiling=ModelManager.MEMORY_CEILING,
+    ):
         settings.configure(type(self).__name__.lower())
         self.nabio = nabio
         self.idle_cv = asyncio.Condition()
+        # Set unless asleep
+        self.awake = asyncio.Event()
+        self.awake.set()
         self.idle_queue = collections.deque()
         # Current position of ears in idle mode
         self.ears = {
@@ -69,48 +89,70 @@ class Nabd:
         self._ears_moved_task = None
         self.playing_cancelable = False
         self.playing_request_id = None
+        # Next item of the idle queue being preloaded: (packet, task)
+        self._prefetch = None
+        # Endpointer of current ASR recording
+        self._asr_endpointer = None
+        self.asr_latency = LatencyStats()
+        # Speculative NLU of current ASR recording
+        self._asr_speculation = None
+        self.asr_speculation = SpeculationStats()
+        # ASR and NLU models are loaded in background by load_models
+        self.models = ModelManager(warm_locales, memory_ceiling)
+        # Number of load_models tasks started or about to be, see
+        # models_state
+        self.models_loads = 0
+        # Models of current ASR recording
+        self._asr_models = None
+        self._locale = None
+        Resources.build_index()
         Nabd.leds_boot(self.nabio, 2)
         if self.nabio.has_sound_input():
             from . import i18n
-            from .asr import ASR
-            from .nlu import NLU
 
-            config = i18n.Config.load()
-            self._asr_locale = ASR.get_locale(config.locale)
-            self.asr = ASR(self._asr_locale)
-            Nabd.leds_boot(self.nabio, 3)
-            self._nlu_locale = NLU.get_locale(config.locale)
-            self.nlu = NLU(self._nlu_locale)
-            Nabd.leds_boot(self.nabio, 4)
+            self._locale = i18n.load_locale()
+            # Models are loaded when run starts
+            self.models_loads = 1
+
+    @property
+    def models_state(self):
+        """
+        State of ASR and NLU models.
+        Models are not ready while they are being loaded if current models
+        were released to make room for new ones.
+        """
+        if self.models.current is not None:
+            return ModelsState.READY
+        if self.models_loads > 0:
+            return ModelsState.LOADING_MODELS
+        return ModelsState.NONE
 
     async def reload_config(self):
         """
         Reload configuration.
+        Models for the new locale are loaded in background.
         """
+        from . import i18n
+
+        locale = await i18n.reload_locale()
         if self.nabio.has_sound_input():
-            from . import i18n
-            from .asr import ASR
-            from .nlu import NLU
-
-            config = await i18n.Config.load_async()
-            new_asr_locale = ASR.get_locale(config.locale)
-            new_nlu_locale = NLU.get_locale(config.locale)
-            if new_asr_locale != self._asr_locale:
-                Nabd.leds_boot(self.nabio, 2)
-                self._asr_locale = new_asr_locale
-                self.asr = None
-                gc.collect()
-                self.asr = ASR(self._asr_locale)
-                Nabd.leds_boot(self.nabio, 3)
-            if new_nlu_locale != self._nlu_locale:
-                Nabd.leds_boot(self.nabio, 3)
-                self._nlu_locale = new_nlu_locale
-                self.nlu = None
-                gc.collect()
-                self.nlu = NLU(self._nlu_locale)
-                Nabd.leds_boot(self.nabio, 4)
-            self.nabio.set_leds(None, None, None, None, None)
-        self.nabio.pulse(Led.BOTTOM, (255, 0, 255))
+            self.models_loads += 1
+            self.loop.create_task(self.load_models(locale))
+
+    async def load_models(self, locale):
+        """
+        Load ASR and NLU models for a given locale, if they changed.
+        Loading runs in background, and nabd keeps processing packets
+        meanwhile. Current models, if any, can still be used until the new
+        ones are loaded.
+        Caller should have incremented models_loads.
+        """
+        try:
+            await self.models.switch(locale)
+        except Exception:
+            logging.error(f"Could not load models: {traceback.format_exc()}")
+        finally:
+            self.models_loads -= 1
 
     async def _do_transition_to_idle(self):
         """
@@ -148,9 +190,7 @@ class Nabd:
                         ):
                             for key, value in self.info.copy().items():
                                 notified = await self.nabio.play_info(
-                                    self.idle_cv,
-                                    value["tempo"],
-                                    value["colors"],
+                                    self.idle_cv, value
                                 )
                                 if notified:
                                     break
@@ -164,6 +204,19 @@ class Nabd:
             if self.running:
                 self.loop.stop()
 
+    async def resources_refresh_loop(self):
+        """
+        Periodically refresh the resource index to pick up added or removed
+        files. Only modified directories are listed.
+        Also reload the manifest of transcoded sounds if it changed.
+        """
+        while self.running:
+            await asyncio.sleep(Nabd.RESOURCES_REFRESH_INTERVAL)
+            # Resources are not used while asleep, refresh on wakeup
+            await self.awake.wait()
+            await self.loop.run_in_executor(None, Resources.refresh_index)
+            await self.loop.run_in_executor(None, SoundVariants.refresh)
+
     async def stop_idle_worker(self):
         async with self.idle_cv:
             self.running = False  # signal to exit
@@ -199,6 +252,7 @@ class Nabd:
             else:
                 if item[0]["type"] == "command":
                     await self.set_state(State.PLAYING)
+                    self._prefetch_next()
                     await self.perform(item[0], item[1])
                     if len(self.idle_queue) == 0:
                         await self.set_state(State.IDLE)
@@ -207,6 +261,7 @@ class Nabd:
                         item = self.idle_queue.popleft()
                 elif item[0]["type"] == "message":
                     await self.set_state(State.PLAYING)
+                    self._prefetch_next()
                     await self.perform(item[0], item[1])
                     if len(self.idle_queue) == 0:
                         await self.set_state(State.IDLE)
@@ -260,6 +315,33 @@ class Nabd:
                 else:
                     raise RuntimeError(f"Unexpected packet {item[0]}")
 
+    def _prefetch_next(self):
+        """
+        Start preloading the next command or message of the idle queue while
+        current item is playing.
+        Thread: idle_worker_loop
+        """
+        if len(self.idle_queue) == 0:
+            return
+        packet = self.idle_queue[0][0]
+        if self._prefetch is not None and self._prefetch[0] is packet:
+            return
+        if packet["type"] in ("command", "message"):
+            task = asyncio.ensure_future(self._do_prefetch(packet))
+            self._prefetch = (packet, task)
+
+    async def _do_prefetch(self, packet):
+        try:
+            if packet["type"] == "command":
+                sequence = packet["sequence"]
+            else:
+                if "signature" not in packet:
+                    packet["signature"] = {}
+                sequence = [packet["signature"]] + packet["body"]
+            await self.nabio.prefetch(sequence)
+        except Exception:
+            logging.error(f"Prefetch failed: {traceback.format_exc()}")
+
     def is_past(self, isodatestr):
         # Python 3.7's fromisoformat only parses output of isoformat, not all
         # valid ISO 8601 dates.
@@ -278,15 +360,28 @@ class Nabd:
                 await self._do_transition_to_idle()
             if new_state == State.ASLEEP:
                 await self.sleep_setup()
+            self._update_power_mode(new_state)
             self.state = new_state
             self.broadcast_state()
 
+    def _update_power_mode(self, new_state):
+        """
+        Enter low power mode when falling asleep and leave it when waking up.
+        """
+        if new_state == State.ASLEEP:
+            self.awake.clear()
+            self.nabio.set_low_power(True)
+        elif self.state == State.ASLEEP:
+            self.nabio.set_low_power(False)
+            self.awake.set()
+
     async def transition_to(self, new_state):
         """
         Thread: service or run (hw callbacks)
         """
         async with self.idle_cv:
             if self.state != new_state:
+                self._update_power_mode(new_state)
                 self.state = new_state
                 if new_state == State.IDLE:
                     await self._do_transition_to_idle()
@@ -297,22 +392,20 @@ class Nabd:
         """Process an info packet"""
         if "info_id" in packet:
             if "animation" in packet:
-                if (
-                    "tempo" not in packet["animation"]
-                    or "colors" not in packet["animation"]
-                ):
+                try:
+                    animation = NabIO.compile_info(packet["animation"])
+                except ValueError as err:
                     self.write_response_packet(
                         packet,
                         {
                             "status": "error",
                             "class": "MalformedPacket",
-                            "message": "Missing required tempo & colors slots "
-                            "in animation",
+                            "message": str(err),
                         },
                         writer,
                     )
-                else:
-                    self.info[packet["info_id"]] = packet["animation"]
+                    return
+                self.info[packet["info_id"]] = animation
             elif packet["info_id"] in self.info:
                 del self.info[packet["info_id"]]
             self.write_response_packet(packet, {"status": "ok"}, writer)
@@ -488,9 +581,18 @@ class Nabd:
         uptime = int(results[0].strip())
         response = {}
         response["state"] = self.state.value
+        response["models_state"] = self.models_state.value
+        response["models"] = self.models.stats()
+        models = self.models.current
+        response["nlu"] = None if models is None else models.nlu.stats()
         response["uptime"] = uptime
         response["connections"] = len(self.service_writers)
         response["hardware"] = await self.nabio.gestalt()
+        response[
+            "choreography_timing"
+        ] = self.nabio.choreography_timing.stats()
+        response["asr_latency"] = self.asr_latency.stats()
+        response["asr_speculation"] = self.asr_speculation.stats()
         self.write_response_packet(packet, response, writer)
 
     async def process_config_update_packet(self, packet, writer):
@@ -756,6 +858,12 @@ class Nabd:
                 await self.exit_interactive()
 
     async def perform(self, packet, writer):
+        if self._prefetch is not None and self._prefetch[0] is packet:
+            # Make sure preloading of this packet is complete. Waiting does
+            # not raise if prefetching failed or was cancelled, resources are
+            # then loaded again when playing.
+            await asyncio.wait([self._prefetch[1]])
+            self._prefetch = None
         if "request_id" in packet:
             self.playing_request_id = packet["request_id"]
         self.playing_cancelable = (
@@ -777,7 +885,11 @@ class Nabd:
         """
         Thread: run_loop
         """
-        if button_event == "hold" and self.state == State.IDLE:
+        if (
+            button_event == "hold"
+            and self.state == State.IDLE
+            and self.models_state == ModelsState.READY
+        ):
             asyncio.ensure_future(self.start_asr())
         elif button_event == "up" and self.state == State.RECORDING:
             asyncio.ensure_future(self.stop_asr())
@@ -794,6 +906,13 @@ class Nabd:
             asyncio.ensure_future(self.nabio.cancel(True))
             self.playing_canceled = True
         else:
+            if (
+                button_event == "hold"
+                and self.state == State.IDLE
+                and self.models_state == ModelsState.LOADING_MODELS
+            ):
+                # Cannot listen until models are loaded
+                asyncio.ensure_future(self.nabio.asr_failed())
             self.broadcast_event(
                 "button",
                 {
@@ -807,17 +926,65 @@ class Nabd:
         """
         Thread: run_loop
         """
+        # Keep using these models even if locale changes while recording
+        models = self.models.current
+        if models is None:
+            # Released to make room for models of another locale
+            return
         await self.transition_to(State.RECORDING)
-        await self.nabio.start_acquisition(self.asr.decode_chunk)
+        self._asr_models = models
+        self._asr_speculation = SpeculativeNLU(models.nlu.interpret)
+        models.asr.on_partial(self.loop, self._asr_partial)
+        self._asr_endpointer = Endpointer(
+            models.asr.decode_chunk,
+            lambda: self.loop.call_soon_threadsafe(self._end_of_speech),
+        )
+        await self.nabio.start_acquisition(self._asr_endpointer.process)
+
+    def _asr_partial(self, text, stable):
+        """
+        Partial hypothesis was decoded while recording, or became stable.
+        Thread: run_loop
+        """
+        if self._asr_speculation is None:
+            return
+        if not stable:
+            self.broadcast_event(
+                "asr_partial",
+                {"type": "asr_partial", "text": text, "time": time.time()},
+            )
+        self._asr_speculation.partial(text, stable)
+
+    def _end_of_speech(self):
+        """
+        Trailing silence was detected, stop recording.
+        Thread: run_loop
+        """
+        if self.state == State.RECORDING:
+            asyncio.ensure_future(self.stop_asr())
 
     async def stop_asr(self):
+        endpointer = self._asr_endpointer
+        if endpointer is None:
+            # Already stopped on end of speech or button release
+            return
+        self._asr_endpointer = None
+        speculation = self._asr_speculation
+        self._asr_speculation = None
+        models = self._asr_models
+        self._asr_models = None
         await self.nabio.end_acquisition()
         now = time.time()
-        decoded_str = await self.asr.get_decoded_string(True)
+        decoded_str = await models.asr.get_decoded_string(True)
         # ASR model needs to be improved, log outcome.
         logging.debug(f"ASR string: {decoded_str}")
-        response = await self.nlu.interpret(decoded_str)
+        response = await speculation.result(decoded_str, self.asr_speculation)
         logging.debug(f"NLU response: {str(response)}")
+        if endpointer.speech_end is not None:
+            self.asr_latency.record(
+                time.monotonic() - endpointer.speech_end,
+                endpointer.endpointed,
+            )
         await self.transition_to(State.IDLE)
         if response is None:
             # Did not understand
@@ -940,6 +1107,9 @@ class Nabd:
         self.nabio.bind_ears_event(self.loop, self.ears_callback)
         self.nabio.bind_rfid_event(self.loop, self.rfid_callback)
         idle_task = self.loop.create_task(self.idle_worker_loop())
+        if self._locale is not None:
+            self.loop.create_task(self.load_models(self._locale))
+        resources_task = self.loop.create_task(self.resources_refresh_loop())
         if os.environ.get("LISTEN_PID", None) == str(os.getpid()):
             server_task = self.loop.create_task(
                 asyncio.start_server(
@@ -970,6 +1140,7 @@ class Nabd:
             print(traceback.format_exc())
         finally:
             self.loop.run_until_complete(self.stop_idle_worker())
+            resources_task.cancel()
             server = server_task.result()
             server.close()
             for writer in self.service_writers.copy():
@@ -992,7 +1163,9 @@ class Nabd:
     def leds_boot(nabio, step):
         """
         Animation to indicate boot progress.
-        Useful as loading ASR/NLU model takes some time.
+        Step 1 is shown when NabIO is initialized and step 2 when Nabd is
+        constructed. ASR/NLU models are then loaded in background, see
+        models_state.
         """
         # Step 0 is actually used for shutdown. Same values are in nabboot.py
         # for startup led values.
@@ -1020,27 +1193,13 @@ class Nabd:
                 (255, 0, 255),
                 (255, 0, 255),
             )
-        if step == 3:
-            nabio.set_leds(
-                (255, 0, 255),
-                (255, 255, 255),
-                (255, 255, 255),
-                (255, 0, 255),
-                (255, 0, 255),
-            )
-        if step == 4:
-            nabio.set_leds(
-                (255, 0, 255),
-                (255, 255, 255),
-                (255, 255, 255),
-                (255, 255, 255),
-                (255, 0, 255),
-            )
 
     @staticmethod
     def main(argv):
         nablogging.setup_logging("nabd")
         pidfilepath = "/run/nabd.pid"
+        warm_locales = 1
+        memory_ceiling = ModelManager.MEMORY_CEILING
         if sys.platform == "linux" and platform.machine() == "armv6l":
             from .nabio_hw import NabIOHW
 
@@ -1055,9 +1214,18 @@ class Nabd:
             f" --pidfile=<pidfile> define pidfile (default = {pidfilepath})\n"
             " --nabio=<nabio> define nabio class "
             f"(default = {nabiocls.__module__}.{nabiocls.__name__})\n"
+            " --warm-locales=<n> keep models of the n most recently used "
+            "locales loaded (default = 1)\n"
+            " --memory-ceiling=<MB> release models before loading new ones "
+            "if models would use more memory "
+            f"(default = {ModelManager.MEMORY_CEILING >> 20})\n"
         )
         try:
-            opts, args = getopt.getopt(argv, "h", ["pidfile=", "nabio="])
+            opts, args = getopt.getopt(
+                argv,
+                "h",
+                ["pidfile=", "nabio=", "warm-locales=", "memory-ceiling="],
+            )
         except getopt.GetoptError:
             print(usage)
             exit(2)
@@ -1071,12 +1239,24 @@ class Nabd:
                 from pydoc import locate
 
                 nabiocls = locate(arg)
+            elif opt == "--warm-locales":
+                try:
+                    warm_locales = max(1, int(arg))
+                except ValueError:
+                    print(usage)
+                    exit(2)
+            elif opt == "--memory-ceiling":
+                try:
+                    memory_ceiling = max(0, int(arg)) << 20
+                except ValueError:
+                    print(usage)
+                    exit(2)
         pidfile = PIDLockFile(pidfilepath, timeout=-1)
         try:
             with pidfile:
                 nabio = nabiocls()
                 Nabd.leds_boot(nabio, 1)
-                nabd = Nabd(nabio)
+                nabd = Nabd(nabio, warm_locales, memory_ceiling)
                 nabd.run()
         except AlreadyLocked:
             print(f"nabd already running? (pid={pidfile.read_pid()})")
@@ -1,12 +1,17 @@
 import abc
 import asyncio
+import collections
+import logging
 import time
 from asyncio import Event
+from types import MappingProxyType
 
-from .choreography import ChoreographyInterpreter
+from .choreography import ChoreographyInterpreter, TimingStats
 from .ears import Ears
 from .leds import Led
 
+InfoAnimation = collections.namedtuple("InfoAnimation", ["tempo", "frames"])
+
 
 class NabIO(object, metaclass=abc.ABCMeta):
     """Interface for I/O interactions with a nabaztag"""
@@ -25,6 +30,8 @@ class NabIO(object, metaclass=abc.ABCMeta):
     def __init__(self):
         super().__init__()
         self.cancel_event = Event()
+        # Statistics of choreographies played, for gestalt reporting
+        self.choreography_timing = TimingStats()
 
     async def setup_ears(self, left_ear, right_ear):
         """
@@ -70,6 +77,7 @@ class NabIO(object, metaclass=abc.ABCMeta):
         """
         Set the leds. None means to turn them off.
         """
+        colors = {}
         for (led_ix, led) in [
             (Led.NOSE, nose),
             (Led.LEFT, left),
@@ -78,10 +86,10 @@ class NabIO(object, metaclass=abc.ABCMeta):
             (Led.BOTTOM, bottom),
         ]:
             if led is None:
-                (r, g, b) = (0, 0, 0)
+                colors[led_ix] = (0, 0, 0)
             else:
-                (r, g, b) = led
-            self.leds.set1(led_ix, r, g, b)
+                colors[led_ix] = tuple(led)
+        self.leds.set_many(colors)
 
     def pulse(self, led, color):
         """
@@ -90,8 +98,18 @@ class NabIO(object, metaclass=abc.ABCMeta):
         (r, g, b) = color
         self.leds.pulse(led, r, g, b)
 
+    def set_low_power(self, enabled):
+        """
+        Enter or leave low power mode, while rabbit is asleep: led animations
+        are suspended and rfid polling is slowed down.
+        """
+        self.leds.set_low_power(enabled)
+        self.rfid.set_low_power(enabled)
+
     async def rfid_detected_feedback(self):
-        ci = ChoreographyInterpreter(self.leds, self.ears, self.sound)
+        ci = ChoreographyInterpreter(
+            self.leds, self.ears, self.sound, self.choreography_timing
+        )
         await ci.start("nabd/rfid.chor")
         await self.sound.play_list(["rfid/rfid.wav"], False)
         await ci.stop()
@@ -144,28 +162,23 @@ class NabIO(object, metaclass=abc.ABCMeta):
         """
         self.rfid.on_detect(loop, callback)
 
-    async def play_info(self, condvar, tempo, colors):
+    async def play_info(self, condvar, animation):
         """
-        Play an info animation.
-        tempo & colors are as described in the nabd protocol.
+        Play an info animation compiled with compile_info.
         Run the animation in loop for the complete info duration (15 seconds)
         or until condvar is notified
 
-        If 'left'/'center'/'right' slots are absent, the light is off.
         Return true if condvar was notified
         """
-        animation = [NabIO._convert_info_color(color) for color in colors]
-        step_ms = tempo * 10
+        frames = animation.frames
+        step_ms = animation.tempo * 10
         start = time.time()
         index = 0
         notified = False
         while time.time() - start < NabIO.INFO_LOOP_LENGTH:
-            step = animation[index]
-            for led_ix, rgb in step:
-                r, g, b = rgb
-                self.leds.set1(led_ix, r, g, b)
+            self.leds.set_many(frames[index])
             if await NabIO._wait_on_condvar(condvar, step_ms):
-                index = (index + 1) % len(animation)
+                index = (index + 1) % len(frames)
             else:
                 notified = True
                 break
@@ -173,8 +186,9 @@ class NabIO(object, metaclass=abc.ABCMeta):
         return notified
 
     def clear_info(self):
-        for led in (Led.LEFT, Led.CENTER, Led.RIGHT):
-            self.leds.set1(led, 0, 0, 0)
+        self.leds.set_many(
+            {led: (0, 0, 0) for led in (Led.LEFT, Led.CENTER, Led.RIGHT)}
+        )
 
     @staticmethod
     async def _wait_on_condvar(condvar, ms):
@@ -186,25 +200,56 @@ class NabIO(object, metaclass=abc.ABCMeta):
         return timeout
 
     @staticmethod
-    def _convert_info_color(color):
-        animation = []
-        for led_ix, led in [
-            (Led.LEFT, "left"),
-            (Led.CENTER, "center"),
-            (Led.RIGHT, "right"),
-        ]:
-            values = []
-            if color[led]:
-                int_value = int(color[led], 16)
-                values.append((int_value >> 16) & 0xFF)  # r
-                values.append((int_value >> 8) & 0xFF)  # g
-                values.append(int_value & 0xFF)  # b
-            else:
-                values.append(0)
-                values.append(0)
-                values.append(0)
-            animation.append((led_ix, values))
-        return animation
+    def compile_info(animation):
+        """
+        Compile an info animation, as described in the nabd protocol, into
+        an InfoAnimation with one led -> (r, g, b) mapping per frame.
+        If 'left'/'center'/'right' slots are absent, the light is off.
+        Raise ValueError if animation is malformed.
+        """
+        if not isinstance(animation, dict):
+            raise ValueError("Animation should be an object")
+        if "tempo" not in animation or "colors" not in animation:
+            raise ValueError(
+                "Missing required tempo & colors slots in animation"
+            )
+        tempo = animation["tempo"]
+        colors = animation["colors"]
+        if (
+            not isinstance(tempo, (int, float))
+            or isinstance(tempo, bool)
+            or tempo <= 0
+        ):
+            raise ValueError(f"Invalid tempo {tempo!r}")
+        if not isinstance(colors, list) or colors == []:
+            raise ValueError("Colors should be a non-empty list")
+        frames = []
+        for color in colors:
+            if not isinstance(color, dict):
+                raise ValueError(f"Invalid color {color!r}")
+            frame = {}
+            for led_ix, led in [
+                (Led.LEFT, "left"),
+                (Led.CENTER, "center"),
+                (Led.RIGHT, "right"),
+            ]:
+                value = color.get(led)
+                if value:
+                    try:
+                        int_value = int(value, 16)
+                    except (TypeError, ValueError):
+                        raise ValueError(f"Invalid color {value!r}")
+                    if not 0 <= int_value <= 0xFFFFFF:
+                        raise ValueError(f"Invalid color {value!r}")
+                    frame[led_ix] = (
+                        (int_value >> 16) & 0xFF,  # r
+                        (int_value >> 8) & 0xFF,  # g
+                        int_value & 0xFF,  # b
+                    )
+                else:
+                    frame[led_ix] = (0, 0, 0)
+            frames.append(MappingProxyType(frame))
+        return InfoAnimation(tempo, tuple(frames))
 
     async def start_acquisition(self, acquisition_cb):
         """
@@ -235,11 +280,15 @@ class NabIO(object, metaclass=abc.ABCMeta):
         Play a message, i.e. a signature, a body and a signature.
         """
         self.cancel_event.clear()
-        # Turn leds red while ears go to 0, 0
-        await self.move_ears_with_leds((255, 0, 0), 0, 0)
-        preloaded_sig = await self._preload([signature])
-        preloaded_body = await self._preload(body)
-        ci = ChoreographyInterpreter(self.leds, self.ears, self.sound)
+        # Turn leds red while ears go to 0, 0, preloading resources meanwhile
+        _, preloaded_sig, preloaded_body = await asyncio.gather(
+            self.move_ears_with_leds((255, 0, 0), 0, 0),
+            self._preload([signature]),
+            self._preload(body),
+        )
+        ci = ChoreographyInterpreter(
+            self.leds, self.ears, self.sound, self.choreography_timing
+        )
         await self._play_preloaded(
             ci, preloaded_sig, ChoreographyInterpreter.STREAMING_URN
         )
@@ -258,7 +307,9 @@ class NabIO(object, metaclass=abc.ABCMeta):
         """
         self.cancel_event.clear()
         preloaded = await self._preload(sequence)
-        ci = ChoreographyInterpreter(self.leds, self.ears, self.sound)
+        ci = ChoreographyInterpreter(
+            self.leds, self.ears, self.sound, self.choreography_timing
+        )
         await self._play_preloaded(ci, preloaded, None)
 
     async def _play_preloaded(self, ci, preloaded, default_chor):
@@ -282,28 +333,54 @@ class NabIO(object, metaclass=abc.ABCMeta):
             elif "choreography" in seq_item:
                 await ci.wait_until_complete(self.cancel_event)
 
+    async def prefetch(self, sequence):
+        """
+        Preload resources of a sequence ahead of playing it, typically while
+        another message is playing. Resolved resources are stored in the
+        sequence items.
+        """
+        await asyncio.gather(
+            *[self._preload_item(seq_item) for seq_item in sequence]
+        )
+
     async def _preload(self, sequence):
-        preloaded_sequence = []
-        for seq_item in sequence:
-            if self.cancel_event.is_set():
-                break
-            if "audio" in seq_item:
-                preloaded_audio_list = []
-                if isinstance(seq_item["audio"], str):
-                    print(
-                        f"Warning: audio should be a list of resources "
-                        f"(sequence item: {seq_item})"
-                    )
-                    audio_list = [seq_item["audio"]]
-                else:
-                    audio_list = seq_item["audio"]
-                for res in audio_list:
-                    f = await self.sound.preload(res)
-                    if f is not None:
-                        preloaded_audio_list.append(f)
-                seq_item["audio"] = preloaded_audio_list
-            preloaded_sequence.append(seq_item)
-        return preloaded_sequence
+        if self.cancel_event.is_set():
+            return []
+        await self.prefetch(sequence)
+        return sequence
+
+    async def _preload_item(self, seq_item):
+        if "audio" in seq_item:
+            if isinstance(seq_item["audio"], str):
+                print(
+                    f"Warning: audio should be a list of resources "
+                    f"(sequence item: {seq_item})"
+                )
+                audio_list = [seq_item["audio"]]
+            else:
+                audio_list = seq_item["audio"]
+            preloaded_audio_list = await asyncio.gather(
+                *[self.sound.preload(res) for res in audio_list]
+            )
+            seq_item["audio"] = [
+                f for f in preloaded_audio_list if f is not None
+            ]
+        if "choreography" in seq_item:
+            chor = seq_item["choreography"]
+            if isinstance(chor, str) and not (
+                chor.startswith(ChoreographyInterpreter.STREAMING_URN)
+                or chor.startswith(
+                    ChoreographyInterpreter.DATA_MTL_BINARY_SCHEME
+                )
+            ):
+                try:
+                    file, _ = await ChoreographyInterpreter.load_program(chor)
+                except Exception as err:
+                    # Keep reference, play() reports the error when playing
+                    logging.error(f"Could not preload choreography: {err}")
+                    return
+                if file is not None:
+                    seq_item["choreography"] = file.as_posix()
 
     async def cancel(self, feedback=False):
         """
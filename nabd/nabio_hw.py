@@ -55,8 +55,10 @@ class NabIOHW(NabIO):
         return {
             "model": model_name,
             "sound_card": self.sound.get_sound_card(),
+            "sound_cache": self.sound.get_cache_stats(),
             "sound_input": self.has_sound_input(),
             "rfid": self.has_rfid(),
+            "rfid_cache": self.rfid.get_cache_stats(),
             "left_ear_status": left_ear_status,
             "right_ear_status": right_ear_status,
         }
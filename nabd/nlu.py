@@ -1,3 +1,6 @@
+import asyncio
+import logging
+import time
 import traceback
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
@@ -6,6 +9,8 @@ from snips_nlu import SnipsNLUEngine
 
 from nabweb import settings
 
+from .nlu_cache import NLUCache
+
 
 class NLU:
     """
@@ -17,7 +22,14 @@ class NLU:
         "en_GB": "nlu/engine_en/",
         "fr_FR": "nlu/engine_fr/",
     }
+    PHRASES = {
+        "en_US": "nlu/phrases_en.json",
+        "en_GB": "nlu/phrases_en.json",
+        "fr_FR": "nlu/phrases_fr.json",
+    }
     DEFAULT_LOCALE = "fr_FR"
+    # Recent results cached in front of Snips
+    CACHE_SIZE = 64
 
     @staticmethod
     def get_locale(locale):
@@ -28,6 +40,7 @@ class NLU:
 
     def __init__(self, locale):
         self.executor = ThreadPoolExecutor(max_workers=1)
+        self.cache = NLUCache(NLU.CACHE_SIZE)
         self._load_model(locale)
 
     def _load_model(self, locale):
@@ -37,6 +50,9 @@ class NLU:
             basepath = Path(settings.BASE_DIR)
             fullpath = basepath.joinpath("nabd", path).as_posix()
             self.nlu_engine = SnipsNLUEngine.from_path(fullpath)
+            self.cache = NLUCache.load(
+                basepath.joinpath("nabd", NLU.PHRASES[locale]), NLU.CACHE_SIZE
+            )
         except Exception:
             print(traceback.format_exc())
 
@@ -45,21 +61,49 @@ class NLU:
         Interpret string from asr.
         Return None if interpretation failed.
         """
-        future = self.executor.submit(lambda s=string: self._interpret(s))
-        return future.result()
+        return await asyncio.get_event_loop().run_in_executor(
+            self.executor, self._interpret, string
+        )
 
     def _interpret(self, string):
         try:
             if string == "":
                 return None
             # TODO : hardcode magic 8 ball ?
-            parsed = self.nlu_engine.parse(string)
-            if parsed["intent"]["intentName"] is None:
-                return None
-            result = {"intent": parsed["intent"]["intentName"]}
-            for slot in parsed["slots"]:
-                result[slot["slotName"]] = slot["value"]["value"]
+            start = time.monotonic()
+            path, result = self.cache.lookup(string)
+            if path is None:
+                path = NLUCache.ENGINE
+                parsed = self.nlu_engine.parse(string)
+                result = NLU.convert(parsed)
+                if NLUCache.is_static(parsed):
+                    self.cache.put(string, result)
+            latency = time.monotonic() - start
+            self.cache.record(path, latency)
+            logging.debug(
+                f"NLU {path} path in {latency * 1000:.1f}ms, "
+                f"hit rate {self.cache.stats()['hit_rate']}"
+            )
             return result
         except Exception:
             print(traceback.format_exc())
             return None
+
+    @staticmethod
+    def convert(parsed):
+        """
+        Convert a result of Snips parser to an NLU response.
+        Return None if no intent was recognized.
+        """
+        if parsed["intent"]["intentName"] is None:
+            return None
+        result = {"intent": parsed["intent"]["intentName"]}
+        for slot in parsed["slots"]:
+            result[slot["slotName"]] = slot["value"]["value"]
+        return result
+
+    def stats(self):
+        """
+        Return statistics of the fast path for gestalt reporting.
+        """
+        return self.cache.stats()
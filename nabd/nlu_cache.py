@@ -0,0 +1,140 @@
+import collections
+import json
+
+# Builtin entities resolved relative to current time, results with such
+# slots cannot be reused.
+TIME_ENTITIES = {"snips/datetime"}
+
+
+def normalize(text, fillers=()):
+    """
+    Normalize a decoded string for lookup: lower case, single spaces,
+    typographic apostrophes, and no filler words at both ends.
+    """
+    words = text.lower().replace("’", "'").split()
+    while words and words[0] in fillers:
+        words.pop(0)
+    while words and words[-1] in fillers:
+        words.pop()
+    return " ".join(words)
+
+
+class NLUCache(object):
+    """
+    Fast path in front of the NLU engine.
+    Decoded strings are first looked up in a table of phrases accepted by
+    the ASR grammar, precomputed by the build_nlu_phrases command, and
+    then in a bounded LRU cache of recent results. The NLU engine is only
+    used if both miss.
+    Results which depend on current time are never cached.
+    Thread: NLU executor, stats may be read from the event loop
+    """
+
+    TABLE = "table"
+    LRU = "lru"
+    ENGINE = "engine"
+    PATHS = (TABLE, LRU, ENGINE)
+    FORMAT_VERSION = 1
+
+    def __init__(self, max_entries, phrases=None, fillers=()):
+        self.max_entries = max_entries
+        # normalized phrase -> result, None if not understood
+        self.phrases = phrases or {}
+        self.fillers = frozenset(fillers)
+        self.entries = collections.OrderedDict()
+        # path -> [count, total latency, max latency]
+        self.latencies = {path: [0, 0.0, 0.0] for path in self.PATHS}
+
+    @staticmethod
+    def load(path, max_entries):
+        """
+        Load phrase table from a file written by build_nlu_phrases.
+        Return a cache without table if file is missing or invalid.
+        """
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return NLUCache(max_entries)
+        if data.get("version") != NLUCache.FORMAT_VERSION:
+            return NLUCache(max_entries)
+        return NLUCache(
+            max_entries, data.get("phrases"), data.get("fillers", ())
+        )
+
+    @staticmethod
+    def is_static(parsed):
+        """
+        Determine if a parsed result of the NLU engine can be reused.
+        """
+        return all(
+            slot["entity"] not in TIME_ENTITIES for slot in parsed["slots"]
+        )
+
+    def lookup(self, text):
+        """
+        Look up a decoded string.
+        Return the path which found it (TABLE or LRU) and a copy of the
+        result, or (None, None).
+        """
+        key = normalize(text, self.fillers)
+        if key in self.phrases:
+            path, result = self.TABLE, self.phrases[key]
+        elif key in self.entries:
+            self.entries.move_to_end(key)
+            path, result = self.LRU, self.entries[key]
+        else:
+            return None, None
+        if result is not None:
+            result = dict(result)
+        return path, result
+
+    def put(self, text, result):
+        """
+        Cache the result of the NLU engine for a decoded string.
+        Results which are not static (see is_static) should not be cached.
+        """
+        key = normalize(text, self.fillers)
+        if result is not None:
+            result = dict(result)
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def record(self, path, latency):
+        """
+        Record latency of an interpretation, in seconds.
+        """
+        latencies = self.latencies[path]
+        latencies[0] += 1
+        latencies[1] += latency
+        latencies[2] = max(latencies[2], latency)
+
+    def stats(self):
+        """
+        Return statistics for gestalt reporting.
+        """
+        lookups = sum(count for count, _, _ in self.latencies.values())
+        if lookups:
+            hits = lookups - self.latencies[self.ENGINE][0]
+            hit_rate = round(hits / lookups, 3)
+        else:
+            hit_rate = None
+        paths = {}
+        for path, (count, total, max_latency) in self.latencies.items():
+            if count == 0:
+                paths[path] = {"count": 0}
+            else:
+                paths[path] = {
+                    "count": count,
+                    "mean_ms": round(total / count * 1000, 1),
+                    "max_ms": round(max_latency * 1000, 1),
+                }
+        return {
+            "phrases": len(self.phrases),
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hit_rate": hit_rate,
+            "paths": paths,
+        }
@@ -0,0 +1,45 @@
+import audioop
+
+# Native playback format: signed 16 bits little endian stereo at 44.1 kHz,
+# supported by both 2018 and 2019 sound cards.
+RATE = 44100
+CHANNELS = 2
+WIDTH = 2
+FRAME_BYTES = CHANNELS * WIDTH
+
+
+def is_native(channels, rate, width):
+    """
+    Determine if PCM data is already in native playback format.
+    """
+    return (channels, rate, width) == (CHANNELS, RATE, WIDTH)
+
+
+def convert_width(data, width):
+    """
+    Convert PCM data to signed samples of native width, keeping channels
+    and rate.
+    """
+    if width == 1:
+        # 8bit is unsigned in wav files
+        data = audioop.bias(data, 1, -128)
+    if width != WIDTH:
+        data = audioop.lin2lin(data, width, WIDTH)
+    return data
+
+
+def convert(data, channels, rate, width, state):
+    """
+    Convert PCM data to native playback format.
+    state is the resampling state, carried from one chunk to the next, and
+    should be None for the first chunk.
+    Return converted data and new state.
+    """
+    data = convert_width(data, width)
+    if channels == 1:
+        data = audioop.tostereo(data, WIDTH, 1, 1)
+    elif channels != CHANNELS:
+        raise ValueError(f"Unsupported number of channels: {channels}")
+    if rate != RATE:
+        data, state = audioop.ratecv(data, WIDTH, CHANNELS, rate, RATE, state)
+    return data, state
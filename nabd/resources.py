@@ -1,11 +1,287 @@
+import fnmatch
 import os
 import random
-from pathlib import Path
+import threading
+from pathlib import Path, PurePosixPath
 
 from nabweb import settings
 
 
+class ResourceTree(object):
+    """
+    Snapshot of the files below a <app>/<type>/ directory.
+    Each directory is stored with its modification time, so the snapshot can
+    be refreshed by only listing directories that actually changed.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        # relative directory -> (mtime_ns, file names, subdirectory names)
+        self.dirs = {}
+        self._scan(".")
+
+    def _scan(self, reldir):
+        """
+        Scan a directory and its subdirectories.
+        """
+        path = self.root.joinpath(reldir)
+        try:
+            mtime = path.stat().st_mtime_ns
+            files = []
+            subdirs = []
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        subdirs.append(entry.name)
+                    elif entry.is_file():
+                        files.append(entry.name)
+        except OSError:
+            return
+        files.sort()
+        subdirs.sort()
+        self.dirs[reldir] = (mtime, files, subdirs)
+        for subdir in subdirs:
+            self._scan(PurePosixPath(reldir, subdir).as_posix())
+
+    def _forget(self, reldir):
+        """
+        Remove a directory and its subdirectories from the snapshot.
+        """
+        entry = self.dirs.pop(reldir, None)
+        if entry is not None:
+            for subdir in entry[2]:
+                self._forget(PurePosixPath(reldir, subdir).as_posix())
+
+    def refresh(self):
+        """
+        Rescan directories which were modified since last scan.
+        Return True if anything changed.
+        """
+        changed = False
+        rescanned = set()
+        for reldir, (mtime, _, _) in list(self.dirs.items()):
+            if reldir not in self.dirs or any(
+                parent.as_posix() in rescanned
+                for parent in PurePosixPath(reldir).parents
+            ):
+                # Parent was rescanned.
+                continue
+            try:
+                new_mtime = self.root.joinpath(reldir).stat().st_mtime_ns
+            except OSError:
+                new_mtime = None
+            if new_mtime != mtime:
+                changed = True
+                self._forget(reldir)
+                if new_mtime is not None:
+                    self._scan(reldir)
+                    rescanned.add(reldir)
+        return changed
+
+    def files(self):
+        """
+        Iterate on (relative path, absolute path) of all files.
+        """
+        for reldir, (_, files, _) in self.dirs.items():
+            for name in files:
+                relpath = PurePosixPath(reldir, name).as_posix()
+                yield relpath, self.root.joinpath(relpath)
+
+
+class ResourceIndex(object):
+    """
+    In-memory index of resources, built once and refreshed incrementally.
+    Lookups do not perform any filesystem I/O.
+    """
+
+    def __init__(self, basepath, types=()):
+        self.basepath = Path(basepath)
+        self.lock = threading.Lock()
+        self.apps = []
+        self.base_mtime = None
+        # (app, type) -> ResourceTree
+        self.trees = {}
+        # type -> relative path -> [(app rank, path)]
+        self.files = {}
+        # type -> relative directory -> [(app rank, [paths])]
+        self.listings = {}
+        # Precomputed lookups, keyed by (type, locale, relative path)
+        self.found_files = {}
+        self.found_lists = {}
+        # Incremented whenever lookups may return different results
+        self.generation = 0
+        with self.lock:
+            self._scan_apps()
+            for type in types:
+                self._add_type(type)
+
+    def _scan_apps(self):
+        try:
+            self.base_mtime = self.basepath.stat().st_mtime_ns
+            self.apps = sorted(
+                entry.name
+                for entry in os.scandir(self.basepath)
+                if entry.is_dir() and not entry.name.startswith(".")
+            )
+        except OSError:
+            self.base_mtime = None
+            self.apps = []
+
+    def _add_type(self, type):
+        for app in self.apps:
+            root = self.basepath.joinpath(app, type)
+            if root.is_dir():
+                self.trees[(app, type)] = ResourceTree(root)
+        self.files[type] = {}
+        self._rebuild(type)
+
+    def _rebuild(self, type):
+        """
+        Rebuild lookup tables of a given type from the trees.
+        """
+        files = {}
+        listings = {}
+        for rank, app in enumerate(self.apps):
+            tree = self.trees.get((app, type))
+            if tree is None:
+                continue
+            for relpath, path in tree.files():
+                files.setdefault(relpath, []).append((rank, path))
+            for reldir, (_, names, _) in tree.dirs.items():
+                paths = [tree.root.joinpath(reldir, name) for name in names]
+                listings.setdefault(reldir, []).append((rank, paths))
+        self.files[type] = files
+        self.listings[type] = listings
+        self.found_files = {}
+        self.found_lists = {}
+        self.generation += 1
+
+    def refresh(self):
+        """
+        Refresh the index, listing only directories that changed.
+        Return True if anything changed.
+        """
+        with self.lock:
+            changed_types = set()
+            try:
+                base_mtime = self.basepath.stat().st_mtime_ns
+            except OSError:
+                base_mtime = None
+            if base_mtime != self.base_mtime:
+                self._scan_apps()
+                changed_types.update(self.files.keys())
+                for key in list(self.trees.keys()):
+                    if key[0] not in self.apps:
+                        del self.trees[key]
+            for type in self.files.keys():
+                for app in self.apps:
+                    tree = self.trees.get((app, type))
+                    root = self.basepath.joinpath(app, type)
+                    if tree is None:
+                        if root.is_dir():
+                            self.trees[(app, type)] = ResourceTree(root)
+                            changed_types.add(type)
+                    elif not root.is_dir():
+                        del self.trees[(app, type)]
+                        changed_types.add(type)
+                    elif tree.refresh():
+                        changed_types.add(type)
+            for type in changed_types:
+                self._rebuild(type)
+            return changed_types != set()
+
+    def _ensure_type(self, type):
+        if type not in self.files:
+            with self.lock:
+                if type not in self.files:
+                    self._add_type(type)
+
+    def find_file(self, type, locale, filename):
+        """
+        Find a file, first in <app>/<type>/<locale>/ then in <app>/<type>/.
+        """
+        key = (type, locale, filename)
+        found_files = self.found_files
+        if key in found_files:
+            return found_files[key]
+        self._ensure_type(type)
+        with self.lock:
+            generation = self.generation
+            files = self.files[type]
+        relpath = PurePosixPath(filename).as_posix()
+        localized = PurePosixPath(locale, relpath).as_posix()
+        candidates = [
+            (rank, 0, path) for rank, path in files.get(localized, [])
+        ] + [(rank, 1, path) for rank, path in files.get(relpath, [])]
+        result = None
+        if candidates != []:
+            _, _, result = min(candidates)
+        with self.lock:
+            # Do not remember result if index was rebuilt meanwhile
+            if self.generation == generation:
+                self.found_files[key] = result
+        return result
+
+    def list_files(self, type, locale, parent, pattern):
+        """
+        Return the sorted list of files matching pattern in
+        <app>/<type>/<locale>/<parent>/ and <app>/<type>/<parent>/.
+        """
+        key = (type, locale, PurePosixPath(parent, pattern).as_posix())
+        found_lists = self.found_lists
+        if key in found_lists:
+            return found_lists[key]
+        self._ensure_type(type)
+        with self.lock:
+            generation = self.generation
+            listings = self.listings[type]
+        reldir = PurePosixPath(parent).as_posix()
+        localized = PurePosixPath(locale, reldir).as_posix()
+        filelist = []
+        for dir in [localized, reldir]:
+            for _, paths in listings.get(dir, []):
+                filelist.extend(
+                    path
+                    for path in paths
+                    if fnmatch.fnmatchcase(path.name, pattern)
+                )
+        result = sorted(filelist)
+        with self.lock:
+            # Do not remember result if index was rebuilt meanwhile
+            if self.generation == generation:
+                self.found_lists[key] = result
+        return result
+
+
 class Resources(object):
+    TYPES = ("sounds", "choreographies")
+
+    index = None
+
+    @staticmethod
+    def build_index():
+        """
+        Build the resource index, scanning the whole tree.
+        """
+        Resources.index = ResourceIndex(settings.BASE_DIR, Resources.TYPES)
+
+    @staticmethod
+    def refresh_index():
+        """
+        Refresh the resource index, only listing modified directories.
+        Return True if the index changed.
+        """
+        if Resources.index is None:
+            Resources.build_index()
+            return True
+        return Resources.index.refresh()
+
+    @staticmethod
+    def get_index():
+        if Resources.index is None:
+            Resources.build_index()
+        return Resources.index
+
     @staticmethod
     async def find(type, resources):
         """
@@ -41,41 +317,34 @@ class Resources(object):
         return None
 
     @staticmethod
-    async def _find_file(type, filename):
+    async def find_all(type, pattern):
+        """
+        Find all resources matching a random lookup pattern such as
+        dir/*.suffix, i.e. all candidates of find.
+        """
         from .i18n import get_locale
 
-        basepath = Path(settings.BASE_DIR)
+        path0 = Path(pattern)
         locale = await get_locale()
+        return Resources.get_index().list_files(
+            type, locale, path0.parent.as_posix(), path0.name
+        )
 
-        for app in os.listdir(basepath):
-            if not os.path.isdir(app):
-                continue
-            for path in [
-                basepath.joinpath(app, type, locale, filename),
-                basepath.joinpath(app, type, filename),
-            ]:
-                if path.is_file():
-                    return path
-        return None
+    @staticmethod
+    async def _find_file(type, filename):
+        from .i18n import get_locale
+
+        locale = await get_locale()
+        return Resources.get_index().find_file(type, locale, filename)
 
     @staticmethod
     async def _find_random(type, parent, pattern):
-
         from .i18n import get_locale
 
-        basepath = Path(settings.BASE_DIR)
         locale = await get_locale()
-
-        filelist = []
-        for app in os.listdir(basepath):
-            if not os.path.isdir(app):
-                continue
-            for path in [
-                basepath.joinpath(app, type, locale, parent),
-                basepath.joinpath(app, type, parent),
-            ]:
-                if path.is_dir():
-                    filelist = filelist + list(path.glob(pattern))
+        filelist = Resources.get_index().list_files(
+            type, locale, parent, pattern
+        )
         if filelist != []:
-            return random.choice(sorted(filelist))
+            return random.choice(filelist)
         return None
@@ -81,3 +81,9 @@ class Rfid(object, metaclass=abc.ABCMeta):
         Disable detection of tags.
         """
         raise NotImplementedError("Should have implemented")
+
+    def set_low_power(self, enabled):
+        """
+        Enter or leave low power mode, where polling is slowed down.
+        """
+        pass
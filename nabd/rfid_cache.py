@@ -0,0 +1,85 @@
+import collections
+
+CachedTag = collections.namedtuple(
+    "CachedTag", ["picture", "app", "app_data", "flags"]
+)
+
+
+class TagCache(object):
+    """
+    Bounded LRU cache of decoded tag contents, keyed by UID.
+    Cached contents are raised immediately when a known tag is detected,
+    and then verified by reading the tag.
+    Thread: event loop
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.mismatches = 0
+
+    def get(self, uid):
+        """
+        Return cached contents for uid, or None.
+        """
+        key = bytes(uid)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, uid, picture, app, app_data, flags):
+        """
+        Cache contents read from a tag.
+        """
+        key = bytes(uid)
+        if app_data is not None:
+            app_data = bytes(app_data)
+        self.entries[key] = CachedTag(picture, app, app_data, flags)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def verify(self, uid, picture, app, app_data, flags):
+        """
+        Compare contents read from a tag with cached contents and update
+        cache.
+        Return True if cached contents were accurate.
+        """
+        entry = self.entries.get(bytes(uid))
+        if app_data is not None:
+            app_data = bytes(app_data)
+        accurate = entry == CachedTag(picture, app, app_data, flags)
+        if not accurate:
+            self.mismatches += 1
+        self.put(uid, picture, app, app_data, flags)
+        return accurate
+
+    def invalidate(self, uid):
+        """
+        Forget cached contents for uid, e.g. because it is being written.
+        """
+        self.entries.pop(bytes(uid), None)
+
+    def stats(self):
+        """
+        Return statistics for gestalt reporting.
+        """
+        lookups = self.hits + self.misses
+        if lookups:
+            hit_rate = round(self.hits / lookups, 3)
+        else:
+            hit_rate = None
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "mismatches": self.mismatches,
+            "hit_rate": hit_rate,
+        }
@@ -3,15 +3,17 @@ import functools
 import logging
 import os
 from enum import Enum
-from threading import Timer
 
 from .rfid import Rfid, TagFlags
+from .rfid_cache import TagCache
+from .timer import LoopTimer
 
 
 class RfidDevState(Enum):  # pragma: no cover
     DISABLED = "disabled"
     POLLING_ONCE = "polling_once"
     POLLING_REPEAT = "polling_repeat"
+    POLLING_PAUSED = "polling_paused"
     READING_BLOCKS = "reading"
     WRITING_BLOCKS = "writing"
 
@@ -25,13 +27,19 @@ class RfidDev(Rfid):  # pragma: no cover
     DEVICE_PATH = "/dev/rfid0"
     NABAZTAG_SIGNATURE = b"Nb"
     POLLING_TIMEOUT = 1.0
+    LOW_POWER_POLLING_INTERVAL = 5.0
+    TAG_CACHE_SIZE = 32
 
     def __init__(self):
         self.__state = RfidDevState.DISABLED
         self.__current_uid = None
         self.__current_picture = None
         self.__current_app = None
-        self.__polling_timer = None
+        self.__polling_timer = LoopTimer()
+        self.__tag_cache = TagCache(RfidDev.TAG_CACHE_SIZE)
+        # Whether the tag being read was raised from cache
+        self.__verifying = False
+        self.__low_power = False
         self.__callback = None
         self.__write_condition = asyncio.Condition()
         self.__written_data = None
@@ -51,7 +59,9 @@ class RfidDev(Rfid):  # pragma: no cover
         """
         Asyncio read callback.
         """
-        self._cancel_timer()
+        if self.__state != RfidDevState.POLLING_PAUSED:
+            # Packets are ignored while paused, keep timer resuming polling
+            self._cancel_timer()
         packet_header = os.read(self.__fd, 1)
         if packet_header == b"u":
             # UID packet.
@@ -84,14 +94,26 @@ class RfidDev(Rfid):  # pragma: no cover
             self.__state = RfidDevState.POLLING_ONCE
             os.write(self.__fd, b"p")
 
+    def _resume_polling(self):
+        """
+        Timer invoked to check if tag is still there after polling was
+        paused.
+        """
+        if self.__state == RfidDevState.POLLING_PAUSED:
+            self.__state = RfidDevState.POLLING_REPEAT
+            os.write(self.__fd, b"P")
+            self._start_timer()
+
+    def set_low_power(self, enabled):
+        self.__low_power = enabled
+        if not enabled:
+            self._resume_polling()
+
     def _start_timer(self):
-        self.__polling_timer = Timer(RfidDev.POLLING_TIMEOUT, self._timer_cb)
-        self.__polling_timer.start()
+        self.__polling_timer.start(RfidDev.POLLING_TIMEOUT, self._timer_cb)
 
     def _cancel_timer(self):
-        if self.__polling_timer:
-            self.__polling_timer.cancel()
-            self.__polling_timer = None
+        self.__polling_timer.cancel()
 
     def _process_uid(self, uid_le):
         if (
@@ -103,8 +125,17 @@ class RfidDev(Rfid):  # pragma: no cover
         uid.reverse()
         if self.__state == RfidDevState.POLLING_REPEAT:
             if uid == self.__current_uid:
-                # Simply reset timer
-                self._start_timer()
+                if self.__low_power:
+                    # Pause polling while tag sits on the reader
+                    self.__state = RfidDevState.POLLING_PAUSED
+                    os.write(self.__fd, b"i")
+                    self.__polling_timer.start(
+                        RfidDev.LOW_POWER_POLLING_INTERVAL,
+                        self._resume_polling,
+                    )
+                else:
+                    # Simply reset timer
+                    self._start_timer()
                 return
             else:
                 # Previous tag has been removed
@@ -114,6 +145,13 @@ class RfidDev(Rfid):  # pragma: no cover
         self.__current_picture = None
         self.__current_app = None
         if RfidDev.is_compatible(uid):
+            # Raise event from cache, and verify it by reading the tag.
+            cached = self.__tag_cache.get(uid)
+            self.__verifying = cached is not None
+            if cached is not None:
+                self.__current_picture = cached.picture
+                self.__current_app = cached.app
+                self._invoke_callback(cached.app_data, cached.flags)
             # Read system and blocks 7-15
             os.write(
                 self.__fd,
@@ -132,6 +170,8 @@ class RfidDev(Rfid):  # pragma: no cover
         if self.__state != RfidDevState.READING_BLOCKS:
             return
         # check read data.
+        self.__current_picture = None
+        self.__current_app = None
         first_block_le = data[0:4]
         first_block = bytearray(first_block_le)
         first_block.reverse()
@@ -155,7 +195,26 @@ class RfidDev(Rfid):  # pragma: no cover
                 flags |= TagFlags.FOREIGN_DATA
             else:
                 flags |= TagFlags.CLEAR
-        self._invoke_callback(app_data, flags)
+        if self.__verifying:
+            self.__verifying = False
+            if not self.__tag_cache.verify(
+                self.__current_uid,
+                self.__current_picture,
+                self.__current_app,
+                app_data,
+                flags,
+            ):
+                # Tag was modified since it was cached
+                self._invoke_callback(app_data, flags)
+        else:
+            self.__tag_cache.put(
+                self.__current_uid,
+                self.__current_picture,
+                self.__current_app,
+                app_data,
+                flags,
+            )
+            self._invoke_callback(app_data, flags)
         self.__state = RfidDevState.POLLING_REPEAT
         os.write(self.__fd, b"P")
         self._start_timer()
@@ -226,6 +285,9 @@ class RfidDev(Rfid):  # pragma: no cover
             )
             loop.call_soon_threadsafe(partial)
 
+    def get_cache_stats(self):
+        return self.__tag_cache.stats()
+
     @staticmethod
     def is_available():
         return os.path.exists(RfidDev.DEVICE_PATH)
@@ -250,6 +312,7 @@ class RfidDev(Rfid):  # pragma: no cover
     async def write(self, uid: str, picture: int, app: int, data: bytes):
         if self.__fd is None:
             return False
+        self.__tag_cache.invalidate(uid)
         self.__state = RfidDevState.WRITING_BLOCKS
         first_block = bytearray(RfidDev.NABAZTAG_SIGNATURE) + bytes(
             [picture, app]
@@ -1,6 +1,7 @@
 import abc
 
 from .resources import Resources
+from .sound_variants import SoundVariants
 
 
 class Sound(object, metaclass=abc.ABCMeta):
@@ -10,19 +11,29 @@ class Sound(object, metaclass=abc.ABCMeta):
         # For now only consider local paths
         file = await Resources.find("sounds", audio_resource)
         if file is not None:
+            # Prefer variant transcoded ahead of time, not decoded when played
+            variant = SoundVariants.find(file)
+            if variant is not None:
+                return variant.as_posix()
             return file.as_posix()
         print(f"Warning : could not find resource {audio_resource}")
         return None
 
-    async def play_list(self, filenames, preloaded, event=None):
-        preloaded_list = []
+    async def preload_list(self, filenames, preloaded):
+        """
+        Preload a list of sounds, skipping sounds which were not found.
+        """
         if preloaded:
-            preloaded_list = filenames
-        else:
-            for filename in filenames:
-                preloaded_file = await self.preload(filename)
-                if preloaded_file is not None:
-                    preloaded_list.append(preloaded_file)
+            return filenames
+        preloaded_list = []
+        for filename in filenames:
+            preloaded_file = await self.preload(filename)
+            if preloaded_file is not None:
+                preloaded_list.append(preloaded_file)
+        return preloaded_list
+
+    async def play_list(self, filenames, preloaded, event=None):
+        preloaded_list = await self.preload_list(filenames, preloaded)
         await self.stop_playing()
         for filename in preloaded_list:
             await self.start_playing_preloaded(filename)
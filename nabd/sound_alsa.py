@@ -1,15 +1,19 @@
 import asyncio
 import functools
-import io
+import queue
+import threading
+import time
 import traceback
-import wave
 from concurrent.futures import ThreadPoolExecutor
 
 import alsaaudio
 from mpg123 import Mpg123
 
+from . import pcm
 from .cancel import wait_with_cancel_event
 from .sound import Sound
+from .sound_cache import SoundCache
+from .wav import map_wav
 
 
 class SoundAlsa(Sound):  # pragma: no cover
@@ -21,7 +25,33 @@ class SoundAlsa(Sound):  # pragma: no cover
         (MODEL_2018_CARD_NAME, MODEL_2019_CARD_NAME)
     )
 
-    def __init__(self, hw_model):
+    # Memory budget for decoded sounds, and maximum size of a single sound
+    # (about 6 seconds of 44.1 kHz stereo)
+    PCM_CACHE_SIZE = 8 * 1024 * 1024
+    PCM_CACHE_MAX_ENTRY_SIZE = 1024 * 1024
+
+    # Format of the playback stream. Sounds are converted to this format so
+    # that consecutive sounds are written to the same stream.
+    STREAM_RATE = pcm.RATE
+    STREAM_CHANNELS = pcm.CHANNELS
+    STREAM_WIDTH = pcm.WIDTH
+    STREAM_FRAME_BYTES = pcm.FRAME_BYTES
+    STREAM_PERIOD_SIZE = STREAM_RATE // 20  # 1/20th of second
+    STREAM_PERIOD_BYTES = STREAM_PERIOD_SIZE * STREAM_FRAME_BYTES
+    STREAM_PERIOD_DURATION = STREAM_PERIOD_SIZE / STREAM_RATE
+    # Maximum number of periods decoded ahead of the stream (1 second)
+    STREAM_QUEUE_PERIODS = 20
+    # Delay after which an idle stream is closed, in seconds
+    STREAM_IDLE_TIMEOUT = 1.0
+    # Padding for the last period of a job
+    SILENCE = memoryview(bytes(STREAM_PERIOD_BYTES))
+
+    def __init__(
+        self,
+        hw_model,
+        pcm_cache_size=PCM_CACHE_SIZE,
+        pcm_cache_max_entry_size=PCM_CACHE_MAX_ENTRY_SIZE,
+    ):
 
         (
             card_index,
@@ -52,11 +82,22 @@ class SoundAlsa(Sound):  # pragma: no cover
                 )
 
         self.executor = ThreadPoolExecutor(max_workers=1)
+        self.cache = SoundCache(pcm_cache_size, pcm_cache_max_entry_size)
 
         self.future = None
+        self.job = None
         self.currently_playing = False
         self.currently_recording = False
 
+        # Bounded queue of periods, written by the stream thread
+        self.playback_queue = queue.Queue(
+            maxsize=SoundAlsa.STREAM_QUEUE_PERIODS
+        )
+        self.stream_thread = threading.Thread(
+            target=self._stream_loop, daemon=True
+        )
+        self.stream_thread.start()
+
     @staticmethod
     @functools.lru_cache()
     def sound_configuration():
@@ -99,87 +140,224 @@ class SoundAlsa(Sound):  # pragma: no cover
         """
         return self.sound_card
 
-    def _play(self, filename):
+    def get_cache_stats(self):
+        """
+        Get decoded sounds cache statistics for gestalt reporting.
+        """
+        return self.cache.stats()
+
+    def _start(self, filenames):
+        """
+        Queue a playback job for a list of files.
+        """
+        self.currently_playing = True
+        self.job = PlaybackJob(filenames)
+        self.future = asyncio.get_event_loop().run_in_executor(
+            self.executor, lambda job=self.job: self._play(job)
+        )
+
+    def _play(self, job):
+        """
+        Decode files of a job and feed the playback stream with periods.
+        Return when the playback stream played the last period of the job.
+        Thread: executor
+        """
         try:
-            device = alsaaudio.PCM(device=self.playback_device)
-            if filename.endswith(".wav"):
-                with wave.open(filename, "rb") as f:
-                    channels = f.getnchannels()
-                    width = f.getsampwidth()
-                    rate = f.getframerate()
-                    self._setup_device(device, channels, rate, width)
-                    periodsize = rate // 10  # 1/10th of second
-                    device.setperiodsize(periodsize)
-                    target_chunk_size = periodsize * channels * width
-
-                    chunk = io.BytesIO()
-                    # tracking chunk length is technically useless here but we
-                    # do it for consistency
-                    chunk_length = 0
-                    data = f.readframes(periodsize)
-                    while data and self.currently_playing:
-                        chunk_length += chunk.write(data)
-
-                        if chunk_length < target_chunk_size:
-                            # This (probably) is last iteration.
-                            # ALSA device expects chunks of fixed period size
-                            # Pad the sound with silence to complete chunk
-                            chunk_length += chunk.write(
-                                bytearray(target_chunk_size - chunk_length)
-                            )
-
-                        device.write(chunk.getvalue())
-                        chunk.seek(0)
-                        chunk_length = 0
-                        data = f.readframes(periodsize)
-
-            elif filename.endswith(".mp3"):
-                mp3 = Mpg123(filename)
-                rate, channels, encoding = mp3.get_format()
-                width = mp3.get_width_by_encoding(encoding)
-                self._setup_device(device, channels, rate, width)
-                periodsize = rate // 10  # 1/10th of second
-                device.setperiodsize(periodsize)
-                target_chunk_size = periodsize * width * channels
-                chunk = io.BytesIO()
-                chunk_length = 0
-                for frames in mp3.iter_frames():
-                    if (chunk_length + len(frames)) <= target_chunk_size:
-                        # Chunk is still smaller than what ALSA device expects
-                        # (0.1 sec)
-                        chunk_length += chunk.write(frames)
-                    else:
-                        frames_view = memoryview(frames)
-                        remaining = target_chunk_size - chunk_length
-                        chunk_length += chunk.write(frames_view[:remaining])
-                        device.write(chunk.getvalue())
-                        chunk.seek(0)
-                        chunk_length = 0
-                        chunk_length += chunk.write(frames_view[remaining:])
-
-                    if not self.currently_playing:
+            remainder = bytearray()
+            for filename in job.filenames:
+                for data in self._decode(filename, job):
+                    remainder = self._queue_periods(job, remainder, data)
+                    if job.canceled:
                         break
-
+                if job.canceled:
+                    break
+            if remainder and not job.canceled:
                 # ALSA device expects chunks of fixed period size
                 # Pad the sound with silence to complete last chunk
-                if chunk_length > 0:
-                    remaining = target_chunk_size - chunk_length
-                    chunk.write(bytearray(remaining))
-                    device.write(chunk.getvalue())
+                padding = SoundAlsa.STREAM_PERIOD_BYTES - len(remainder)
+                self.playback_queue.put(
+                    (job, bytes(remainder) + SoundAlsa.SILENCE[:padding])
+                )
         finally:
+            self.playback_queue.put((job, None))
+            job.done.wait()
             self.currently_playing = False
-            device.close()
 
-    def _setup_device(self, device, channels, rate, width):
-        # Set attributes
-        device.setchannels(channels)
-        device.setrate(rate)
+    def _queue_periods(self, job, remainder, data):
+        """
+        Queue complete periods from remainder of previous data and data.
+        Return the new remainder.
+        """
+        period_bytes = SoundAlsa.STREAM_PERIOD_BYTES
+        view = memoryview(data)
+        offset = 0
+        if remainder:
+            offset = period_bytes - len(remainder)
+            remainder += view[:offset]
+            if len(remainder) < period_bytes:
+                return remainder
+            self.playback_queue.put((job, bytes(remainder)))
+        while len(view) - offset >= period_bytes and not job.canceled:
+            # data is immutable, slices can be written later by stream thread
+            self.playback_queue.put(
+                (job, view[offset : offset + period_bytes])
+            )
+            offset += period_bytes
+        return bytearray(view[offset:])
 
-        device.setformat(SoundAlsa.__PCM_FORMAT_BY_WIDTH[width])
+    def _decode(self, filename, job):
+        """
+        Decode a file, yielding PCM data converted to stream format.
+        Thread: executor
+        """
+        key = SoundCache.key(filename)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached.pcm
+            return
+        if filename.endswith(".wav"):
+            wav = map_wav(filename)
+            if pcm.is_native(wav.channels, wav.rate, wav.width):
+                # Already in stream format: periods are slices of the mapped
+                # file, there is nothing to decode or to cache.
+                yield wav.pcm
+                return
+            nframes = len(wav.pcm) // (wav.channels * wav.width)
+            converted_size = (
+                nframes * SoundAlsa.STREAM_RATE // wav.rate + 1
+            ) * SoundAlsa.STREAM_FRAME_BYTES
+            if self.cache.accepts(converted_size):
+                decoded = bytearray()
+            else:
+                decoded = None
+            # 1/10th of second
+            chunk_size = wav.rate // 10 * wav.channels * wav.width
+            state = None
+            for offset in range(0, len(wav.pcm), chunk_size):
+                if job.canceled:
+                    break
+                data, state = pcm.convert(
+                    wav.pcm[offset : offset + chunk_size],
+                    wav.channels,
+                    wav.rate,
+                    wav.width,
+                    state,
+                )
+                if decoded is not None:
+                    decoded += data
+                yield data
+        elif filename.endswith(".mp3"):
+            mp3 = Mpg123(filename)
+            rate, channels, encoding = mp3.get_format()
+            width = mp3.get_width_by_encoding(encoding)
+            decoded = bytearray()
+            state = None
+            for frames in mp3.iter_frames():
+                if job.canceled:
+                    break
+                data, state = pcm.convert(frames, channels, rate, width, state)
+                if decoded is not None:
+                    decoded += data
+                    if not self.cache.accepts(len(decoded)):
+                        decoded = None
+                yield data
+        else:
+            print(f"Warning : unsupported sound format {filename}")
+            return
+        if not job.canceled and decoded is not None:
+            self.cache.put(
+                key,
+                SoundAlsa.STREAM_RATE,
+                SoundAlsa.STREAM_CHANNELS,
+                SoundAlsa.STREAM_WIDTH,
+                decoded,
+            )
+
+    def _stream_loop(self):
+        """
+        Write queued periods to the playback stream.
+        Stream is opened on demand and kept open until it remains idle for
+        STREAM_IDLE_TIMEOUT, so consecutive sounds are played without gaps.
+        Periods of a canceled job which were already written are dropped
+        from the device buffer.
+        Thread: stream
+        """
+        device = None
+        # Job whose periods were written to device last
+        written_job = None
+        # Estimated time when written periods will have been played
+        play_end = 0
+        while True:
+            try:
+                if device is None:
+                    item = self.playback_queue.get()
+                else:
+                    item = self.playback_queue.get(
+                        timeout=SoundAlsa.STREAM_IDLE_TIMEOUT
+                    )
+            except queue.Empty:
+                item = None
+            if item is None:
+                if device is not None:
+                    device.close()
+                    device = None
+                written_job = None
+                continue
+            job, chunk = item
+            if chunk is None and not job.canceled and written_job is job:
+                # Wait until periods in device buffer are played
+                job.cancel_event.wait(max(0, play_end - time.monotonic()))
+            if job.canceled:
+                if written_job is job:
+                    written_job = None
+                    try:
+                        device.drop()
+                    except alsaaudio.ALSAAudioError:
+                        print(traceback.format_exc())
+                        device.close()
+                        device = None
+            elif chunk is not None:
+                try:
+                    if device is None:
+                        device = self._open_stream()
+                    now = time.monotonic()
+                    device.write(chunk)
+                    written_job = job
+                    play_end = (
+                        max(play_end, now) + SoundAlsa.STREAM_PERIOD_DURATION
+                    )
+                except alsaaudio.ALSAAudioError:
+                    print(traceback.format_exc())
+                    job.cancel()
+                    written_job = None
+                    if device is not None:
+                        device.close()
+                        device = None
+            if chunk is None:
+                job.done.set()
+
+    def _open_stream(self):
+        device = alsaaudio.PCM(device=self.playback_device)
+        device.setchannels(SoundAlsa.STREAM_CHANNELS)
+        device.setrate(SoundAlsa.STREAM_RATE)
+        device.setformat(alsaaudio.PCM_FORMAT_S16_LE)
+        device.setperiodsize(SoundAlsa.STREAM_PERIOD_SIZE)
+        return device
+
+    async def play_list(self, filenames, preloaded, event=None):
+        """
+        Play files as a single job, without gaps between them.
+        """
+        preloaded_list = await self.preload_list(filenames, preloaded)
+        await self.stop_playing()
+        if preloaded_list != []:
+            self._start(preloaded_list)
+            await self.wait_until_done(event)
 
     async def stop_playing(self):
         if self.currently_playing:
             self.currently_playing = False
+            self.job.cancel()
         await self.wait_until_done()
 
     async def wait_until_done(self, event=None):
@@ -188,6 +366,8 @@ class SoundAlsa(Sound):  # pragma: no cover
 
     async def start_recording(self, stream_cb):
         await self.stop_playing()
+        # Release playback stream
+        self.playback_queue.put(None)
         self.currently_recording = True
         self.recorded_raw = open("sound_alsa_recording.raw", "wb")
         self.future = asyncio.get_event_loop().run_in_executor(
@@ -282,15 +462,21 @@ class SoundAlsa(Sound):  # pragma: no cover
 
     async def start_playing_preloaded(self, filename):
         await self.stop_playing()
-        self.currently_playing = True
-        self.future = asyncio.get_event_loop().run_in_executor(
-            self.executor, lambda f=filename: self._play(f)
-        )
+        self._start([filename])
+
+
+class PlaybackJob(object):  # pragma: no cover
+    """
+    A list of files played as a whole.
+    done is set by the stream thread when the last period was played.
+    """
+
+    def __init__(self, filenames):
+        self.filenames = filenames
+        self.canceled = False
+        self.cancel_event = threading.Event()
+        self.done = threading.Event()
 
-    __PCM_FORMAT_BY_WIDTH = {
-        1: alsaaudio.PCM_FORMAT_U8,  # 8bit is unsigned in wav files
-        # Otherwise we assume signed data, little endian
-        2: alsaaudio.PCM_FORMAT_S16_LE,
-        4: alsaaudio.PCM_FORMAT_S32_LE,
-    }
-    """ Mapping between the PCM format and the width of a sound """
+    def cancel(self):
+        self.canceled = True
+        self.cancel_event.set()
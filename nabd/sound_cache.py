@@ -0,0 +1,91 @@
+import collections
+import os
+import threading
+
+CachedSound = collections.namedtuple(
+    "CachedSound", ["rate", "channels", "width", "pcm"]
+)
+
+
+class SoundCache(object):
+    """
+    Bounded LRU cache of decoded PCM sounds, keyed by file path and
+    modification time.
+    Sizes are expressed in bytes of PCM data.
+    """
+
+    def __init__(self, max_size, max_entry_size):
+        self.max_size = max_size
+        self.max_entry_size = max_entry_size
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(filename):
+        """
+        Return the key for a given file.
+        """
+        return (filename, os.stat(filename).st_mtime_ns)
+
+    def get(self, key):
+        """
+        Return cached sound for key, or None.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            return entry
+
+    def accepts(self, size):
+        """
+        Determine if a sound of a given size can be cached.
+        """
+        return size <= self.max_entry_size and size <= self.max_size
+
+    def put(self, key, rate, channels, width, pcm):
+        """
+        Cache a decoded sound, evicting least recently used sounds and older
+        versions of the same file.
+        Return True if the sound was cached.
+        """
+        if not self.accepts(len(pcm)):
+            return False
+        filename, _ = key
+        with self.lock:
+            for old_key in list(self.entries.keys()):
+                if old_key[0] == filename:
+                    self._evict(old_key)
+            while self.size + len(pcm) > self.max_size:
+                self._evict(next(iter(self.entries)))
+            self.entries[key] = CachedSound(rate, channels, width, bytes(pcm))
+            self.size += len(pcm)
+        return True
+
+    def _evict(self, key):
+        entry = self.entries.pop(key)
+        self.size -= len(entry.pcm)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """
+        Return statistics for gestalt reporting.
+        """
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "size": self.size,
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
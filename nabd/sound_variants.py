@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import threading
+import wave
+from pathlib import Path
+
+from nabweb import settings
+
+from . import pcm
+from .wav import map_wav
+
+
+class SoundVariants(object):
+    """
+    Sounds transcoded ahead of time to WAV files by the transcode_sounds
+    command, so they are not decoded at play time.
+    Variants keep the rate and channels of the source, with samples of the
+    native width, as resampling is cheap compared to decoding and would
+    multiply the size of variants.
+    Variants are stored in a content-addressed cache directory, with a
+    manifest mapping source files to their variant.
+    """
+
+    MANIFEST = "manifest.json"
+    MANIFEST_VERSION = 2
+    # Default maximum size of variants
+    MAX_SIZE = 256 << 20
+
+    cache_dir = Path(settings.BASE_DIR, ".sounds_cache")
+
+    # source path -> {"mtime_ns", "size", "variant"}
+    manifest = None
+    manifest_mtime = None
+    lock = threading.Lock()
+
+    @staticmethod
+    def manifest_path():
+        return SoundVariants.cache_dir.joinpath(SoundVariants.MANIFEST)
+
+    @staticmethod
+    def read_manifest():
+        """
+        Read manifest from disk.
+        Return an empty manifest if it is missing, invalid or for another
+        format.
+        """
+        try:
+            with open(SoundVariants.manifest_path(), "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if (
+            data.get("version") != SoundVariants.MANIFEST_VERSION
+            or data.get("format") != SoundVariants.format()
+        ):
+            return {}
+        return data.get("sounds", {})
+
+    @staticmethod
+    def write_manifest(sounds):
+        """
+        Atomically write manifest to disk.
+        """
+        path = SoundVariants.manifest_path()
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "version": SoundVariants.MANIFEST_VERSION,
+                    "format": SoundVariants.format(),
+                    "sounds": sounds,
+                },
+                f,
+                indent=1,
+                sort_keys=True,
+            )
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def format():
+        return {"width": pcm.WIDTH}
+
+    @staticmethod
+    def refresh():
+        """
+        Reload manifest if it was modified.
+        Return True if it was reloaded.
+        """
+        try:
+            mtime = SoundVariants.manifest_path().stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        with SoundVariants.lock:
+            if (
+                SoundVariants.manifest is not None
+                and mtime == SoundVariants.manifest_mtime
+            ):
+                return False
+            SoundVariants.manifest = SoundVariants.read_manifest()
+            SoundVariants.manifest_mtime = mtime
+            return True
+
+    @staticmethod
+    def find(path):
+        """
+        Find the transcoded variant of a sound file.
+        Return None if there is no up-to-date variant.
+        """
+        if SoundVariants.manifest is None:
+            SoundVariants.refresh()
+        entry = SoundVariants.manifest.get(Path(path).as_posix())
+        if entry is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if (stat.st_mtime_ns, stat.st_size) != (
+            entry["mtime_ns"],
+            entry["size"],
+        ):
+            return None
+        variant = SoundVariants.cache_dir.joinpath(entry["variant"])
+        if not variant.is_file():
+            return None
+        return variant
+
+    @staticmethod
+    def digest(path):
+        """
+        Compute the name of the variant of a sound file from its content.
+        """
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(65536), b""):
+                h.update(block)
+        return h.hexdigest() + ".wav"
+
+    @staticmethod
+    def decode(path):
+        """
+        Decode a sound file, yielding chunks of (channels, rate, width, data).
+        """
+        path = Path(path)
+        if path.suffix == ".wav":
+            wav = map_wav(path)
+            # 1 second chunks
+            chunk_size = wav.rate * wav.channels * wav.width
+            for offset in range(0, len(wav.pcm), chunk_size):
+                yield (
+                    wav.channels,
+                    wav.rate,
+                    wav.width,
+                    wav.pcm[offset : offset + chunk_size],
+                )
+        elif path.suffix == ".mp3":
+            from mpg123 import Mpg123
+
+            mp3 = Mpg123(path.as_posix())
+            rate, channels, encoding = mp3.get_format()
+            width = mp3.get_width_by_encoding(encoding)
+            for frames in mp3.iter_frames():
+                yield channels, rate, width, frames
+        else:
+            raise ValueError(f"Unsupported sound format {path}")
+
+    @staticmethod
+    def needs_variant(path):
+        """
+        Determine if a sound file needs to be transcoded.
+        WAV files with samples of native width are played as is.
+        """
+        path = Path(path)
+        if path.suffix == ".mp3":
+            return True
+        if path.suffix == ".wav":
+            return map_wav(path).width != pcm.WIDTH
+        return False
+
+    @staticmethod
+    def transcode(source, destination):
+        """
+        Transcode a sound file to a WAV file with samples of native width.
+        """
+        destination = Path(destination)
+        tmp_path = destination.with_suffix(".tmp")
+        try:
+            with wave.open(tmp_path.as_posix(), "wb") as f:
+                f.setnchannels(pcm.CHANNELS)
+                f.setframerate(pcm.RATE)
+                f.setsampwidth(pcm.WIDTH)
+                written = False
+                for channels, rate, width, data in SoundVariants.decode(
+                    source
+                ):
+                    if not written:
+                        # Format can be set until frames are written
+                        f.setnchannels(channels)
+                        f.setframerate(rate)
+                        written = True
+                    f.writeframesraw(pcm.convert_width(data, width))
+            os.replace(tmp_path, destination)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+
+
+class PartialHypothesis(object):
+    """
+    Track partial hypotheses of the ASR decoder while recording.
+    A hypothesis is published when it changes, and published again as
+    stable when it did not change for STABLE_DECODES more decodes.
+    Thread: ASR executor
+    """
+
+    STABLE_DECODES = 1
+
+    def __init__(self):
+        self.text = None
+        self.unchanged = 0
+
+    def reset(self):
+        self.text = None
+        self.unchanged = 0
+
+    def update(self, text):
+        """
+        Process a new partial hypothesis.
+        Return whether it should be published, and whether it is stable.
+        """
+        if text != self.text:
+            self.text = text
+            self.unchanged = 0
+            return True, False
+        self.unchanged += 1
+        if self.unchanged == PartialHypothesis.STABLE_DECODES:
+            return True, True
+        return False, False
+
+
+class SpeculativeNLU(object):
+    """
+    Run NLU speculatively on stable partial ASR hypotheses while recording,
+    so intent is ready when recording ends.
+    Thread: event loop
+    """
+
+    def __init__(self, interpret):
+        """
+        interpret is the NLU coroutine function, e.g. NLU.interpret.
+        """
+        self.interpret = interpret
+        # Text of current speculation, and task interpreting it
+        self.text = None
+        self.task = None
+
+    def partial(self, text, stable):
+        """
+        Process a partial hypothesis, speculating if it is stable.
+        A previous speculation still running is cancelled.
+        """
+        if not stable or not text or text == self.text:
+            return
+        if self.task is not None:
+            self.task.cancel()
+        self.text = text
+        self.task = asyncio.ensure_future(self.interpret(text))
+
+    async def result(self, text, stats=None):
+        """
+        Return NLU response for final text, reusing speculation if it was
+        run on the same text.
+        """
+        task = self.task
+        speculated = task is not None
+        if speculated and self.text == text:
+            ready = task.done()
+            await asyncio.wait([task])
+            if not task.cancelled() and task.exception() is None:
+                if stats is not None:
+                    stats.record(True, True, ready)
+                return task.result()
+            logging.error(f"Speculative NLU failed: {task!r}")
+        finished = (
+            speculated
+            and task.done()
+            and not task.cancelled()
+            and task.exception() is None
+        )
+        if speculated and not task.done():
+            # Missed, final text is different
+            task.cancel()
+        response = await self.interpret(text)
+        if stats is not None:
+            stats.record(speculated, False, False)
+            if finished:
+                stats.record_intent(task.result(), response)
+        return response
+
+
+class SpeculationStats(object):
+    """
+    Comparison of speculative and final NLU results, for gestalt reporting.
+    """
+
+    def __init__(self):
+        self.count = 0
+        # Utterances with at least one speculation
+        self.speculated = 0
+        # Speculation was run on final text
+        self.hits = 0
+        # Speculation on final text was done when recording ended
+        self.ready = 0
+        # Speculation on another text, with same intent as final result
+        self.intent_matches = 0
+        self.intent_mismatches = 0
+
+    def record(self, speculated, hit, ready):
+        self.count += 1
+        if speculated:
+            self.speculated += 1
+        if hit:
+            self.hits += 1
+        if ready:
+            self.ready += 1
+
+    def record_intent(self, speculative, final):
+        if SpeculationStats.intent(speculative) == SpeculationStats.intent(
+            final
+        ):
+            self.intent_matches += 1
+        else:
+            self.intent_mismatches += 1
+
+    @staticmethod
+    def intent(response):
+        if response is None:
+            return None
+        return response["intent"]
+
+    def stats(self):
+        return {
+            "count": self.count,
+            "speculated": self.speculated,
+            "hits": self.hits,
+            "ready": self.ready,
+            "intent_matches": self.intent_matches,
+            "intent_mismatches": self.intent_mismatches,
+        }
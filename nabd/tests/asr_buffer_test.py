@@ -0,0 +1,48 @@
+import struct
+import time
+import unittest
+
+import numpy as np
+
+from nabd.asr_buffer import SampleBuffer
+
+# 100ms of 16 kHz mono capture
+CHUNK_FRAMES = 1600
+
+
+class TestSampleBuffer(unittest.TestCase):
+    def test_convert(self):
+        buffer = SampleBuffer()
+        data = struct.pack("<4h", 0, 1, -1, -32768)
+        samples = buffer.convert(data)
+        self.assertEqual(samples.dtype, np.float32)
+        self.assertEqual(samples.tolist(), [0.0, 1.0, -1.0, -32768.0])
+
+    def test_convert_odd(self):
+        buffer = SampleBuffer()
+        samples = buffer.convert(struct.pack("<2h", 7, 8) + b"\x01")
+        self.assertEqual(samples.tolist(), [7.0, 8.0])
+
+    def test_reuse(self):
+        buffer = SampleBuffer(4)
+        first = buffer.convert(struct.pack("<2h", 1, 2))
+        second = buffer.convert(struct.pack("<2h", 3, 4))
+        self.assertTrue(np.shares_memory(first, second))
+        larger = buffer.convert(struct.pack("<8h", *range(8)))
+        self.assertEqual(larger.tolist(), list(range(8)))
+        self.assertEqual(len(buffer.buffer), 8)
+
+    def test_throughput(self):
+        """
+        Micro-benchmark: conversion should be way faster than real time,
+        even on a Pi Zero.
+        """
+        buffer = SampleBuffer()
+        chunk = np.arange(CHUNK_FRAMES, dtype="<i2").tobytes()
+        chunks = 600  # 1 minute
+        start = time.perf_counter()
+        for _ in range(chunks):
+            buffer.convert(chunk)
+        elapsed = time.perf_counter() - start
+        realtime = chunks * CHUNK_FRAMES / 16000
+        self.assertLess(elapsed, realtime / 100)
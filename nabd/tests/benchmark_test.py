@@ -0,0 +1,149 @@
+import asyncio
+import json
+import math
+import shutil
+import struct
+import tempfile
+import time
+import unittest
+import wave
+from pathlib import Path
+
+from nabd.benchmark import (
+    PipelineBenchmark,
+    Utterance,
+    load_corpus,
+    read_pcm,
+)
+from nabd.vad import Endpointer
+
+
+def make_pcm(silence, speech, trailing):
+    """
+    Captured audio with a tone between silences, durations in seconds.
+    """
+
+    def samples(duration, amplitude):
+        count = int(duration * Endpointer.RATE)
+        return [
+            int(amplitude * math.sin(2 * math.pi * 440 * i / Endpointer.RATE))
+            for i in range(count)
+        ]
+
+    values = samples(silence, 0) + samples(speech, 8000)
+    values += samples(trailing, 0)
+    return struct.pack(f"<{len(values)}h", *values)
+
+
+class ASRMock(object):
+    def __init__(self):
+        self.chunks = []
+        self.finalized = False
+
+    def decode_chunk(self, data, finalize):
+        self.chunks.append(data)
+        self.finalized = finalize
+
+    async def get_decoded_string(self, sync):
+        return "tell me a joke" if self.finalized else ""
+
+
+class NLUMock(object):
+    async def interpret(self, text):
+        if text == "tell me a joke":
+            return {"intent": "nabsurprised/surprise"}
+        return None
+
+
+class TestPipelineBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.asr = ASRMock()
+        self.benchmark = PipelineBenchmark(self.asr, NLUMock())
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_utterance(self, utterance, pacing):
+        return self.loop.run_until_complete(
+            self.benchmark.run(utterance, pacing)
+        )
+
+    def test_run(self):
+        utterance = Utterance(
+            "joke.wav", make_pcm(0.5, 1.0, 2.0), "nabsurprised/surprise", None
+        )
+        result = self.run_utterance(utterance, 0)
+        self.assertTrue(result["correct"])
+        self.assertTrue(result["endpointed"])
+        # Feeding stopped after trailing silence
+        self.assertLess(result["duration"], 3.5)
+        self.assertGreaterEqual(
+            result["duration"], 1.5 + Endpointer.END_SILENCE
+        )
+        self.assertIsNotNone(result["latency"])
+        self.assertIsNotNone(result["rtf"])
+
+    def test_pacing(self):
+        utterance = Utterance("silence.wav", make_pcm(1.0, 0, 0), None, "")
+        start = time.monotonic()
+        result = self.run_utterance(utterance, 10.0)
+        # 1 second of audio fed 10 times faster than real time
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+        self.assertEqual(result["duration"], 1.0)
+        self.assertGreaterEqual(result["rtf"], 0.09)
+        self.assertFalse(result["endpointed"])
+        self.assertIsNone(result["latency"])
+        self.assertEqual(result["text"], "tell me a joke")
+        self.assertFalse(result["correct"])
+
+    def test_summary(self):
+        results = [
+            self.run_utterance(
+                Utterance(
+                    "joke.wav",
+                    make_pcm(0.2, 0.5, 1.0),
+                    "nabsurprised/surprise",
+                    "tell me a joke",
+                ),
+                0,
+            ),
+            self.run_utterance(
+                Utterance("silence.wav", make_pcm(0.5, 0, 0), None, None), 0
+            ),
+        ]
+        summary = PipelineBenchmark.summary(results)
+        self.assertEqual(summary["count"], 2)
+        self.assertEqual(summary["intent_accuracy"], 0.5)
+        self.assertEqual(summary["text_accuracy"], 1.0)
+        self.assertEqual(summary["endpointed"], 1)
+        self.assertIn("rtf_mean", summary)
+        self.assertEqual(summary["latency_max"], results[0]["latency"])
+        self.assertEqual(PipelineBenchmark.summary([]), {"count": 0})
+
+
+class TestCorpus(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_load_corpus(self):
+        with wave.open(self.tmpdir.joinpath("joke.wav").as_posix(), "wb") as f:
+            f.setnchannels(2)
+            f.setframerate(44100)
+            f.setsampwidth(2)
+            f.writeframes(struct.pack("<2h", 1000, 3000) * 882)
+        with open(self.tmpdir.joinpath("corpus.json"), "w") as f:
+            json.dump({"joke.wav": {"intent": "nabsurprised/surprise"}}, f)
+        utterances = load_corpus(self.tmpdir)
+        self.assertEqual(len(utterances), 1)
+        self.assertEqual(utterances[0].name, "joke.wav")
+        self.assertEqual(utterances[0].intent, "nabsurprised/surprise")
+        self.assertIsNone(utterances[0].text)
+        # 20ms converted to mono at 16 kHz, resampling may drop a frame
+        pcm = read_pcm(self.tmpdir.joinpath("joke.wav"))
+        self.assertAlmostEqual(len(pcm), 320 * 2, delta=2)
+        self.assertEqual(struct.unpack("<h", pcm[-2:]), (2000,))
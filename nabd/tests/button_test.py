@@ -0,0 +1,106 @@
+import unittest
+
+from mock import VirtualClockLoop
+
+from nabd.button import ButtonStateMachine
+from nabd.timer import LoopTimer
+
+
+class TestLoopTimer(unittest.TestCase):
+    def setUp(self):
+        self.loop = VirtualClockLoop()
+        self.calls = []
+
+    def test_start(self):
+        timer = LoopTimer(self.loop)
+        timer.start(1.0, self.calls.append, "first")
+        self.assertTrue(timer.is_pending())
+        self.loop.advance(0.5)
+        self.assertEqual(self.calls, [])
+        self.loop.advance(0.5)
+        self.assertEqual(self.calls, ["first"])
+        self.assertFalse(timer.is_pending())
+
+    def test_restart(self):
+        timer = LoopTimer(self.loop)
+        timer.start(1.0, self.calls.append, "first")
+        self.loop.advance(0.5)
+        timer.start(1.0, self.calls.append, "second")
+        self.loop.advance(0.9)
+        self.assertEqual(self.calls, [])
+        self.loop.advance(0.1)
+        self.assertEqual(self.calls, ["second"])
+
+    def test_cancel(self):
+        timer = LoopTimer(self.loop)
+        timer.start(1.0, self.calls.append, "first")
+        timer.cancel()
+        self.assertFalse(timer.is_pending())
+        self.loop.advance(2.0)
+        self.assertEqual(self.calls, [])
+
+
+class TestButtonStateMachine(unittest.TestCase):
+    def setUp(self):
+        self.loop = VirtualClockLoop()
+        self.events = []
+        self.button = ButtonStateMachine(self.loop, self.callback)
+
+    def callback(self, event, event_time):
+        self.events.append(event)
+
+    def press(self, duration):
+        self.button.down(self.loop.time())
+        self.loop.advance(duration)
+        self.button.up(self.loop.time())
+
+    def test_click(self):
+        self.press(0.1)
+        self.loop.advance(0.1)
+        self.assertEqual(self.events, ["down", "up"])
+        self.loop.advance(0.1)
+        self.assertEqual(self.events, ["down", "up", "click"])
+
+    def test_double_click(self):
+        self.press(0.1)
+        self.loop.advance(0.1)
+        self.press(0.1)
+        self.loop.advance(1.0)
+        self.assertEqual(
+            self.events, ["down", "up", "down", "up", "double_click"]
+        )
+
+    def test_triple_click(self):
+        self.press(0.1)
+        self.loop.advance(0.1)
+        self.press(0.1)
+        self.loop.advance(0.1)
+        self.press(0.1)
+        self.loop.advance(3.0)
+        self.assertEqual(
+            self.events,
+            ["down", "up", "down", "up", "down", "up", "triple_click"],
+        )
+
+    def test_hold(self):
+        self.press(2.5)
+        self.loop.advance(1.0)
+        self.assertEqual(self.events, ["down", "hold", "up"])
+
+    def test_click_and_hold(self):
+        self.press(0.1)
+        self.loop.advance(0.1)
+        self.press(2.5)
+        self.loop.advance(0)
+        self.assertEqual(
+            self.events, ["down", "up", "down", "click_and_hold", "up"]
+        )
+
+    def test_bounce(self):
+        self.button.down(self.loop.time())
+        self.button.down(self.loop.time())
+        self.loop.advance(0.1)
+        self.button.up(self.loop.time())
+        self.button.up(self.loop.time())
+        self.loop.advance(1.0)
+        self.assertEqual(self.events, ["down", "up", "click"])
@@ -1,5 +1,6 @@
 import asyncio
 import base64
+import time
 import unittest
 
 import asynctest
@@ -7,7 +8,8 @@ import pytest
 from mock import EarsMock, LedsMock, SoundMock
 from utils import close_old_async_connections
 
-from nabd.choreography import ChoreographyInterpreter
+from nabd.choreography import ChoreographyInterpreter, TimingStats
+from nabd.resources import Resources
 
 
 class TestChoreographyBase(unittest.TestCase):
@@ -116,6 +118,130 @@ class TestChoreographyInterpreter(TestChoreographyBase):
         self.assertEqual(self.sound.called_list, [])
 
 
+class TestChoreographyCompile(unittest.TestCase):
+    def test_compile(self):
+        chor = base64.b16decode("010101010007020304050607000A02")
+        program = ChoreographyInterpreter.compile(chor)
+        self.assertEqual(len(program), 2)
+        self.assertEqual(
+            program[0],
+            (0, ChoreographyInterpreter.set_led_color, (2, 3, 4, 5)),
+        )
+        self.assertEqual(
+            program[1], (0, ChoreographyInterpreter.set_led_off, (2,))
+        )
+
+    def test_compile_ifne(self):
+        chor = base64.b16decode("00120100050012020000000A0200")
+        program = ChoreographyInterpreter.compile(chor)
+        self.assertEqual(len(program), 4)
+        self.assertEqual(program[0].operands, (1, 2))
+        self.assertEqual(program[1].operands, (2, 2))
+        # Final wait
+        self.assertEqual(program[3], (0, None, ()))
+
+    def test_compile_end(self):
+        chor = base64.b16decode("000A020AFF000A02")
+        program = ChoreographyInterpreter.compile(chor)
+        self.assertEqual(len(program), 2)
+        self.assertEqual(program[1], (10, None, ()))
+
+    def test_compile_streaming(self):
+        chor = base64.b16decode("0001050008010300")
+        program = ChoreographyInterpreter.compile(chor, "streaming")
+        self.assertEqual(
+            program,
+            (
+                (0, ChoreographyInterpreter.nop_1, ()),
+                (0, None, ()),
+            ),
+        )
+
+    def test_compile_truncated(self):
+        chor = base64.b16decode("00070203")
+        with self.assertRaises(ValueError):
+            ChoreographyInterpreter.compile(chor)
+
+
+class TestChoreographyTiming(TestChoreographyBase):
+    def test_catch_up(self):
+        async def block(ci):
+            time.sleep(0.2)
+
+        program = (
+            (0, block, ()),
+            (1, ChoreographyInterpreter.set_led_color, (2, 1, 1, 1)),
+            (1, ChoreographyInterpreter.set_led_color, (2, 2, 2, 2)),
+            (1, ChoreographyInterpreter.set_led_color, (1, 3, 3, 3)),
+            (1, ChoreographyInterpreter.set_led_color, (2, 4, 4, 4)),
+            (30, ChoreographyInterpreter.set_led_off, (2,)),
+        )
+        task = self.loop.create_task(self.ci.play_program(program, 10))
+        self.loop.run_until_complete(task)
+        self.assertEqual(
+            self.leds.called_list,
+            [
+                "set1(Led.CENTER,4,4,4)",
+                "set1(Led.RIGHT,3,3,3)",
+                "set1(Led.CENTER,0,0,0)",
+            ],
+        )
+        self.assertEqual(self.ci.timing.runs, 1)
+        last_run = self.ci.timing.last_run
+        self.assertEqual(last_run["frames"], 6)
+        # Three frames were merged into the fourth one
+        self.assertEqual(last_run["dropped_frames"], 3)
+        self.assertGreater(last_run["max_lateness_ms"], 100)
+
+    def test_slightly_late(self):
+        async def block(ci):
+            time.sleep(0.03)
+
+        program = (
+            (0, block, ()),
+            (1, ChoreographyInterpreter.set_led_color, (2, 1, 1, 1)),
+            (0, ChoreographyInterpreter.set_led_color, (1, 1, 1, 1)),
+            (1, ChoreographyInterpreter.set_led_color, (2, 2, 2, 2)),
+            (1, ChoreographyInterpreter.set_led_color, (2, 3, 3, 3)),
+        )
+        task = self.loop.create_task(self.ci.play_program(program, 10))
+        self.loop.run_until_complete(task)
+        # Frames late by less than FRAME_DROP_LATENESS are all published
+        self.assertEqual(
+            self.leds.called_list,
+            [
+                "set1(Led.CENTER,1,1,1)",
+                "set1(Led.RIGHT,1,1,1)",
+                "set1(Led.CENTER,2,2,2)",
+                "set1(Led.CENTER,3,3,3)",
+            ],
+        )
+        last_run = self.ci.timing.last_run
+        self.assertEqual(last_run["dropped_frames"], 0)
+        self.assertGreater(last_run["max_lateness_ms"], 0)
+
+    def test_stats(self):
+        stats = TimingStats()
+        self.assertEqual(stats.stats()["last_run"], None)
+        stats.record_run([i / 1000 for i in range(100)], 3)
+        stats.record_run([-0.001], 0)
+        self.assertEqual(
+            stats.stats(),
+            {
+                "runs": 2,
+                "frames": 101,
+                "dropped_frames": 3,
+                "max_lateness_ms": 99.0,
+                "last_run": {
+                    "frames": 1,
+                    "dropped_frames": 0,
+                    "max_lateness_ms": 0,
+                    "p95_lateness_ms": 0,
+                },
+            },
+        )
+
+
 class TestCancelEvent(asynctest.TestCase):
     def setUp(self):
         self.leds = LedsMock()
@@ -296,3 +422,64 @@ class TestStreamingChoregraphy(TestChoreographyBase):
             self.assertEqual(self.ears.called_list, [])
             task = self.loop.create_task(self.ci.stop())
             self.loop.run_until_complete(task)
+
+
+@pytest.mark.django_db
+class TestLoadChoreography(TestChoreographyBase):
+    def tearDown(self):
+        close_old_async_connections()
+
+    def test_load(self):
+        task = self.loop.create_task(
+            ChoreographyInterpreter.load("nabtaichid/taichi.chor")
+        )
+        path, chor = self.loop.run_until_complete(task)
+        self.assertEqual(chor, path.read_bytes())
+        task = self.loop.create_task(
+            ChoreographyInterpreter.load(path.as_posix())
+        )
+        path2, chor2 = self.loop.run_until_complete(task)
+        self.assertEqual(path2, path)
+        self.assertIs(chor2, chor)
+
+    def test_load_program(self):
+        task = self.loop.create_task(
+            ChoreographyInterpreter.load_program("nabtaichid/taichi.chor")
+        )
+        path, program = self.loop.run_until_complete(task)
+        self.assertEqual(
+            program, ChoreographyInterpreter.compile(path.read_bytes())
+        )
+        task = self.loop.create_task(
+            ChoreographyInterpreter.load_program(path.as_posix())
+        )
+        path2, program2 = self.loop.run_until_complete(task)
+        self.assertEqual(path2, path)
+        self.assertIs(program2, program)
+
+    def test_streaming_programs(self):
+        task = self.loop.create_task(
+            ChoreographyInterpreter.streaming_programs()
+        )
+        programs = self.loop.run_until_complete(task)
+        self.assertEqual(len(programs), 4)
+        task = self.loop.create_task(
+            ChoreographyInterpreter.streaming_programs()
+        )
+        programs2 = self.loop.run_until_complete(task)
+        self.assertIs(programs2, programs)
+        Resources.build_index()
+        task = self.loop.create_task(
+            ChoreographyInterpreter.streaming_programs()
+        )
+        programs3 = self.loop.run_until_complete(task)
+        self.assertIsNot(programs3, programs)
+        self.assertEqual(programs3, programs)
+
+    def test_load_not_found(self):
+        task = self.loop.create_task(
+            ChoreographyInterpreter.load("xy/zp.chor")
+        )
+        path, chor = self.loop.run_until_complete(task)
+        self.assertEqual(path, None)
+        self.assertEqual(chor, None)
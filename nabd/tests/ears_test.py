@@ -0,0 +1,53 @@
+import unittest
+
+from nabd.ears import Ears, EarTracker
+
+
+class TestEarTracker(unittest.TestCase):
+    def test_commands(self):
+        tracker = EarTracker()
+        self.assertFalse(tracker.is_known())
+        tracker.move(2, Ears.FORWARD_DIRECTION)
+        self.assertEqual(tracker.position, None)
+        self.assertEqual(tracker.confidence, EarTracker.UNKNOWN)
+        tracker.go(Ears.STEPS + 3)
+        self.assertEqual(tracker.position, 3)
+        self.assertEqual(tracker.confidence, EarTracker.EXPECTED)
+        tracker.move(5, Ears.BACKWARD_DIRECTION)
+        self.assertEqual(tracker.position, 15)
+        self.assertEqual(tracker.confidence, EarTracker.EXPECTED)
+        tracker.stopped()
+        self.assertEqual(tracker.confidence, EarTracker.CONFIRMED)
+        self.assertTrue(tracker.is_known())
+
+    def test_moved(self):
+        tracker = EarTracker()
+        tracker.go(4)
+        tracker.stopped()
+        tracker.moved()
+        self.assertEqual(tracker.position, None)
+        self.assertEqual(tracker.confidence, EarTracker.UNKNOWN)
+        tracker.stopped()
+        self.assertEqual(tracker.confidence, EarTracker.UNKNOWN)
+
+    def test_report(self):
+        tracker = EarTracker()
+        tracker.report(7)
+        self.assertEqual(tracker.position, None)
+        tracker.query()
+        tracker.report(7)
+        self.assertEqual(tracker.position, 7)
+        self.assertEqual(tracker.confidence, EarTracker.CONFIRMED)
+        tracker.query()
+        tracker.report(None)
+        self.assertEqual(tracker.position, None)
+        self.assertEqual(tracker.confidence, EarTracker.UNKNOWN)
+
+    def test_stale_report(self):
+        tracker = EarTracker()
+        tracker.query()
+        tracker.go(10)
+        # Position reported for the query is outdated
+        tracker.report(7)
+        self.assertEqual(tracker.position, 10)
+        self.assertEqual(tracker.confidence, EarTracker.EXPECTED)
@@ -0,0 +1,95 @@
+import unittest
+from pathlib import Path
+
+from nabd.jsgf import GrammarExpander, parse_grammar
+
+GRAMMAR = """#JSGF V1.0;
+
+grammar test;
+
+public <control> =
+    <noise> +
+    | [ <euh> ] ( <clock> | <carrot> ) [ <euh> ];
+
+<euh> = ( eh ) ;
+<noise> = <euh> | hello ;
+<please> = ( please | could you please ) ;
+// Comments are ignored
+<clock> =
+    clock
+    | [<please>] give me the time
+    ;
+<carrot> = do you ( want | like ) a carrot ;
+"""
+
+
+class TestJSGF(unittest.TestCase):
+    def test_parse(self):
+        rules, public = parse_grammar(GRAMMAR)
+        self.assertEqual(public, "<control>")
+        self.assertEqual(rules["<euh>"], ["(", "eh", ")"])
+        self.assertEqual(
+            rules["<carrot>"],
+            ["do", "you", "(", "want", "|", "like", ")", "a", "carrot"],
+        )
+
+    def test_expand(self):
+        rules, public = parse_grammar(GRAMMAR)
+        expander = GrammarExpander(rules)
+        self.assertEqual(
+            expander.expand("<clock>"),
+            [
+                "clock",
+                "give me the time",
+                "please give me the time",
+                "could you please give me the time",
+            ],
+        )
+        phrases = expander.expand(public)
+        self.assertEqual(len(phrases), 2 + 4 * 6)
+        self.assertIn("eh do you like a carrot eh", phrases)
+        self.assertIn("hello", phrases)
+
+    def test_repetition(self):
+        rules, public = parse_grammar("public <a> = a b * ;")
+        self.assertEqual(GrammarExpander(rules).expand(public), ["a b", "a"])
+        rules, public = parse_grammar(
+            "public <a> = a b * ( c | d ) + [ e ] * ;"
+        )
+        self.assertEqual(
+            GrammarExpander(rules).expand(public),
+            [
+                "a b c",
+                "a b c e",
+                "a b d",
+                "a b d e",
+                "a c",
+                "a c e",
+                "a d",
+                "a d e",
+            ],
+        )
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            parse_grammar("<a> = b ;")
+        rules, public = parse_grammar("public <a> = ( b | <c> ;")
+        with self.assertRaises(ValueError):
+            GrammarExpander(rules).expand(public)
+        rules, public = parse_grammar("public <a> = b [ <a> ] ;")
+        with self.assertRaises(ValueError):
+            GrammarExpander(rules).expand(public)
+        rules, public = parse_grammar("public <a> = ( b | c ) ( d | e ) ;")
+        with self.assertRaises(ValueError):
+            GrammarExpander(rules, max_phrases=3).expand(public)
+
+    def test_asr_grammars(self):
+        base_dir = Path(__file__).resolve().parents[2]
+        for language in ("en", "fr"):
+            path = base_dir.joinpath(
+                "asr", f"nabaztag-grammar-{language}.jsgf"
+            )
+            with open(path, "r") as f:
+                rules, public = parse_grammar(f.read())
+            phrases = GrammarExpander(rules).expand(public)
+            self.assertGreater(len(phrases), 100)
@@ -45,6 +45,68 @@ class TestLeds(unittest.TestCase):
             ],
         )
 
+    def test_set_many(self):
+        self.leds.set_many(
+            {Led.LEFT: (10, 20, 30), Led.RIGHT: (1, 2, 3), Led.NOSE: (4, 5, 6)}
+        )
+        time.sleep(0.1)
+        self.assertEqual(
+            self.leds.calls,
+            [
+                ("do_set", Led.LEFT, 10, 20, 30),
+                ("do_set", Led.RIGHT, 1, 2, 3),
+                ("do_set", Led.NOSE, 4, 5, 6),
+                "do_show",
+            ],
+        )
+
+    def test_set_unchanged(self):
+        self.leds.set1(Led.NOSE, 10, 20, 30)
+        time.sleep(0.1)
+        self.leds.set1(Led.NOSE, 10, 20, 30)
+        self.leds.set_many({Led.NOSE: (10, 20, 30), Led.LEFT: (1, 2, 3)})
+        time.sleep(0.1)
+        self.assertEqual(
+            self.leds.calls,
+            [
+                ("do_set", Led.NOSE, 10, 20, 30),
+                "do_show",
+                ("do_set", Led.LEFT, 1, 2, 3),
+                "do_show",
+            ],
+        )
+
+    def test_pulse_table(self):
+        table = LedsSoft.pulse_table((0, 0, 0), 10)
+        self.assertEqual(table, ((0, 0, 0),))
+        table = LedsSoft.pulse_table((10, 20, 30), 10)
+        self.assertEqual(len(table), 20)
+        self.assertEqual(table[0], (1, 2, 3))
+        self.assertEqual(table[9], (10, 20, 30))
+        self.assertEqual(table[19], (0, 0, 0))
+        self.assertIs(LedsSoft.pulse_table((10, 20, 30), 10), table)
+
+    def test_low_power(self):
+        self.leds.pulse(Led.BOTTOM, 10, 20, 30)
+        time.sleep(0.5)
+        self.leds.set_low_power(True)
+        time.sleep(0.1)
+        count = len(self.leds.calls)
+        time.sleep(1)
+        self.assertEqual(len(self.leds.calls), count)
+        self.leds.set1(Led.NOSE, 1, 2, 3)
+        time.sleep(0.1)
+        self.assertEqual(
+            self.leds.calls[count:],
+            [("do_set", Led.NOSE, 1, 2, 3), "do_show"],
+        )
+        self.leds.set_low_power(False)
+        time.sleep(0.5)
+        self.assertIn(
+            ("do_set", Led.BOTTOM),
+            [c[:2] for c in self.leds.calls[count + 2 :]],
+        )
+
     def test_pulse(self):
         self.leds.pulse(Led.BOTTOM, 10, 20, 30)
         time.sleep(8)
@@ -7,10 +7,13 @@ from unittest import TestCase
 from nabcommon import nabservice
 from nabd.ears import Ears
 from nabd.leds import Led, Leds
+from nabd.models import ModelManager
 from nabd.nabio import NabIO
 from nabd.rfid import Rfid
 from nabd.sound import Sound
 
+MB = 1 << 20
+
 
 class NabIOMock(NabIO):
     def __init__(self):
@@ -67,8 +70,10 @@ class NabIOMock(NabIO):
     def bind_rfid_event(self, loop, callback):
         self.rfid.on_detect(loop, callback)
 
-    async def play_info(self, condvar, tempo, colors):
-        self.played_infos.append({"tempo": tempo, "colors": colors})
+    async def play_info(self, condvar, animation):
+        self.played_infos.append(
+            {"tempo": animation.tempo, "frames": animation.frames}
+        )
         try:
             await asyncio.wait_for(condvar.wait(), NabIO.INFO_LOOP_LENGTH)
         except asyncio.TimeoutError:
@@ -289,3 +294,96 @@ class MockWriter(object):
 
     async def drain(self):
         pass
+
+
+class VirtualClockLoop(object):
+    """
+    Minimal event loop with a virtual clock, for call_soon and call_later
+    based state machines.
+    """
+
+    class Handle(object):
+        def __init__(self, when, callback, args):
+            self.when = when
+            self.callback = callback
+            self.args = args
+            self.cancelled = False
+
+        def cancel(self):
+            self.cancelled = True
+
+    def __init__(self):
+        self.clock = 0.0
+        self.handles = []
+
+    def time(self):
+        return self.clock
+
+    def call_soon(self, callback, *args):
+        return self.call_later(0, callback, *args)
+
+    def call_later(self, delay, callback, *args):
+        handle = VirtualClockLoop.Handle(self.clock + delay, callback, args)
+        self.handles.append(handle)
+        return handle
+
+    def advance(self, delay):
+        """
+        Advance clock by delay, running due callbacks in order.
+        """
+        target = self.clock + delay
+        while True:
+            due = [
+                handle
+                for handle in self.handles
+                if not handle.cancelled and handle.when <= target
+            ]
+            if due == []:
+                break
+            handle = min(due, key=lambda handle: handle.when)
+            self.handles.remove(handle)
+            self.clock = max(self.clock, handle.when)
+            handle.callback(*handle.args)
+        self.handles = [
+            handle for handle in self.handles if not handle.cancelled
+        ]
+        self.clock = target
+
+
+class ModelManagerMock(ModelManager):
+    """
+    Model manager loading fake models. ASR models use 100 MB and NLU
+    models use 20 MB.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.memory = 0
+        self.loaded = []
+        self.failing = set()
+        # Set to let loads complete
+        self.proceed = threading.Event()
+        self.proceed.set()
+
+    @staticmethod
+    def get_locales(locale):
+        if locale in ("fr_FR", "en_US", "en_GB"):
+            return locale, locale
+        return "fr_FR", "fr_FR"
+
+    def load_asr(self, locale):
+        return self.load("asr", locale, 100 * MB)
+
+    def load_nlu(self, locale):
+        return self.load("nlu", locale, 20 * MB)
+
+    def load(self, kind, locale, size):
+        self.proceed.wait()
+        if (kind, locale) in self.failing:
+            raise RuntimeError(f"Cannot load {kind}/{locale}")
+        self.loaded.append(f"{kind}/{locale}")
+        self.memory += size
+        return f"{kind}/{locale}"
+
+    def rss(self):
+        return self.memory
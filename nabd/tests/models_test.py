@@ -0,0 +1,183 @@
+import asyncio
+import unittest
+
+from mock import MB, ModelManagerMock, NabIOMock
+
+from nabd.models import ModelManager
+from nabd.nabd import ModelsState, Nabd, State
+
+
+class TestModelManager(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def manager(self, **kwargs):
+        # Enough memory for double buffering unless specified
+        kwargs.setdefault("memory_ceiling", 1024 * MB)
+        models = ModelManagerMock(**kwargs)
+        # Do not leave loads blocked if a test fails
+        self.addCleanup(models.proceed.set)
+        return models
+
+    def switch(self, models, locale):
+        self.loop.run_until_complete(models.switch(locale))
+
+    def test_switch(self):
+        models = self.manager()
+        self.assertIsNone(models.current)
+        self.switch(models, "fr_FR")
+        self.assertEqual(models.current.asr, "asr/fr_FR")
+        self.assertEqual(models.current.nlu, "nlu/fr_FR")
+        self.assertEqual(models.resident_size(), 120 * MB)
+        # Same models, nothing to load
+        self.switch(models, "de_DE")
+        self.assertEqual(models.loaded, ["asr/fr_FR", "nlu/fr_FR"])
+        self.switch(models, "en_US")
+        self.assertEqual(models.current.asr, "asr/en_US")
+        self.assertEqual(
+            models.stats()["resident"], ["asr/en_US", "nlu/en_US"]
+        )
+        self.assertEqual(models.stats()["switches"], 2)
+
+    def test_current_models_during_switch(self):
+        models = self.manager()
+        self.switch(models, "fr_FR")
+        models.proceed.clear()
+        task = self.loop.create_task(models.switch("en_US"))
+        self.loop.run_until_complete(asyncio.sleep(0.01))
+        # Previous models are still available while loading
+        self.assertFalse(task.done())
+        self.assertEqual(models.current.asr, "asr/fr_FR")
+        models.proceed.set()
+        self.loop.run_until_complete(task)
+        self.assertEqual(models.current.asr, "asr/en_US")
+
+    def test_warm_locales(self):
+        models = self.manager(warm_locales=2)
+        self.switch(models, "fr_FR")
+        self.switch(models, "en_US")
+        self.switch(models, "fr_FR")
+        self.assertEqual(models.current.nlu, "nlu/fr_FR")
+        self.assertEqual(
+            models.loaded,
+            [
+                "asr/fr_FR",
+                "nlu/fr_FR",
+                "asr/en_US",
+                "nlu/en_US",
+            ],
+        )
+        self.assertEqual(models.warm_hits, 1)
+        # Least recently used locale is released
+        self.switch(models, "en_GB")
+        self.assertEqual(
+            sorted(models.stats()["resident"]),
+            ["asr/en_GB", "asr/fr_FR", "nlu/en_GB", "nlu/fr_FR"],
+        )
+
+    def test_memory_ceiling(self):
+        models = self.manager(warm_locales=2, memory_ceiling=250 * MB)
+        self.switch(models, "fr_FR")
+        self.switch(models, "en_US")
+        # Warm fr_FR ASR model is released before loading en_GB ASR model
+        models.proceed.clear()
+        task = self.loop.create_task(models.switch("en_GB"))
+        self.loop.run_until_complete(asyncio.sleep(0.01))
+        self.assertEqual(
+            models.stats()["resident"],
+            ["nlu/fr_FR", "asr/en_US", "nlu/en_US"],
+        )
+        self.assertEqual(models.current.asr, "asr/en_US")
+        models.proceed.set()
+        self.loop.run_until_complete(task)
+        self.assertEqual(models.current.asr, "asr/en_GB")
+        self.assertLessEqual(models.resident_size(), 250 * MB)
+
+    def test_memory_ceiling_current(self):
+        models = self.manager(memory_ceiling=150 * MB)
+        self.switch(models, "fr_FR")
+        # Not enough memory for both sets, current models are released
+        self.switch(models, "en_US")
+        self.assertEqual(models.current.asr, "asr/en_US")
+        self.assertEqual(models.loaded[2:], ["asr/en_US", "nlu/en_US"])
+        self.assertLessEqual(models.resident_size(), 150 * MB)
+
+    def test_default_memory_ceiling(self):
+        models = ModelManagerMock()
+        self.addCleanup(models.proceed.set)
+        self.switch(models, "fr_FR")
+        models.proceed.clear()
+        task = self.loop.create_task(models.switch("en_US"))
+        self.loop.run_until_complete(asyncio.sleep(0.01))
+        # Current models are released before loading new ones
+        self.assertIsNone(models.current)
+        models.proceed.set()
+        self.loop.run_until_complete(task)
+        self.assertEqual(models.current.asr, "asr/en_US")
+        self.assertLessEqual(
+            models.resident_size(), ModelManager.MEMORY_CEILING
+        )
+
+    def test_failure(self):
+        models = self.manager()
+        self.switch(models, "fr_FR")
+        models.failing.add(("nlu", "en_US"))
+        with self.assertRaises(RuntimeError):
+            self.switch(models, "en_US")
+        # Current models are kept, half loaded models are released
+        self.assertEqual(models.current.asr, "asr/fr_FR")
+        self.assertEqual(
+            models.stats()["resident"], ["asr/fr_FR", "nlu/fr_FR"]
+        )
+
+
+class TestNabdModels(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.nabd = Nabd(NabIOMock())
+        self.nabd.loop = self.loop
+        # Not enough memory for two sets of models
+        self.nabd.models = ModelManagerMock(memory_ceiling=150 * MB)
+        self.addCleanup(self.nabd.models.proceed.set)
+
+    def tearDown(self):
+        # Let feedback sounds end
+        self.loop.run_until_complete(
+            asyncio.gather(*asyncio.all_tasks(self.loop))
+        )
+        self.loop.close()
+
+    def load_models(self, locale):
+        self.nabd.models_loads += 1
+        return self.loop.create_task(self.nabd.load_models(locale))
+
+    def test_released_current_models(self):
+        self.assertEqual(self.nabd.models_state, ModelsState.NONE)
+        self.loop.run_until_complete(self.load_models("fr_FR"))
+        self.assertEqual(self.nabd.models_state, ModelsState.READY)
+        self.nabd.models.proceed.clear()
+        task = self.load_models("en_US")
+        self.loop.run_until_complete(asyncio.sleep(0.01))
+        # Current models were released to make room for en_US models
+        self.assertIsNone(self.nabd.models.current)
+        self.assertEqual(self.nabd.models_state, ModelsState.LOADING_MODELS)
+        self.nabd.button_callback("hold", 0)
+        self.loop.run_until_complete(self.nabd.start_asr())
+        self.assertEqual(self.nabd.state, State.IDLE)
+        self.nabd.models.proceed.set()
+        self.loop.run_until_complete(task)
+        self.assertEqual(self.nabd.models_state, ModelsState.READY)
+
+    def test_released_current_models_failure(self):
+        self.loop.run_until_complete(self.load_models("fr_FR"))
+        self.nabd.models.failing.add(("nlu", "en_US"))
+        self.loop.run_until_complete(self.load_models("en_US"))
+        self.assertIsNone(self.nabd.models.current)
+        self.assertEqual(self.nabd.models_state, ModelsState.NONE)
+        self.loop.run_until_complete(self.nabd.start_asr())
+        self.assertEqual(self.nabd.state, State.IDLE)
@@ -9,11 +9,12 @@ import unittest
 
 import pytest
 from django.db import close_old_connections
-from mock import NabIOMock
+from mock import ModelManagerMock, NabIOMock
 from utils import close_old_async_connections
 
 import nabtaichid
-from nabd import nabd
+from nabd import i18n, nabd
+from nabd.leds import Led
 from nabd.rfid import TagFlags
 
 # import unittest.mock
@@ -223,6 +224,34 @@ class TestNabd(TestNabdBase):
         finally:
             s1.close()
 
+    def test_info_malformed_animation(self):
+        s1 = self.service_socket()
+        try:
+            packet = s1.readline()  # state packet
+            for animation in [
+                b'{"tempo":25}',
+                b'{"tempo":0,"colors":[{}]}',
+                b'{"tempo":25,"colors":[]}',
+                b'{"tempo":25,"colors":[{"left":"yellow"}]}',
+            ]:
+                s1.write(
+                    b'{"type":"info","info_id":"weather",'
+                    b'"request_id":"test_id","animation":'
+                    + animation
+                    + b"}\r\n"
+                )
+                packet = s1.readline()  # response packet
+                packet_j = json.loads(packet.decode("utf8"))
+                self.assertEqual(packet_j["type"], "response")
+                self.assertEqual(packet_j["request_id"], "test_id")
+                self.assertEqual(packet_j["status"], "error")
+                self.assertEqual(packet_j["class"], "MalformedPacket")
+            self.nabio.played_infos = []
+            time.sleep(1)
+            self.assertEqual(self.nabio.played_infos, [])
+        finally:
+            s1.close()
+
     def test_info(self):
         s1 = self.service_socket()
         self.assertEqual(self.nabio.played_infos, [])
@@ -252,52 +281,21 @@ class TestNabd(TestNabdBase):
             time.sleep(20)  # give time to play info twice
             self.assertNotEqual(self.nabio.played_infos, [])
             last_info = self.nabio.played_infos.pop()
+            yellow = {
+                Led.LEFT: (255, 255, 0),
+                Led.CENTER: (255, 255, 0),
+                Led.RIGHT: (255, 255, 0),
+            }
+            off = {
+                Led.LEFT: (0, 0, 0),
+                Led.CENTER: (0, 0, 0),
+                Led.RIGHT: (0, 0, 0),
+            }
             self.assertEqual(
                 last_info,
                 {
                     "tempo": 25,
-                    "colors": [
-                        {
-                            "left": "ffff00",
-                            "center": "ffff00",
-                            "right": "ffff00",
-                        },
-                        {
-                            "left": "ffff00",
-                            "center": "ffff00",
-                            "right": "ffff00",
-                        },
-                        {
-                            "left": "ffff00",
-                            "center": "ffff00",
-                            "right": "ffff00",
-                        },
-                        {
-                            "left": "ffff00",
-                            "center": "ffff00",
-                            "right": "ffff00",
-                        },
-                        {
-                            "left": "ffff00",
-                            "center": "ffff00",
-                            "right": "ffff00",
-                        },
-                        {
-                            "left": "000000",
-                            "center": "000000",
-                            "right": "000000",
-                        },
-                        {
-                            "left": "000000",
-                            "center": "000000",
-                            "right": "000000",
-                        },
-                        {
-                            "left": "000000",
-                            "center": "000000",
-                            "right": "000000",
-                        },
-                    ],
+                    "frames": (yellow,) * 5 + (off,) * 3,
                 },
             )
             # [25 {3 3 3 3 3 3 3 3 3 3 3 3 3 3 3 0 0 0 0 0 0 0 0 0}] // soleil
@@ -582,6 +580,40 @@ class TestNabd(TestNabdBase):
             s1.close()
 
 
+@pytest.mark.django_db(transaction=True)
+class TestConfigUpdate(TestNabdBase):
+    def tearDown(self):
+        TestNabdBase.tearDown(self)
+        i18n.clear_locale()
+        close_old_async_connections()
+
+    def test_locale_update(self):
+        locale = asyncio.run(i18n.get_locale())
+        self.assertEqual(locale, "fr_FR")
+        config = i18n.Config.load()
+        config.locale = "en_US"
+        config.save()
+        # Locale is held in memory until nabd gets a config-update packet
+        locale = asyncio.run(i18n.get_locale())
+        self.assertEqual(locale, "fr_FR")
+        s1 = self.service_socket()
+        try:
+            packet = s1.readline()  # state packet
+            s1.write(
+                b'{"type":"config-update","service":"nabd","slot":"locale",'
+                b'"request_id":"config_id"}\r\n'
+            )
+            packet = s1.readline()  # response packet
+            packet_j = json.loads(packet.decode("utf8"))
+            self.assertEqual(packet_j["type"], "response")
+            self.assertEqual(packet_j["request_id"], "config_id")
+            self.assertEqual(packet_j["status"], "ok")
+            locale = asyncio.run(i18n.get_locale())
+            self.assertEqual(locale, "en_US")
+        finally:
+            s1.close()
+
+
 @pytest.mark.django_db(transaction=True)
 class TestRfid(TestNabdBase):
     def tearDown(self):
@@ -688,3 +720,75 @@ class TestRfid(TestNabdBase):
             )
         finally:
             s1.close()
+
+
+class NabIOSoundMock(NabIOMock):
+    def has_sound_input(self):
+        return True
+
+
+@pytest.mark.django_db(transaction=True)
+class TestModelsState(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.nabd = nabd.Nabd(NabIOSoundMock())
+        self.nabd.loop = self.loop
+        self.nabd.models = ModelManagerMock()
+        # Keep models loading until test lets them proceed
+        self.nabd.models.proceed.clear()
+        self.addCleanup(self.nabd.models.proceed.set)
+        self.events = io.BytesIO()
+        self.nabd.service_writers[self.events] = ["button"]
+
+    def tearDown(self):
+        self.loop.close()
+        i18n.clear_locale()
+        close_old_async_connections()
+
+    def test_no_sound_input(self):
+        self.assertEqual(
+            nabd.Nabd(NabIOMock()).models_state, nabd.ModelsState.NONE
+        )
+
+    def test_loading(self):
+        self.assertEqual(
+            self.nabd.models_state, nabd.ModelsState.LOADING_MODELS
+        )
+        task = self.loop.create_task(self.nabd.load_models("fr_FR"))
+        self.loop.run_until_complete(asyncio.sleep(0.01))
+        self.assertEqual(
+            self.nabd.models_state, nabd.ModelsState.LOADING_MODELS
+        )
+        self.nabd.models.proceed.set()
+        self.loop.run_until_complete(task)
+        self.assertEqual(self.nabd.models_state, nabd.ModelsState.READY)
+        self.assertEqual(self.nabd.models.current.asr, "asr/fr_FR")
+
+    def test_loading_failure(self):
+        self.nabd.models.failing.add(("asr", "fr_FR"))
+        self.nabd.models.proceed.set()
+        self.loop.run_until_complete(self.nabd.load_models("fr_FR"))
+        self.assertEqual(self.nabd.models_state, nabd.ModelsState.NONE)
+
+    def test_hold_while_loading(self):
+        task = self.loop.create_task(self.nabd.load_models("fr_FR"))
+        self.nabd.button_callback("hold", 1.0)
+        self.loop.run_until_complete(asyncio.sleep(0.01))
+        # Recording does not start, user is told and hold is sent to
+        # services
+        self.assertEqual(self.nabd.state, nabd.State.IDLE)
+        self.assertIn(
+            "start_playing_preloaded(asr/failed/*.mp3)",
+            self.nabd.nabio.sound.called_list,
+        )
+        packet = json.loads(self.events.getvalue().decode("utf8"))
+        self.assertEqual(
+            packet, {"type": "button_event", "event": "hold", "time": 1.0}
+        )
+        self.nabd.models.proceed.set()
+        self.loop.run_until_complete(task)
+        # Let failure sound end
+        self.loop.run_until_complete(
+            asyncio.gather(*asyncio.all_tasks(self.loop))
+        )
@@ -0,0 +1,42 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from mock import NabIOMock
+
+
+class TestNabIO(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.nabio = NabIOMock()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def play_message(self, body):
+        self.loop.run_until_complete(
+            asyncio.wait_for(self.nabio.play_message({}, body), 5.0)
+        )
+
+    def test_play_message_truncated_choreography(self):
+        fd, filename = tempfile.mkstemp(suffix=".chor")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                # Header of a led instruction without its arguments
+                f.write(bytes([0, 7]))
+            body = [{"choreography": filename}]
+            self.play_message(body)
+            # Reference is kept for play() to report the error
+            self.assertEqual(body[0]["choreography"], filename)
+        finally:
+            os.unlink(filename)
+
+    def test_play_message_invalid_choreography_path(self):
+        body = [{"choreography": "/nonexistent/test.chor"}]
+        self.play_message(body)
+        self.assertEqual(body[0]["choreography"], "/nonexistent/test.chor")
+        self.loop.run_until_complete(
+            asyncio.wait_for(self.nabio.prefetch(body), 5.0)
+        )
@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+import unittest
+
+from nabd.nlu_cache import NLUCache, normalize
+
+
+class TestNLUCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = NLUCache(
+            2,
+            {
+                "tell me a joke": {"intent": "nabsurprised/surprise"},
+                "hello": None,
+            },
+            ["eh"],
+        )
+
+    def test_normalize(self):
+        self.assertEqual(normalize("  Tell  me a JOKE "), "tell me a joke")
+        self.assertEqual(normalize("what’s up"), "what's up")
+        self.assertEqual(
+            normalize("eh tell me a joke eh", ["eh"]), "tell me a joke"
+        )
+        self.assertEqual(normalize("eh", ["eh"]), "")
+
+    def test_table(self):
+        path, result = self.cache.lookup("eh Tell me a joke")
+        self.assertEqual(path, NLUCache.TABLE)
+        self.assertEqual(result, {"intent": "nabsurprised/surprise"})
+        # Results are copies
+        result["intent"] = None
+        _, result = self.cache.lookup("tell me a joke")
+        self.assertEqual(result, {"intent": "nabsurprised/surprise"})
+        self.assertEqual(self.cache.lookup("hello"), (NLUCache.TABLE, None))
+        self.assertEqual(self.cache.lookup("blablabla"), (None, None))
+
+    def test_lru(self):
+        self.cache.put("one", {"intent": "one"})
+        self.cache.put("two", None)
+        self.assertEqual(
+            self.cache.lookup("one"), (NLUCache.LRU, {"intent": "one"})
+        )
+        self.cache.put("three", {"intent": "three"})
+        # two was least recently used
+        self.assertEqual(self.cache.lookup("two"), (None, None))
+        self.assertEqual(self.cache.lookup("one")[0], NLUCache.LRU)
+        self.assertEqual(self.cache.lookup("three")[0], NLUCache.LRU)
+
+    def test_is_static(self):
+        parsed = {
+            "intent": {"intentName": "nabweatherd/forecast"},
+            "slots": [{"entity": "snips/datetime", "slotName": "date"}],
+        }
+        self.assertFalse(NLUCache.is_static(parsed))
+        parsed["slots"] = [{"entity": "place", "slotName": "where"}]
+        self.assertTrue(NLUCache.is_static(parsed))
+
+    def test_stats(self):
+        self.assertEqual(self.cache.stats()["hit_rate"], None)
+        self.cache.record(NLUCache.TABLE, 0.001)
+        self.cache.record(NLUCache.TABLE, 0.003)
+        self.cache.record(NLUCache.LRU, 0.002)
+        self.cache.record(NLUCache.ENGINE, 0.5)
+        stats = self.cache.stats()
+        self.assertEqual(stats["phrases"], 2)
+        self.assertEqual(stats["hit_rate"], 0.75)
+        self.assertEqual(
+            stats["paths"][NLUCache.TABLE],
+            {"count": 2, "mean_ms": 2.0, "max_ms": 3.0},
+        )
+        self.assertEqual(stats["paths"][NLUCache.ENGINE]["count"], 1)
+
+    def test_load(self):
+        fd, filename = tempfile.mkstemp(suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(
+                    {
+                        "version": NLUCache.FORMAT_VERSION,
+                        "fillers": ["euh"],
+                        "phrases": {"météo": {"intent": "weather"}},
+                    },
+                    f,
+                )
+            cache = NLUCache.load(filename, 8)
+            self.assertEqual(
+                cache.lookup("euh météo"),
+                (NLUCache.TABLE, {"intent": "weather"}),
+            )
+        finally:
+            os.unlink(filename)
+        cache = NLUCache.load(filename, 8)
+        self.assertEqual(cache.stats()["phrases"], 0)
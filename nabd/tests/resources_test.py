@@ -1,11 +1,15 @@
 import asyncio
+import shutil
+import tempfile
 import unittest
+from pathlib import Path
 
 import pytest
 
+from nabd import i18n
 from nabd.choreography import ChoreographyInterpreter
 from nabd.i18n import Config
-from nabd.resources import Resources
+from nabd.resources import ResourceIndex, Resources, ResourceTree
 from nabd.tests.utils import close_old_async_connections
 
 
@@ -16,6 +20,7 @@ class TestResources(unittest.TestCase):
         asyncio.set_event_loop(self.loop)
 
     def tearDown(self):
+        i18n.clear_locale()
         close_old_async_connections()
 
     def test_find_existing(self):
@@ -43,6 +48,8 @@ class TestResources(unittest.TestCase):
         config = Config()
         config.locale = "tlh_TLH"
         config.save()
+        # nabd reloads locale when notified with a config-update packet
+        self.loop.run_until_complete(i18n.reload_locale())
         task = self.loop.create_task(
             Resources.find("sounds", "nabclockd/0/1.mp3")
         )
@@ -90,3 +97,115 @@ class TestResources(unittest.TestCase):
             task = self.loop.create_task(Resources.find("sounds", midi))
             path = self.loop.run_until_complete(task)
             self.assertNotEqual(path, None)
+
+
+class TestResourceIndex(unittest.TestCase):
+    def setUp(self):
+        self.basedir = Path(tempfile.mkdtemp())
+        self.write_file("app1/sounds/fr_FR/x/1.mp3")
+        self.write_file("app1/sounds/x/2.mp3")
+        self.write_file("app2/sounds/en_US/x/1.mp3")
+        self.write_file("app2/sounds/x/1.mp3")
+        self.index = ResourceIndex(self.basedir, ["sounds"])
+
+    def tearDown(self):
+        shutil.rmtree(self.basedir)
+
+    def write_file(self, relpath):
+        path = self.basedir.joinpath(relpath)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+
+    def test_find_file(self):
+        self.assertEqual(
+            self.index.find_file("sounds", "fr_FR", "x/1.mp3"),
+            self.basedir.joinpath("app1/sounds/fr_FR/x/1.mp3"),
+        )
+        self.assertEqual(
+            self.index.find_file("sounds", "en_US", "x/1.mp3"),
+            self.basedir.joinpath("app2/sounds/en_US/x/1.mp3"),
+        )
+        self.assertEqual(
+            self.index.find_file("sounds", "en_US", "x/2.mp3"),
+            self.basedir.joinpath("app1/sounds/x/2.mp3"),
+        )
+        self.assertEqual(
+            self.index.find_file("sounds", "en_US", "x/3.mp3"), None
+        )
+
+    def test_list_files(self):
+        self.assertEqual(
+            self.index.list_files("sounds", "fr_FR", "x", "*.mp3"),
+            [
+                self.basedir.joinpath("app1/sounds/fr_FR/x/1.mp3"),
+                self.basedir.joinpath("app1/sounds/x/2.mp3"),
+                self.basedir.joinpath("app2/sounds/x/1.mp3"),
+            ],
+        )
+        self.assertEqual(
+            self.index.list_files("sounds", "fr_FR", "y", "*"), []
+        )
+
+    def test_refresh(self):
+        generation = self.index.generation
+        self.assertFalse(self.index.refresh())
+        self.assertEqual(self.index.generation, generation)
+        self.assertEqual(
+            self.index.find_file("sounds", "fr_FR", "y/1.mp3"), None
+        )
+        self.write_file("app2/sounds/y/1.mp3")
+        self.assertTrue(self.index.refresh())
+        self.assertGreater(self.index.generation, generation)
+        self.assertEqual(
+            self.index.find_file("sounds", "fr_FR", "y/1.mp3"),
+            self.basedir.joinpath("app2/sounds/y/1.mp3"),
+        )
+        shutil.rmtree(self.basedir.joinpath("app1"))
+        self.assertTrue(self.index.refresh())
+        self.assertEqual(
+            self.index.find_file("sounds", "fr_FR", "x/1.mp3"),
+            self.basedir.joinpath("app2/sounds/x/1.mp3"),
+        )
+
+    def test_refresh_tree(self):
+        tree = ResourceTree(self.basedir.joinpath("app1/sounds"))
+        scanned = []
+        scan = tree._scan
+
+        def counting_scan(reldir):
+            scanned.append(reldir)
+            scan(reldir)
+
+        tree._scan = counting_scan
+        self.assertFalse(tree.refresh())
+        self.write_file("app1/sounds/y/1.mp3")
+        self.write_file("app1/sounds/x/3.mp3")
+        self.assertTrue(tree.refresh())
+        # x is rescanned with its modified parent, and only once
+        self.assertEqual(scanned.count("x"), 1)
+        self.assertIn("y/1.mp3", [relpath for relpath, _ in tree.files()])
+        self.assertIn("x/3.mp3", [relpath for relpath, _ in tree.files()])
+
+    def test_refresh_during_lookup(self):
+        index = self.index
+        generation = index.generation
+        write_file = self.write_file
+
+        class RefreshingFiles(dict):
+            """
+            Refresh index while a lookup is computed.
+            """
+
+            def get(self, *args):
+                if index.generation == generation:
+                    write_file("app2/sounds/y/1.mp3")
+                    index.refresh()
+                return super().get(*args)
+
+        index.files["sounds"] = RefreshingFiles(index.files["sounds"])
+        # Result computed before refresh is not remembered
+        self.assertEqual(index.find_file("sounds", "fr_FR", "y/1.mp3"), None)
+        self.assertEqual(
+            index.find_file("sounds", "fr_FR", "y/1.mp3"),
+            self.basedir.joinpath("app2/sounds/y/1.mp3"),
+        )
@@ -0,0 +1,55 @@
+import unittest
+
+from nabd.rfid import TagFlags
+from nabd.rfid_cache import TagCache
+
+UID1 = bytearray(b"\xd0\x02\x18\x01\x02\x03\x04\x05")
+UID2 = bytearray(b"\xd0\x02\x18\x01\x02\x03\x04\x06")
+UID3 = bytearray(b"\xd0\x02\x18\x01\x02\x03\x04\x07")
+
+
+class TestTagCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = TagCache(2)
+
+    def test_get_put(self):
+        self.assertEqual(self.cache.get(UID1), None)
+        self.cache.put(UID1, 3, 9, bytearray(b"paris"), TagFlags.FORMATTED)
+        tag = self.cache.get(UID1)
+        self.assertEqual(tag.picture, 3)
+        self.assertEqual(tag.app, 9)
+        self.assertEqual(tag.app_data, b"paris")
+        self.assertEqual(tag.flags, TagFlags.FORMATTED)
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_rate"], 0.5)
+        self.assertEqual(stats["entries"], 1)
+
+    def test_evict(self):
+        self.cache.put(UID1, None, None, None, TagFlags.CLEAR)
+        self.cache.put(UID2, None, None, None, TagFlags.CLEAR)
+        self.cache.get(UID1)
+        self.cache.put(UID3, None, None, None, TagFlags.CLEAR)
+        self.assertNotEqual(self.cache.get(UID1), None)
+        self.assertEqual(self.cache.get(UID2), None)
+        self.assertNotEqual(self.cache.get(UID3), None)
+
+    def test_invalidate(self):
+        self.cache.put(UID1, 3, 9, b"paris", TagFlags.FORMATTED)
+        self.cache.invalidate(UID1)
+        self.cache.invalidate(UID2)
+        self.assertEqual(self.cache.get(UID1), None)
+
+    def test_verify(self):
+        self.cache.put(UID1, 3, 9, b"paris", TagFlags.FORMATTED)
+        self.assertTrue(
+            self.cache.verify(
+                UID1, 3, 9, bytearray(b"paris"), TagFlags.FORMATTED
+            )
+        )
+        self.assertFalse(
+            self.cache.verify(UID1, 3, 9, b"lyon", TagFlags.FORMATTED)
+        )
+        self.assertEqual(self.cache.get(UID1).app_data, b"lyon")
+        self.assertEqual(self.cache.stats()["mismatches"], 1)
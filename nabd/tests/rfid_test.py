@@ -1,6 +1,11 @@
+import asyncio
+import socket
 from unittest import TestCase
 
-from nabd.rfid_dev import RfidDev
+from mock import VirtualClockLoop
+
+from nabd.rfid_dev import RfidDev, RfidDevState
+from nabd.timer import LoopTimer
 
 
 class TestResources(TestCase):
@@ -23,3 +28,44 @@ class TestResources(TestCase):
         self.assertFalse(
             RfidDev.is_compatible(b"\xD0\x02\x02\x03\x04\x05\x06\x07")
         )
+
+
+class TestRfidDevPolling(TestCase):
+    UID_LE = b"\x07\x06\x05\x04\x03\x02\x01\xE0"
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.clock = VirtualClockLoop()
+        # Reader side of /dev/rfid0
+        self.device, reader = socket.socketpair()
+        self.device.settimeout(1.0)
+        self.addCleanup(self.device.close)
+        self.addCleanup(reader.close)
+        self.rfid = RfidDev()
+        self.rfid._RfidDev__fd = reader.fileno()
+        self.rfid._RfidDev__polling_timer = LoopTimer(self.clock)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def packet(self, data):
+        self.device.send(data)
+        self.rfid._do_read()
+
+    def test_packet_while_paused(self):
+        self.rfid._RfidDev__state = RfidDevState.POLLING_REPEAT
+        self.rfid._RfidDev__current_uid = bytearray(reversed(self.UID_LE))
+        self.rfid.set_low_power(True)
+        self.packet(b"u" + self.UID_LE)
+        self.assertEqual(self.device.recv(16), b"i")
+        self.assertEqual(
+            self.rfid._RfidDev__state, RfidDevState.POLLING_PAUSED
+        )
+        # A packet received while paused does not cancel resuming polling
+        self.packet(b"u" + self.UID_LE)
+        self.clock.advance(RfidDev.LOW_POWER_POLLING_INTERVAL)
+        self.assertEqual(self.device.recv(16), b"P")
+        self.assertEqual(
+            self.rfid._RfidDev__state, RfidDevState.POLLING_REPEAT
+        )
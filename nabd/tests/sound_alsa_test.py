@@ -132,6 +132,20 @@ class TestWaitUntilComplete(asynctest.TestCase):
         after = time.time()
         self.assertLess(after - before, 3.0)
 
+    async def test_stop_playing(self):
+        before = time.time()
+        await self.sound.play_list(["asr/acquired.mp3"], False)
+        duration = time.time() - before
+        await self.sound.start_playing("fr_FR/asr/failed/5.mp3")
+        await asyncio.sleep(1.0)
+        await self.sound.stop_playing()
+        self.assertFalse(self.sound.currently_playing)
+        # Buffered periods of the canceled sound are dropped, the next sound
+        # does not play after them
+        before = time.time()
+        await self.sound.play_list(["asr/acquired.mp3"], False)
+        self.assertLess(time.time() - before, duration + 0.1)
+
 
 @pytest.mark.skipif(
     sys.platform != "linux", reason="Alsa is only available on Linux"
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+
+from nabd.sound_cache import SoundCache
+
+
+class TestSoundCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = SoundCache(100, 40)
+
+    def test_get_put(self):
+        self.assertEqual(self.cache.get(("a.mp3", 1)), None)
+        self.assertTrue(self.cache.put(("a.mp3", 1), 22050, 1, 2, b"x" * 10))
+        sound = self.cache.get(("a.mp3", 1))
+        self.assertEqual(sound.rate, 22050)
+        self.assertEqual(sound.channels, 1)
+        self.assertEqual(sound.width, 2)
+        self.assertEqual(sound.pcm, b"x" * 10)
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 1)
+        self.assertEqual(stats["size"], 10)
+
+    def test_entry_too_large(self):
+        self.assertFalse(self.cache.put(("a.mp3", 1), 22050, 1, 2, b"x" * 41))
+        self.assertEqual(self.cache.get(("a.mp3", 1)), None)
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_lru_eviction(self):
+        for name in ["a", "b", "c"]:
+            self.cache.put((name, 1), 22050, 1, 2, b"x" * 30)
+        self.assertNotEqual(self.cache.get(("a", 1)), None)
+        self.cache.put(("d", 1), 22050, 1, 2, b"x" * 30)
+        self.assertNotEqual(self.cache.get(("a", 1)), None)
+        self.assertEqual(self.cache.get(("b", 1)), None)
+        self.assertEqual(self.cache.stats()["size"], 90)
+
+    def test_modified_file(self):
+        self.cache.put(("a", 1), 22050, 1, 2, b"x" * 30)
+        self.cache.put(("a", 2), 22050, 1, 2, b"y" * 20)
+        self.assertEqual(self.cache.get(("a", 1)), None)
+        self.assertEqual(self.cache.get(("a", 2)).pcm, b"y" * 20)
+        self.assertEqual(self.cache.stats()["size"], 20)
+
+    def test_key(self):
+        with tempfile.NamedTemporaryFile() as f:
+            key = SoundCache.key(f.name)
+            self.assertEqual(key, (f.name, os.stat(f.name).st_mtime_ns))
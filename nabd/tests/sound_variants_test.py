@@ -0,0 +1,124 @@
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import wave
+from pathlib import Path
+
+from nabd import pcm
+from nabd.sound_variants import SoundVariants
+from nabd.wav import map_wav
+
+
+def write_wav(path, channels, rate, width, frames):
+    with wave.open(path.as_posix(), "wb") as f:
+        f.setnchannels(channels)
+        f.setframerate(rate)
+        f.setsampwidth(width)
+        f.writeframes(frames)
+
+
+class TestPcm(unittest.TestCase):
+    def test_convert_native(self):
+        data = struct.pack("<4h", 1, -1, 2, -2)
+        converted, state = pcm.convert(data, 2, 44100, 2, None)
+        self.assertEqual(converted, data)
+        self.assertEqual(state, None)
+
+    def test_convert_mono_u8(self):
+        data = bytes([0x80, 0x81])
+        converted, _ = pcm.convert(data, 1, 44100, 1, None)
+        self.assertEqual(converted, struct.pack("<4h", 0, 0, 256, 256))
+
+    def test_convert_width(self):
+        data = bytes([0x80, 0x81])
+        self.assertEqual(
+            pcm.convert_width(data, 1), struct.pack("<2h", 0, 256)
+        )
+
+    def test_convert_rate(self):
+        data = bytes(2 * 22050)
+        converted, _ = pcm.convert(data, 1, 22050, 2, None)
+        # Resampling may drop one frame
+        self.assertAlmostEqual(
+            len(converted), 44100 * pcm.FRAME_BYTES, delta=pcm.FRAME_BYTES
+        )
+
+
+class TestSoundVariants(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.saved_cache_dir = SoundVariants.cache_dir
+        SoundVariants.cache_dir = self.tmpdir.joinpath("cache")
+        SoundVariants.cache_dir.mkdir()
+        SoundVariants.manifest = None
+        self.source = self.tmpdir.joinpath("sound.wav")
+        write_wav(self.source, 1, 22050, 1, bytes([0x81] * 2205))
+
+    def tearDown(self):
+        SoundVariants.cache_dir = self.saved_cache_dir
+        SoundVariants.manifest = None
+        shutil.rmtree(self.tmpdir)
+
+    def transcode(self):
+        variant = SoundVariants.digest(self.source)
+        SoundVariants.transcode(
+            self.source, SoundVariants.cache_dir.joinpath(variant)
+        )
+        stat = self.source.stat()
+        SoundVariants.write_manifest(
+            {
+                self.source.as_posix(): {
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "variant": variant,
+                }
+            }
+        )
+        return variant
+
+    def test_needs_variant(self):
+        self.assertTrue(SoundVariants.needs_variant(self.source))
+        native = self.tmpdir.joinpath("native.wav")
+        write_wav(native, 2, 44100, 2, bytes(40))
+        self.assertFalse(SoundVariants.needs_variant(native))
+        # Only width is converted
+        mono = self.tmpdir.joinpath("mono.wav")
+        write_wav(mono, 1, 22050, 2, bytes(40))
+        self.assertFalse(SoundVariants.needs_variant(mono))
+        self.assertTrue(SoundVariants.needs_variant(Path("sound.mp3")))
+
+    def test_transcode(self):
+        variant = self.transcode()
+        wav = map_wav(SoundVariants.cache_dir.joinpath(variant))
+        # Source rate and channels are kept
+        self.assertEqual((wav.channels, wav.rate, wav.width), (1, 22050, 2))
+        self.assertEqual(bytes(wav.pcm), struct.pack("<h", 256) * 2205)
+        self.assertEqual(
+            sorted(path.name for path in SoundVariants.cache_dir.iterdir()),
+            sorted([variant, SoundVariants.MANIFEST]),
+        )
+
+    def test_find(self):
+        self.assertEqual(SoundVariants.find(self.source), None)
+        variant = self.transcode()
+        self.assertTrue(SoundVariants.refresh())
+        self.assertFalse(SoundVariants.refresh())
+        self.assertEqual(
+            SoundVariants.find(self.source),
+            SoundVariants.cache_dir.joinpath(variant),
+        )
+        self.assertEqual(SoundVariants.find(self.tmpdir / "other.wav"), None)
+
+    def test_find_outdated(self):
+        self.transcode()
+        SoundVariants.refresh()
+        write_wav(self.source, 1, 22050, 2, bytes(2 * 4410))
+        self.assertEqual(SoundVariants.find(self.source), None)
+
+    def test_find_missing_variant(self):
+        variant = self.transcode()
+        SoundVariants.refresh()
+        os.unlink(SoundVariants.cache_dir.joinpath(variant))
+        self.assertEqual(SoundVariants.find(self.source), None)
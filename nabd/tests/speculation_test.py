@@ -0,0 +1,171 @@
+import asyncio
+import unittest
+
+from nabd.asr import ASR
+from nabd.speculation import (
+    PartialHypothesis,
+    SpeculationStats,
+    SpeculativeNLU,
+)
+
+
+class DecoderMock(object):
+    """
+    Decoder returning scripted hypotheses.
+    """
+
+    def __init__(self, hypotheses):
+        self.hypotheses = list(hypotheses)
+        self.text = ""
+
+    def decode(self, rate, samples, finalize):
+        if self.hypotheses:
+            self.text = self.hypotheses.pop(0)
+
+    def get_decoded_string(self):
+        return self.text, 1.0
+
+
+class ASRMock(ASR):
+    def _load_model(self, locale):
+        self.decoder = DecoderMock([])
+
+
+class TestPartialHypothesis(unittest.TestCase):
+    def test_update(self):
+        partial = PartialHypothesis()
+        self.assertEqual(partial.update(""), (True, False))
+        self.assertEqual(partial.update("weather"), (True, False))
+        self.assertEqual(partial.update("weather"), (True, True))
+        self.assertEqual(partial.update("weather"), (False, False))
+        self.assertEqual(partial.update("weather today"), (True, False))
+        partial.reset()
+        self.assertEqual(partial.update("weather today"), (True, False))
+
+
+class TestSpeculativeNLU(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.interpreted = []
+        self.stats = SpeculationStats()
+        self.speculation = SpeculativeNLU(self.interpret)
+        self.hypothesis = PartialHypothesis()
+        # Texts which fail to be interpreted once
+        self.failing = set()
+
+    def tearDown(self):
+        self.loop.close()
+
+    async def interpret(self, text):
+        self.interpreted.append(text)
+        if text == "slow weather":
+            await asyncio.sleep(1.0)
+        if text in self.failing:
+            self.failing.remove(text)
+            raise RuntimeError("NLU crashed")
+        if text.startswith("weather"):
+            return {"intent": "nabweatherd/forecast"}
+        return None
+
+    def partials(self, texts):
+        """
+        Process successive hypotheses of the decoder, as ASR does.
+        """
+        for text in texts:
+            publish, stable = self.hypothesis.update(text)
+            if publish:
+                self.speculation.partial(text, stable)
+        # Let speculative tasks run
+        self.loop.run_until_complete(asyncio.sleep(0))
+
+    def result(self, text):
+        return self.loop.run_until_complete(
+            self.speculation.result(text, self.stats)
+        )
+
+    def test_stable(self):
+        self.partials(["", "", "weather", "weather today", "weather today"])
+        self.assertEqual(self.interpreted, ["weather today"])
+        response = self.result("weather today")
+        self.assertEqual(response, {"intent": "nabweatherd/forecast"})
+        self.assertEqual(self.interpreted, ["weather today"])
+        stats = self.stats.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["ready"], 1)
+
+    def test_miss(self):
+        self.partials(["weather", "weather", "weather today"])
+        response = self.result("weather today please")
+        self.assertEqual(response, {"intent": "nabweatherd/forecast"})
+        self.assertEqual(self.interpreted, ["weather", "weather today please"])
+        stats = self.stats.stats()
+        self.assertEqual(stats["speculated"], 1)
+        self.assertEqual(stats["hits"], 0)
+        self.assertEqual(stats["intent_matches"], 1)
+
+    def test_miss_cancels_speculation(self):
+        self.partials(["slow weather", "slow weather"])
+        task = self.speculation.task
+        self.assertFalse(task.done())
+        self.result("hello")
+        self.assertTrue(task.cancelled())
+        self.assertEqual(self.stats.stats()["intent_matches"], 0)
+
+    def test_speculation_failure(self):
+        self.failing.add("weather")
+        self.partials(["weather", "weather"])
+        # Final text is interpreted again
+        self.assertEqual(
+            self.result("weather"), {"intent": "nabweatherd/forecast"}
+        )
+        self.assertEqual(self.interpreted, ["weather", "weather"])
+        stats = self.stats.stats()
+        self.assertEqual(stats["speculated"], 1)
+        self.assertEqual(stats["hits"], 0)
+
+    def test_no_speculation(self):
+        self.partials(["hello"])
+        self.assertEqual(self.result("hello"), None)
+        self.assertEqual(self.interpreted, ["hello"])
+        stats = self.stats.stats()
+        self.assertEqual(stats["count"], 1)
+        self.assertEqual(stats["speculated"], 0)
+        self.assertEqual(stats["intent_mismatches"], 0)
+
+    def test_asr(self):
+        asr = ASRMock("en_US")
+        # Hypothesis is queried every PARTIAL_CHUNKS chunks
+        hypotheses = ["", "weather", "weather today", "weather today"]
+        asr.decoder.hypotheses = [
+            text for text in hypotheses for _ in range(ASR.PARTIAL_CHUNKS)
+        ]
+        published = []
+
+        def partial_cb(text, stable):
+            published.append((text, stable))
+            self.speculation.partial(text, stable)
+
+        asr.on_partial(self.loop, partial_cb)
+        for _ in range(len(asr.decoder.hypotheses)):
+            asr._decode_chunk(bytes(3200), False)
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.assertEqual(
+            published,
+            [
+                ("", False),
+                ("weather", False),
+                ("weather today", False),
+                ("weather today", True),
+            ],
+        )
+        self.assertEqual(self.interpreted, ["weather today"])
+        asr._decode_chunk(bytes(3200), True)
+        self.assertEqual(
+            self.result(
+                self.loop.run_until_complete(asr.get_decoded_string(True))
+            ),
+            {"intent": "nabweatherd/forecast"},
+        )
+        self.assertEqual(self.stats.stats()["hits"], 1)
+        asr.executor.shutdown()
@@ -0,0 +1,97 @@
+import struct
+import unittest
+
+from nabd.vad import Endpointer, LatencyStats
+
+CHUNK_FRAMES = 1600  # 100ms
+
+
+def chunk(amplitude):
+    return struct.pack(
+        "<%dh" % CHUNK_FRAMES,
+        *[amplitude if i % 2 else -amplitude for i in range(CHUNK_FRAMES)],
+    )
+
+
+SILENCE = chunk(20)
+SPEECH = chunk(3000)
+
+
+class TestEndpointer(unittest.TestCase):
+    def setUp(self):
+        self.decoded = []
+        self.ended = 0
+        self.endpointer = Endpointer(self.decode, self.end_of_speech)
+
+    def decode(self, data, finalize):
+        self.decoded.append((data, finalize))
+
+    def end_of_speech(self):
+        self.ended += 1
+
+    def feed(self, chunks, finalize=False):
+        for index, data in enumerate(chunks):
+            self.endpointer.process(
+                data, finalize and index == len(chunks) - 1
+            )
+
+    def test_drop_leading_silence(self):
+        self.feed([SILENCE] * 10)
+        self.assertEqual(self.decoded, [])
+        self.assertAlmostEqual(self.endpointer.dropped, 0.7)
+        self.feed([SPEECH] * 2)
+        # Preroll is kept
+        self.assertEqual(
+            self.decoded, [(SILENCE, False)] * 2 + [(SPEECH, False)] * 2
+        )
+        self.assertAlmostEqual(self.endpointer.dropped, 0.8)
+
+    def test_end_of_speech(self):
+        self.feed([SILENCE] * 3 + [SPEECH] * 5 + [SILENCE] * 6)
+        self.assertEqual(self.ended, 0)
+        self.assertFalse(self.decoded[-1][1])
+        self.feed([SILENCE])
+        self.assertEqual(self.ended, 1)
+        self.assertEqual(self.decoded[-1], (SILENCE, True))
+        self.assertTrue(self.endpointer.endpointed)
+        self.assertIsNotNone(self.endpointer.speech_end)
+        # Further chunks are ignored
+        count = len(self.decoded)
+        self.feed([SPEECH, SILENCE], True)
+        self.assertEqual(len(self.decoded), count)
+        self.assertEqual(self.ended, 1)
+
+    def test_short_noise(self):
+        self.feed([SILENCE] * 3 + [SPEECH] + [SILENCE] * 10)
+        self.assertEqual(self.decoded, [])
+        self.assertEqual(self.ended, 0)
+
+    def test_finalize_during_speech(self):
+        self.feed([SILENCE] * 3 + [SPEECH] * 5, True)
+        self.assertEqual(self.decoded[-1], (SPEECH, True))
+        self.assertEqual(self.ended, 0)
+        self.assertFalse(self.endpointer.endpointed)
+
+    def test_finalize_without_speech(self):
+        self.feed([SILENCE] * 10, True)
+        self.assertEqual(self.decoded[-1], (SILENCE, True))
+        self.assertEqual([f for _, f in self.decoded].count(True), 1)
+        self.assertIsNone(self.endpointer.speech_end)
+
+
+class TestLatencyStats(unittest.TestCase):
+    def test_stats(self):
+        stats = LatencyStats()
+        self.assertEqual(stats.stats(), {"count": 0})
+        stats.record(0.5, True)
+        stats.record(1.5, False)
+        self.assertEqual(
+            stats.stats(),
+            {
+                "count": 2,
+                "endpointed": 1,
+                "last_ms": 1500,
+                "mean_ms": 1000,
+                "max_ms": 1500,
+            },
+        )
@@ -0,0 +1,63 @@
+import io
+import os
+import struct
+import tempfile
+import unittest
+import wave
+
+from nabd.wav import map_wav, parse_wav
+
+
+def make_wav(channels, rate, width, frames):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(channels)
+        f.setframerate(rate)
+        f.setsampwidth(width)
+        f.writeframes(frames)
+    return buffer.getvalue()
+
+
+class TestWav(unittest.TestCase):
+    def test_parse(self):
+        frames = bytes(range(200))
+        wav = parse_wav(make_wav(2, 44100, 2, frames))
+        self.assertEqual(wav.channels, 2)
+        self.assertEqual(wav.rate, 44100)
+        self.assertEqual(wav.width, 2)
+        self.assertIsInstance(wav.pcm, memoryview)
+        self.assertEqual(wav.pcm, frames)
+
+    def test_parse_extra_chunk(self):
+        data = make_wav(1, 22050, 1, b"\x80" * 11)
+        # Insert an odd-sized LIST chunk before fmt chunk
+        extra = b"LIST" + struct.pack("<I", 3) + b"abc\x00"
+        data = data[:12] + extra + data[12:]
+        wav = parse_wav(data)
+        self.assertEqual(wav.channels, 1)
+        self.assertEqual(wav.rate, 22050)
+        self.assertEqual(wav.width, 1)
+        self.assertEqual(wav.pcm, b"\x80" * 11)
+
+    def test_parse_truncated(self):
+        data = make_wav(2, 44100, 2, bytes(400))
+        wav = parse_wav(data[:-3])
+        self.assertEqual(len(wav.pcm), 396)
+
+    def test_parse_invalid(self):
+        with self.assertRaises(ValueError):
+            parse_wav(b"ID3\x03\x00\x00\x00\x00\x00\x00\x00\x00")
+        with self.assertRaises(ValueError):
+            parse_wav(make_wav(2, 44100, 2, b"")[:36])
+
+    def test_map(self):
+        frames = bytes(range(256)) * 4
+        fd, filename = tempfile.mkstemp(suffix=".wav")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(make_wav(2, 44100, 2, frames))
+            wav = map_wav(filename)
+            self.assertEqual(wav.pcm, frames)
+            self.assertEqual(wav.pcm[4:8], frames[4:8])
+        finally:
+            os.unlink(filename)
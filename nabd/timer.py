@@ -0,0 +1,39 @@
+import asyncio
+
+
+class LoopTimer(object):
+    """
+    One-shot timer running a callback on an event loop, with
+    loop.call_later.
+    Starting the timer replaces any pending run.
+    Thread: event loop
+    """
+
+    def __init__(self, loop=None):
+        if loop is None:
+            loop = asyncio.get_event_loop()
+        self.loop = loop
+        self.handle = None
+
+    def start(self, delay, callback, *args):
+        """
+        Schedule callback to be called with args after delay seconds,
+        canceling any pending run.
+        """
+        self.cancel()
+        self.handle = self.loop.call_later(delay, self._run, callback, args)
+
+    def cancel(self):
+        """
+        Cancel pending run, if any.
+        """
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+    def is_pending(self):
+        return self.handle is not None
+
+    def _run(self, callback, args):
+        self.handle = None
+        callback(*args)
@@ -0,0 +1,145 @@
+import audioop
+import collections
+import time
+
+
+class Endpointer(object):
+    """
+    Energy based voice activity detection, between audio capture and ASR
+    decoder.
+    Leading silence is dropped before it reaches the decoder, and decoding
+    is finalized as soon as trailing silence is detected after speech.
+    Thread: capture
+    """
+
+    # Captured audio format: signed 16 bits mono at 16 kHz
+    RATE = 16000
+    WIDTH = 2
+
+    # Minimal RMS of speech, and minimal ratio to estimated noise level
+    MIN_RMS = 400
+    NOISE_RATIO = 3.0
+    NOISE_SMOOTHING = 0.2
+    # Durations, in seconds
+    PREROLL = 0.3  # audio kept before speech starts
+    MIN_SPEECH = 0.2  # voiced audio required to start speech
+    END_SILENCE = 0.7  # silence ending speech
+
+    def __init__(self, decode_cb, end_of_speech_cb):
+        """
+        decode_cb is cb(data, finalize), e.g. ASR.decode_chunk.
+        end_of_speech_cb is called when trailing silence is detected.
+        """
+        self.decode_cb = decode_cb
+        self.end_of_speech_cb = end_of_speech_cb
+        self.noise = None
+        self.preroll = collections.deque()
+        self.preroll_size = 0
+        # Sizes of voiced audio before speech and of trailing silence
+        self.voiced = 0
+        self.silence = 0
+        self.speech = False
+        self.finalized = False
+        # Whether decoding was finalized on trailing silence
+        self.endpointed = False
+        # Duration of dropped leading silence
+        self.dropped = 0.0
+        # time.monotonic() at end of last voiced chunk
+        self.speech_end = None
+
+    def is_voiced(self, data):
+        """
+        Determine if a chunk contains speech, updating noise level estimate.
+        """
+        rms = audioop.rms(data, Endpointer.WIDTH)
+        threshold = Endpointer.MIN_RMS
+        if self.noise is not None:
+            threshold = max(threshold, self.noise * Endpointer.NOISE_RATIO)
+        voiced = rms > threshold
+        if not voiced:
+            if self.noise is None:
+                self.noise = rms
+            else:
+                self.noise += (rms - self.noise) * Endpointer.NOISE_SMOOTHING
+        return voiced
+
+    @staticmethod
+    def size(duration):
+        """
+        Size in bytes of captured audio of a given duration.
+        """
+        return int(duration * Endpointer.RATE) * Endpointer.WIDTH
+
+    def process(self, data, finalize):
+        """
+        Process a captured chunk.
+        Chunks are ignored once decoding was finalized.
+        """
+        if self.finalized:
+            return
+        voiced = self.is_voiced(data)
+        if voiced:
+            self.speech_end = time.monotonic()
+        if self.speech:
+            if voiced:
+                self.silence = 0
+            else:
+                self.silence += len(data)
+            end_of_speech = self.silence >= Endpointer.size(
+                Endpointer.END_SILENCE
+            )
+            self.finalized = finalize or end_of_speech
+            self.decode_cb(data, self.finalized)
+            if end_of_speech and not finalize:
+                self.endpointed = True
+                self.end_of_speech_cb()
+            return
+        self.preroll.append(data)
+        self.preroll_size += len(data)
+        if voiced:
+            self.voiced += len(data)
+        else:
+            self.voiced = 0
+        if self.voiced >= Endpointer.size(Endpointer.MIN_SPEECH) or finalize:
+            self.speech = True
+            self.finalized = finalize
+            while self.preroll:
+                chunk = self.preroll.popleft()
+                self.decode_cb(chunk, finalize and not self.preroll)
+        else:
+            while self.preroll_size > Endpointer.size(Endpointer.PREROLL):
+                chunk = self.preroll.popleft()
+                self.preroll_size -= len(chunk)
+                self.dropped += len(chunk) / Endpointer.size(1)
+
+
+class LatencyStats(object):
+    """
+    Latency from end of speech to intent, for gestalt reporting.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.endpointed = 0
+        self.last = None
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, latency, endpointed):
+        self.count += 1
+        if endpointed:
+            self.endpointed += 1
+        self.last = latency
+        self.total += latency
+        self.max = max(self.max, latency)
+
+    def stats(self):
+        if self.count == 0:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "endpointed": self.endpointed,
+            "last_ms": round(self.last * 1000),
+            "mean_ms": round(self.total / self.count * 1000),
+            "max_ms": round(self.max * 1000),
+        }
@@ -0,0 +1,56 @@
+import collections
+import mmap
+import struct
+
+WavData = collections.namedtuple(
+    "WavData", ["channels", "rate", "width", "pcm"]
+)
+
+WAVE_FORMAT_PCM = 1
+
+
+def parse_wav(buffer):
+    """
+    Parse a RIFF WAVE buffer without copying samples.
+    Return a WavData, pcm being a memoryview on samples in buffer.
+    Raise ValueError if buffer is not a PCM wave file.
+    """
+    view = memoryview(buffer)
+    if len(view) < 12 or view[0:4] != b"RIFF" or view[8:12] != b"WAVE":
+        raise ValueError("Not a RIFF WAVE file")
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = view[offset : offset + 4].tobytes()
+        (chunk_size,) = struct.unpack_from("<I", view, offset + 4)
+        offset += 8
+        if chunk_id == b"fmt ":
+            if chunk_size < 16 or offset + 16 > len(view):
+                raise ValueError("Truncated fmt chunk")
+            fmt = struct.unpack_from("<HHIIHH", view, offset)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("data chunk before fmt chunk")
+            format_tag, channels, rate, _, block_align, bits = fmt
+            if format_tag != WAVE_FORMAT_PCM:
+                raise ValueError(f"Unsupported wave format {format_tag}")
+            width = (bits + 7) // 8
+            if block_align != channels * width or block_align == 0:
+                raise ValueError("Inconsistent wave format")
+            # Size may be wrong for streamed files, only keep full frames
+            end = min(offset + chunk_size, len(view))
+            end -= (end - offset) % block_align
+            return WavData(channels, rate, width, view[offset:end])
+        # Chunks are word-aligned
+        offset += chunk_size + (chunk_size & 1)
+    raise ValueError("No data chunk")
+
+
+def map_wav(filename):
+    """
+    Memory-map a wave file and parse it.
+    The mapping is closed when all views on samples are released.
+    """
+    with open(filename, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return parse_wav(buffer)